@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import Dict, List
+import json
+import os
+import shutil
+import tempfile
+
+import typer
+
+from synthetic_mind.memory.bulk import ImportPolicy, export_corpus, import_corpus
+from synthetic_mind.memory.long_term import LongTermMemory
+
+from .long_term import _TAGS, _WORDS
+
+app = typer.Typer(add_completion=False)
+
+
+def write_corpus(path: str, n: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            words = " ".join(_WORDS[(i * k) % len(_WORDS)] for k in (1, 3, 7, 11))
+            f.write(json.dumps({"query": f"{words} question {i}", "response": f"answer {i}", "tags": [_TAGS[i % len(_TAGS)]], "ts": 1.7e9 + i}) + "\n")
+
+
+def bench_bulk(n: int, workers: List[int], model: str = "hashing", chunk_rows: int = 2048) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="ltm-bulk-")
+    out: Dict[str, float] = {}
+    try:
+        corpus = os.path.join(directory, "corpus.jsonl")
+        write_corpus(corpus, n)
+        store = ""
+        for w in workers:
+            store = os.path.join(directory, f"store-{w}")
+            ltm = LongTermMemory(model_name=model, storage_dir=store)
+            report = import_corpus(ltm, corpus, ImportPolicy(workers=w, chunk_rows=chunk_rows))
+            ltm.close()
+            out[f"bulk.{n}.import.workers_{w}.per_s"] = report["episodes_per_s"]
+        for fmt in ("parquet", "jsonl"):
+            report = export_corpus(store, os.path.join(directory, f"export.{fmt}"))
+            out[f"bulk.{n}.export.{fmt}.per_s"] = report["episodes"] / report["elapsed_s"]
+            out[f"bulk.{n}.export.{fmt}.bytes_per_episode"] = report["bytes"] / max(1, report["episodes"])
+        # Restoring an export reuses its embeddings instead of encoding again.
+        ltm = LongTermMemory(model_name=model, storage_dir=os.path.join(directory, "restored"))
+        report = import_corpus(ltm, os.path.join(directory, "export.parquet"))
+        ltm.close()
+        out[f"bulk.{n}.restore.per_s"] = report["episodes_per_s"]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return out
+
+
+@app.command()
+def main(
+    episodes: int = typer.Option(200_000, "--episodes"),
+    workers: List[int] = typer.Option([0, 2], "--workers"),
+    model: str = typer.Option("hashing", "--model", help="Embedding model; 'hashing' runs offline."),
+):
+    print(json.dumps(bench_bulk(episodes, workers, model), indent=2))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import typer
+
+from synthetic_mind.memory.lexical import RetrievalPolicy
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.metrics import METRICS
+from synthetic_mind.types import Thought
+
+from .long_term import percentiles
+
+app = typer.Typer(add_completion=False)
+
+MODES = ["vector", "lexical", "hybrid", "auto"]
+
+
+def synthetic_corpus(n: int, vocab: int = 5000, words: int = 8, seed: int = 0) -> Tuple[List[str], List[str]]:
+    # Queries of `words` distinct Zipf-distributed terms, so a few terms are everywhere and
+    # most are rare.
+    rng = np.random.default_rng(seed)
+    ranks = (rng.zipf(1.3, size=(n, 3 * words)) - 1) % vocab
+    queries = [" ".join(f"w{r}" for r in list(dict.fromkeys(row.tolist()))[:words]) for row in ranks]
+    responses = [f"answer {i}" for i in range(n)]
+    return queries, responses
+
+
+def probe_queries(corpus: List[str], n: int, seed: int = 1) -> List[Tuple[str, str, int]]:
+    # (kind, text, source row): exact repeats, keyword subsets, and subsets with unseen words.
+    rng = np.random.default_rng(seed)
+    out: List[Tuple[str, str, int]] = []
+    for i, row in enumerate(rng.integers(0, len(corpus), n).tolist()):
+        terms = corpus[row].split()
+        kind = ("repeat", "keywords", "noisy")[i % 3]
+        if kind == "repeat":
+            text = corpus[row]
+        else:
+            text = " ".join(rng.choice(terms, size=min(4, len(terms)), replace=False).tolist())
+            if kind == "noisy":
+                text += " unseen extra"
+        out.append((kind, text, row))
+    return out
+
+
+def bench_lexical(n: int, queries: int = 300, top_k: int = 5) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="ltm-lexical-")
+    corpus, responses = synthetic_corpus(n)
+    probes = probe_queries(corpus, queries)
+    out: Dict[str, float] = {}
+    try:
+        ltm = LongTermMemory(model_name="hashing", storage_dir=directory, retrieval=RetrievalPolicy(mode="hybrid"))
+        thought = Thought(mode="fast", proposal="", rationale="synthetic")
+        for lo in range(0, n, 10_000):
+            hi = min(n, lo + 10_000)
+            ltm.record_episodes(corpus[lo:hi], responses[lo:hi], [thought] * (hi - lo), [[]] * (hi - lo))
+        t0 = time.perf_counter()
+        ltm.search_lexical("warm up")
+        out[f"lexical.{n}.build_s"] = time.perf_counter() - t0
+        ltm.close()
+        out[f"lexical.{n}.postings_mb"] = os.path.getsize(os.path.join(directory, "lexical.npz")) / 1e6
+        ltm = LongTermMemory(model_name="hashing", storage_dir=directory, retrieval=RetrievalPolicy(mode="hybrid"))
+        ltm.load()
+        out[f"lexical.{n}.load_s"] = ltm.load_profile["lexical"]
+        ltm.search("warm up the embedder", mode="vector")
+        samples = []
+        for _, text, _ in probes[:100]:
+            t0 = time.perf_counter()
+            ltm.embed(text)
+            samples.append(time.perf_counter() - t0)
+        out.update(percentiles(samples, f"lexical.{n}.embed"))
+        for mode in MODES:
+            before = METRICS.to_dict()["counters"]
+            samples = []
+            hits = {kind: [0, 0, 0] for kind in ("repeat", "keywords", "noisy")}
+            for kind, text, row in probes:
+                t0 = time.perf_counter()
+                found = [r for r, _ in ltm.search(text, top_k=top_k, mode=mode)]
+                samples.append(time.perf_counter() - t0)
+                # Repeated corpus texts make several rows equally right; any row with the same text counts.
+                good = [r for r in found if corpus[r] == corpus[row] or r == row]
+                stats = hits[kind]
+                stats[0] += 1
+                stats[1] += bool(found) and found[0] in good
+                stats[2] += bool(good)
+            out.update(percentiles(samples, f"lexical.{n}.{mode}"))
+            for kind, (total, at1, at5) in hits.items():
+                out[f"lexical.{n}.{mode}.{kind}.recall_at_1"] = at1 / total
+                out[f"lexical.{n}.{mode}.{kind}.recall_at_{top_k}"] = at5 / total
+            if mode == "auto":
+                after = METRICS.to_dict()["counters"]
+                key = "ltm_auto_search_total{path=lexical}"
+                out[f"lexical.{n}.auto.lexical_share"] = (after.get(key, 0.0) - before.get(key, 0.0)) / len(probes)
+        ltm.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return out
+
+
+@app.command()
+def main(
+    sizes: List[int] = typer.Option([10_000, 100_000], "--size"),
+    queries: int = typer.Option(300, "--queries"),
+):
+    results: Dict[str, float] = {}
+    for n in sizes:
+        results.update(bench_lexical(n, queries))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import asyncio
+import http.client
+import json
+import tempfile
+import threading
+import time
+
+import numpy as np
+import typer
+
+app = typer.Typer(add_completion=False)
+
+_PROMPTS = [
+    "What is the goal of reasoning about ethics?",
+    "How does science explain memory?",
+    "Why do coding standards matter for teams?",
+    "Explain a math proof about prime numbers.",
+    "What does self awareness mean for an agent?",
+]
+
+
+def _request(conn: http.client.HTTPConnection, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    headers = {"Content-Type": "application/json"} if data is not None else {}
+    conn.request(method, path, body=data, headers=headers)
+    resp = conn.getresponse()
+    payload = json.loads(resp.read() or b"{}")
+    if resp.status >= 400:
+        raise RuntimeError(f"{method} {path} -> {resp.status}: {payload}")
+    return payload
+
+
+def _client(host: str, port: int, steps: int, latencies: List[float], errors: List[str]) -> None:
+    # One keep-alive connection and one session per simulated user.
+    conn = http.client.HTTPConnection(host, port, timeout=120)
+    try:
+        sid = _request(conn, "POST", "/sessions")["session_id"]
+        for i in range(steps):
+            t0 = time.perf_counter()
+            _request(conn, "POST", f"/sessions/{sid}/step", {"prompt": f"{_PROMPTS[i % len(_PROMPTS)]} ({i})"})
+            latencies.append(time.perf_counter() - t0)
+        _request(conn, "DELETE", f"/sessions/{sid}")
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        conn.close()
+
+
+def run_load(host: str, port: int, users: int, steps: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors: List[str] = []
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        for _ in range(users):
+            pool.submit(_client, host, port, steps, latencies, errors)
+    wall = time.perf_counter() - t0
+    lat = np.asarray(latencies) * 1000.0 if latencies else np.zeros(1)
+    return {
+        "users": users,
+        "steps": len(latencies),
+        "errors": len(errors),
+        "wall_s": wall,
+        "throughput_rps": len(latencies) / wall if wall > 0 else 0.0,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def _spawn(workers: int, embed_batch: int) -> tuple:
+    # In-process server on an ephemeral port with a throwaway storage dir.
+    from synthetic_mind.core import MindConfig
+    from synthetic_mind.server import MindServer
+
+    storage = tempfile.mkdtemp(prefix="mind-load-")
+    server = MindServer(MindConfig(storage_dir=storage, embed_batch_max_size=embed_batch), max_workers=workers)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def _run() -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start("127.0.0.1", 0))
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=_run, name="mind-server", daemon=True).start()
+    ready.wait()
+    return server, loop
+
+
+@app.command()
+def main(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8765, "--port"),
+    users: List[int] = typer.Option([1, 4, 16], "--users", help="Concurrent sessions; repeat for a sweep."),
+    steps: int = typer.Option(20, "--steps", help="Steps per session."),
+    spawn: bool = typer.Option(False, "--spawn", help="Start a local server with a temporary storage dir."),
+    workers: int = typer.Option(8, "--workers"),
+    embed_batch: int = typer.Option(32, "--embed-batch", help="Spawned server's embedding batch size (0 disables)."),
+    as_json: bool = typer.Option(False, "--json"),
+):
+    server = loop = None
+    if spawn:
+        server, loop = _spawn(workers, embed_batch)
+        port = server.port
+    try:
+        rows = [run_load(host, port, u, steps) for u in users]
+    finally:
+        if server is not None:
+            asyncio.run_coroutine_threadsafe(server.shutdown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'users':>6} {'steps':>6} {'errors':>6} {'rps':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+    for r in rows:
+        print(
+            f"{r['users']:>6} {r['steps']:>6} {r['errors']:>6} {r['throughput_rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    app()
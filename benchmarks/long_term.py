@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from typing import Dict, List
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import typer
+
+from synthetic_mind.memory.ann import IndexPolicy
+from synthetic_mind.memory.episodes import EPISODE_SCHEMA, THOUGHT_TYPE
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.memory.segments import SegmentStore
+from synthetic_mind.types import Thought
+
+app = typer.Typer(add_completion=False)
+
+_TAGS = ["math", "reason", "self", "why", "how", "science", "coding", "ethics"]
+_WORDS = "memory attention reasoning goal value science proof code ethics mind model signal".split()
+
+
+def percentiles(samples: List[float], prefix: str) -> Dict[str, float]:
+    ms = np.asarray(samples) * 1000.0
+    return {f"{prefix}.p50_ms": float(np.percentile(ms, 50)), f"{prefix}.p95_ms": float(np.percentile(ms, 95))}
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0, clusters: int = 256) -> np.ndarray:
+    # Clustered unit vectors, so approximate indexes see structure similar to real embeddings.
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    out = centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    out /= np.linalg.norm(out, axis=1, keepdims=True)
+    return out
+
+
+def synthetic_table(start: int, n: int) -> pa.Table:
+    ids = np.arange(start, start + n)
+    words = np.array(_WORDS)
+    query = pa.array([f"{words[i % len(words)]} {words[(i // 7) % len(words)]} question {i}" for i in ids.tolist()], pa.string())
+    response = pa.array([f"answer {i}" for i in ids.tolist()], pa.string())
+    thought = pa.array([{"mode": "fast", "rationale": "synthetic", "proposal": None}] * n, THOUGHT_TYPE)
+    tags = pa.array([[_TAGS[i % len(_TAGS)]] for i in ids.tolist()], pa.list_(pa.string()))
+    ts = pa.array(np.full(n, 1.7e9), pa.float64())
+    return pa.table([ts, query, response, thought, tags], schema=EPISODE_SCHEMA)
+
+
+def write_synthetic_store(directory: str, n: int, dim: int, chunk: int = 250_000) -> None:
+    store = SegmentStore(directory, compact_after=1 << 30)
+    for start in range(0, n, chunk):
+        rows = min(chunk, n - start)
+        store.append(synthetic_table(start, rows), synthetic_vectors(rows, dim, seed=start))
+
+
+def bench_search(n: int, dim: int = 384, queries: int = 100, policy: IndexPolicy | None = None) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="ltm-bench-")
+    try:
+        write_synthetic_store(directory, n, dim)
+        ltm = LongTermMemory(model_name=f"hashing-{dim}", storage_dir=directory, index_policy=policy or IndexPolicy())
+        t0 = time.perf_counter()
+        ltm.load()
+        out: Dict[str, float] = {f"search.{n}.load_s": time.perf_counter() - t0}
+        t0 = time.perf_counter()
+        ltm.wait_for_index()
+        if ltm.index is not None:
+            out[f"search.{n}.index_build_s"] = time.perf_counter() - t0
+        ltm.search("warm up the embedder")
+        texts = [f"{_WORDS[i % len(_WORDS)]} {_WORDS[(i * 5) % len(_WORDS)]} query {i}" for i in range(queries)]
+        samples = []
+        for text in texts:
+            t0 = time.perf_counter()
+            ltm.search(text, top_k=6)
+            samples.append(time.perf_counter() - t0)
+        out.update(percentiles(samples, f"search.{n}"))
+        samples = []
+        for i, text in enumerate(texts):
+            t0 = time.perf_counter()
+            ltm.search(text, top_k=6, required_tags=[_TAGS[i % len(_TAGS)]])
+            samples.append(time.perf_counter() - t0)
+        out.update(percentiles(samples, f"search.{n}.tagged"))
+        report = ltm.index_report(k=10, n_queries=min(queries, n))
+        out[f"search.{n}.flat_ms"] = report["flat_ms"]
+        if ltm.index is not None:
+            out[f"search.{n}.ann_ms"] = report["ann_ms"]
+            out[f"search.{n}.ann_recall_at_10"] = report["recall_at_k"]
+        return out
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_codecs(n: int, codecs: List[str], dim: int = 384, queries: int = 100) -> Dict[str, float]:
+    # Resident bytes per episode and recall@10 (raw codes and after full-precision re-rank)
+    # for each in-memory codec, against exact float32 search.
+    directory = tempfile.mkdtemp(prefix="ltm-bench-")
+    try:
+        write_synthetic_store(directory, n, dim)
+        out: Dict[str, float] = {}
+        for codec in codecs:
+            ltm = LongTermMemory(model_name=f"hashing-{dim}", storage_dir=directory, index_policy=IndexPolicy(codec=codec))
+            ltm.load()
+            ltm.wait_for_index()
+            report = ltm.index_report(k=10, n_queries=min(queries, n))
+            out[f"codec.{codec}.bytes_per_episode"] = report.get("index_bytes_per_episode", report["float32_bytes_per_episode"])
+            out[f"codec.{codec}.search_ms"] = report.get("reranked_ms", report["ann_ms"])
+            out[f"codec.{codec}.raw_recall_at_10"] = report["recall_at_k"]
+            out[f"codec.{codec}.reranked_recall_at_10"] = report.get("recall_at_k_reranked", report["recall_at_k"])
+        return out
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_save_load(n: int = 10_000, batch: int = 500) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="ltm-bench-")
+    try:
+        ltm = LongTermMemory(model_name="hashing", storage_dir=directory)
+        thought = Thought(mode="fast", rationale="synthetic", proposal="p")
+        t0 = time.perf_counter()
+        for start in range(0, n, batch):
+            ids = range(start, min(n, start + batch))
+            ltm.record_episodes([f"question {i} about {_WORDS[i % len(_WORDS)]}" for i in ids], [f"answer {i}" for i in ids], [thought] * len(ids), [[_TAGS[i % len(_TAGS)]] for i in ids])
+        record_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        ltm.save()
+        save_s = time.perf_counter() - t0
+        ltm.close()
+        out = {"ltm.record_per_s": n / record_s, "ltm.save_per_s": n / save_s}
+        for mode, lazy in (("eager", False), ("lazy", True)):
+            fresh = LongTermMemory(model_name="hashing", storage_dir=directory)
+            t0 = time.perf_counter()
+            fresh.load(lazy=lazy)
+            out[f"ltm.load_{mode}_per_s"] = n / (time.perf_counter() - t0)
+        return out
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@app.command()
+def main(
+    sizes: List[int] = typer.Option([10_000, 100_000, 1_000_000], "--size"),
+    dim: int = typer.Option(384, "--dim"),
+    queries: int = typer.Option(100, "--queries"),
+    save_rows: int = typer.Option(10_000, "--save-rows"),
+    codecs: List[str] = typer.Option(["flat", "fp16", "sq8", "pq"], "--codec"),
+    codec_rows: int = typer.Option(50_000, "--codec-rows"),
+):
+    results: Dict[str, float] = {}
+    for n in sizes:
+        results.update(bench_search(n, dim, queries))
+    results.update(bench_codecs(codec_rows, codecs, dim, queries))
+    results.update(bench_save_load(save_rows))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    app()
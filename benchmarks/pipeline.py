@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from typing import Dict, List
+import json
+import time
+
+import typer
+
+from synthetic_mind.core import MindConfig, SyntheticMind
+from synthetic_mind.reasoning.engine import RuleEngine
+from synthetic_mind.reasoning.matcher import Rule, RuleRegistry
+from synthetic_mind.types import Thought
+
+from .long_term import percentiles
+
+app = typer.Typer(add_completion=False)
+
+_TRIVIAL = ["hi", "hello there", "hey", "good morning"]
+_RETRIEVAL = [
+    "Why does science rely on falsifiable claims?",
+    "How should a coding team review changes?",
+    "What is the goal of ethics in machine reasoning?",
+    "Explain how memory consolidation might work.",
+]
+_RULES = [
+    "who are you and what is your purpose",
+    "compute 12*7 please",
+    "I'm not sure what to ask next, tell me about consciousness and the philosophy of mind",
+    "a long context with no rule hits " * 20,
+]
+
+
+def bench_step(prefill: int = 1000, repeat: int = 50) -> Dict[str, float]:
+    config = MindConfig(storage_dir=None, embed_model="hashing", save_every_n_steps=1 << 30)
+    mind = SyntheticMind(config=config)
+    ltm = mind.long_term_memory
+    thought = Thought(mode="fast", rationale="synthetic", proposal="p")
+    ltm.record_episodes([f"prefill question {i}" for i in range(prefill)], [f"prefill answer {i}" for i in range(prefill)], [thought] * prefill)
+    mind.step("warm up the embedder")
+    out: Dict[str, float] = {}
+    for name, prompts in (("trivial", _TRIVIAL), ("retrieval", _RETRIEVAL)):
+        samples: List[float] = []
+        for i in range(repeat):
+            t0 = time.perf_counter()
+            mind.step(prompts[i % len(prompts)])
+            samples.append(time.perf_counter() - t0)
+            # Answers quote the two most recent episodes; short filler episodes keep
+            # response length from compounding across iterations.
+            ltm.record_episodes(["filler", "filler"], ["ok", "ok"], [thought, thought])
+        out.update(percentiles(samples, f"step.{name}"))
+    mind.close()
+    return out
+
+
+def bench_rules(repeat: int = 2000) -> Dict[str, float]:
+    rules = RuleEngine()
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        rules.apply(_RULES[i % len(_RULES)])
+    return {"rules.apply_us": (time.perf_counter() - t0) / repeat * 1e6}
+
+
+def bench_rule_scaling(counts: List[int], repeat: int = 500) -> Dict[str, float]:
+    # RuleEngine.apply with n synthetic keyword rules registered next to the built-ins.
+    out: Dict[str, float] = {}
+    for n in counts:
+        registry = RuleRegistry()
+        for i in range(n):
+            registry.add_rule(Rule(name=f"synthetic-{i}", keywords=[f"keyword{i:05d}", f"phrase {i} alt"], response=f"rule {i}"))
+        rules = RuleEngine(registry)
+        rules.apply("")
+        t0 = time.perf_counter()
+        for i in range(repeat):
+            rules.apply(_RULES[i % len(_RULES)])
+        out[f"rules.{n}.apply_us"] = (time.perf_counter() - t0) / repeat * 1e6
+    return out
+
+
+@app.command()
+def main(
+    prefill: int = typer.Option(1000, "--prefill"),
+    repeat: int = typer.Option(50, "--repeat"),
+):
+    results = bench_step(prefill, repeat)
+    results.update(bench_rules())
+    results.update(bench_rule_scaling([100, 1000, 5000]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    app()
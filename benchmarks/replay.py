@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Dict, List
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import typer
+
+from synthetic_mind.core import MindConfig, SyntheticMind
+from synthetic_mind.replay import find_transcripts, load_transcript, replay
+
+from .long_term import _WORDS, write_synthetic_store
+
+app = typer.Typer(add_completion=False)
+
+
+def write_transcripts(directory: str, n: int, turns: int) -> None:
+    for i in range(n):
+        with open(os.path.join(directory, f"t{i:05d}.jsonl"), "w", encoding="utf-8") as f:
+            for t in range(turns):
+                words = " ".join(_WORDS[(i * 7 + t * k) % len(_WORDS)] for k in (1, 2, 5))
+                f.write(json.dumps({"prompt": f"why does {words} matter"}) + "\n")
+
+
+def bench_replay(episodes: int, transcripts: int, turns: int, workers: List[int], baseline: int = 10, dim: int = 384) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="ltm-replay-")
+    config = MindConfig(embed_model=f"hashing-{dim}")
+    out: Dict[str, float] = {}
+    try:
+        snapshot = os.path.join(directory, "snapshot")
+        write_synthetic_store(snapshot, episodes, dim)
+        tx = os.path.join(directory, "transcripts")
+        os.makedirs(tx)
+        write_transcripts(tx, transcripts, turns)
+        # Before: one process, and per transcript a clean copy of the snapshot (otherwise
+        # every transcript recalls the previous ones' answers) plus a fresh mind loading it.
+        scratch = os.path.join(directory, "scratch")
+        paths = find_transcripts(tx)[:baseline]
+        t0 = time.perf_counter()
+        steps = 0
+        for path in paths:
+            shutil.rmtree(scratch, ignore_errors=True)
+            shutil.copytree(snapshot, scratch)
+            mind = SyntheticMind(config.model_copy(update={"storage_dir": scratch}))
+            for prompt, _ in load_transcript(path):
+                mind.step(prompt)
+                steps += 1
+            mind.close()
+        out[f"replay.{episodes}.reload_per_transcript.turns_per_s"] = steps / (time.perf_counter() - t0)
+        for w in workers:
+            report = replay(tx, snapshot, os.path.join(directory, f"results-{w}.parquet"), config, workers=w, trace=True)
+            out[f"replay.{episodes}.workers_{w}.turns_per_s"] = report["turns_per_s"]
+            out[f"replay.{episodes}.workers_{w}.step_p50_ms"] = report["step_p50_ms"]
+            out[f"replay.{episodes}.workers_{w}.elapsed_s"] = report["elapsed_s"]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return out
+
+
+@app.command()
+def main(
+    episodes: int = typer.Option(100_000, "--episodes", help="Rows in the LTM snapshot."),
+    transcripts: int = typer.Option(200, "--transcripts"),
+    turns: int = typer.Option(5, "--turns"),
+    workers: List[int] = typer.Option([0, 2, 4], "--workers"),
+):
+    print(json.dumps(bench_replay(episodes, transcripts, turns, workers), indent=2))
+
+
+if __name__ == "__main__":
+    app()
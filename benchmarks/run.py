@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import json
+import platform
+import sys
+import time
+
+import typer
+
+from .long_term import bench_codecs, bench_save_load, bench_search
+from .pipeline import bench_rule_scaling, bench_rules, bench_step
+from .working_memory import bench_working_memory
+
+app = typer.Typer(add_completion=False)
+
+# Metrics ending in one of these suffixes are better when higher (throughput, recall);
+# everything else is a latency or duration and better when lower.
+_HIGHER_IS_BETTER = ("_per_s", "recall_at_10")
+
+
+def run_suite(search_sizes: List[int], wm_capacities: List[int], prefill: int, repeat: int, save_rows: int) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    results.update(bench_step(prefill, repeat))
+    results.update(bench_rules())
+    results.update(bench_rule_scaling([100, 5000]))
+    for capacity in wm_capacities:
+        row = bench_working_memory(capacity)
+        for op in ("add_us", "topk_us", "reinforce_us"):
+            results[f"wm.{capacity}.{op}"] = row[op]
+    for n in search_sizes:
+        results.update(bench_search(n))
+    # PQ training dominates the suite's runtime, so only the scalar codecs run here.
+    results.update(bench_codecs(min(search_sizes), ["flat", "fp16", "sq8"]))
+    results.update(bench_save_load(save_rows))
+    return results
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for name in sorted(set(current) & set(baseline)):
+        old, new = baseline[name], current[name]
+        if old == 0:
+            continue
+        higher = name.endswith(_HIGHER_IS_BETTER)
+        # change > 0 means worse, whichever direction the metric runs.
+        change = (old - new) / old if higher else (new - old) / old
+        rows.append({"metric": name, "baseline": old, "current": new, "change": change, "regression": change > threshold})
+    return rows
+
+
+def _print_comparison(rows: List[Dict[str, Any]], threshold: float) -> None:
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['metric']:<40} {r['baseline']:>12.3f} {r['current']:>12.3f} {r['change'] * 100:>7.1f}%{flag}")
+    bad = sum(r["regression"] for r in rows)
+    print(f"{bad} regression(s) beyond {threshold * 100:.0f}%")
+
+
+@app.command()
+def main(
+    output: Optional[str] = typer.Option(None, "--output", "-o", help="Write results JSON here."),
+    baseline: Optional[str] = typer.Option(None, "--compare", help="Baseline results JSON to compare against."),
+    threshold: float = typer.Option(0.25, "--threshold", help="Relative slowdown that counts as a regression."),
+    quick: bool = typer.Option(False, "--quick", help="Small sizes only (10k search, 8/1k WM capacities)."),
+    search_sizes: List[int] = typer.Option([10_000, 100_000, 1_000_000], "--search-size"),
+):
+    if quick:
+        search_sizes, wm_capacities, prefill, repeat, save_rows = [10_000], [8, 1000], 500, 20, 2000
+    else:
+        wm_capacities, prefill, repeat, save_rows = [8, 1000, 100_000], 1000, 50, 10_000
+    t0 = time.perf_counter()
+    results = run_suite(search_sizes, wm_capacities, prefill, repeat, save_rows)
+    doc = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "quick": quick, "elapsed_s": time.perf_counter() - t0},
+        "results": results,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+    else:
+        print(json.dumps(doc, indent=2))
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        rows = compare(results, base.get("results", base), threshold)
+        _print_comparison(rows, threshold)
+        if any(r["regression"] for r in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import json
+import time
+
+import numpy as np
+import typer
+
+from synthetic_mind.action.sandbox import SandboxPolicy, SandboxPool
+
+app = typer.Typer(add_completion=False)
+
+# Bounded by the CPU rlimit, the memory rlimit and nothing at all, respectively.
+_PATHOLOGICAL = ["result = sum(range(10**12))", "result = [0] * 10**10", "while True: pass"]
+
+
+def bench_sandbox(calls: int, workers: int, clients: int, bad_every: int = 20, repeat_every: int = 4) -> Dict[str, float]:
+    # Mixed load: mostly small distinct snippets, every repeat_every-th one a repeat (cache
+    # hit), and every bad_every-th a pathological one that must be killed.
+    snippets: List[str] = []
+    for i in range(calls):
+        if bad_every and i % bad_every == bad_every - 1:
+            snippets.append(_PATHOLOGICAL[(i // bad_every) % len(_PATHOLOGICAL)])
+        elif repeat_every and i % repeat_every == 0:
+            snippets.append("result = sorted(map(abs, range(-50, 50)))[:5]")
+        else:
+            snippets.append(f"result = sum(x * x for x in range({1000 + i}))")
+    pool = SandboxPool(SandboxPolicy(workers=workers))
+    t0 = time.perf_counter()
+    pool.start()
+    pool.run("result = 0")
+    out: Dict[str, float] = {f"sandbox.{workers}.start_s": time.perf_counter() - t0}
+    fast: List[float] = []
+    bad: List[float] = []
+
+    def one(code: str) -> None:
+        t = time.perf_counter()
+        pool.run(code)
+        (bad if code in _PATHOLOGICAL else fast).append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as ex:
+        list(ex.map(one, snippets))
+    wall = time.perf_counter() - t0
+    pool.close()
+    ms = np.asarray(fast) * 1000.0
+    out.update(
+        {
+            f"sandbox.{workers}.calls_per_s": calls / wall,
+            f"sandbox.{workers}.fast_p50_ms": float(np.percentile(ms, 50)),
+            f"sandbox.{workers}.fast_p99_ms": float(np.percentile(ms, 99)),
+            f"sandbox.{workers}.pathological_p50_ms": float(np.percentile(np.asarray(bad) * 1000.0, 50)) if bad else 0.0,
+        }
+    )
+    return out
+
+
+@app.command()
+def main(
+    calls: int = typer.Option(400, "--calls"),
+    workers: List[int] = typer.Option([1, 2, 4], "--workers"),
+    clients: int = typer.Option(8, "--clients", help="Concurrent callers."),
+    bad_every: int = typer.Option(20, "--bad-every", help="Every n-th call is pathological (0 disables)."),
+):
+    results: Dict[str, float] = {}
+    for w in workers:
+        results.update(bench_sandbox(calls, w, clients, bad_every))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    app()
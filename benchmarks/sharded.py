@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import typer
+
+from synthetic_mind.memory.ann import IndexPolicy
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.memory.segments import SegmentStore
+from synthetic_mind.memory.sharded import ShardedLongTermMemory
+
+from .long_term import percentiles, synthetic_table, synthetic_vectors
+
+app = typer.Typer(add_completion=False)
+
+
+def write_sharded_store(directory: str, n: int, dim: int, shards: int) -> None:
+    # The same n rows as a single store, split into contiguous ranges, one per shard dir.
+    bounds = np.linspace(0, n, shards + 1).astype(int)
+    for i in range(shards):
+        store = SegmentStore(os.path.join(directory, f"shard-{i:02d}"), compact_after=1 << 30)
+        start, stop = int(bounds[i]), int(bounds[i + 1])
+        store.append(synthetic_table(start, stop - start), synthetic_vectors(stop - start, dim, seed=start))
+
+
+def _measure(search, queries: np.ndarray, clients: int, prefix: str) -> Dict[str, float]:
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        search(q)
+        samples.append(time.perf_counter() - t0)
+    out = percentiles(samples, prefix)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(search, queries))
+    out[f"{prefix}.qps_per_s"] = len(queries) / (time.perf_counter() - t0)
+    return out
+
+
+def bench_sharded(n: int, shard_counts: List[int], dim: int = 384, queries: int = 200, clients: int = 8, policy: IndexPolicy | None = None) -> Dict[str, float]:
+    # Fan-out latency and throughput against one in-process LongTermMemory over the same rows.
+    # Queries are pre-embedded so only search and merge are timed.
+    policy = policy or IndexPolicy()
+    qs = synthetic_vectors(queries, dim, seed=n + 1)
+    out: Dict[str, float] = {"sharded.cpus": float(os.cpu_count() or 1)}
+    directory = tempfile.mkdtemp(prefix="ltm-shard-bench-")
+    try:
+        write_sharded_store(directory, n, dim, 1)
+        ltm = LongTermMemory(model_name=f"hashing-{dim}", storage_dir=os.path.join(directory, "shard-00"), index_policy=policy)
+        ltm.load()
+        ltm.wait_for_index()
+        out.update(_measure(lambda q: ltm.search_vector(q, top_k=6), qs, clients, f"sharded.{n}.single"))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    for shards in shard_counts:
+        directory = tempfile.mkdtemp(prefix="ltm-shard-bench-")
+        try:
+            write_sharded_store(directory, n, dim, shards)
+            ltm = ShardedLongTermMemory(model_name=f"hashing-{dim}", storage_dir=directory, shards=shards, index_policy=policy)
+            t0 = time.perf_counter()
+            ltm.load()
+            ltm.wait_for_index()
+            out[f"sharded.{n}.{shards}.load_s"] = time.perf_counter() - t0
+            ltm.search_vector(qs[0])
+            out.update(_measure(lambda q: ltm.search_vector(q, top_k=6), qs, clients, f"sharded.{n}.{shards}"))
+            ltm.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return out
+
+
+@app.command()
+def main(
+    sizes: List[int] = typer.Option([100_000, 1_000_000], "--size"),
+    shards: List[int] = typer.Option([1, 2, 4, 8], "--shards"),
+    dim: int = typer.Option(384, "--dim"),
+    queries: int = typer.Option(200, "--queries"),
+    clients: int = typer.Option(8, "--clients", help="Concurrent searching threads for the QPS figure."),
+    exact: bool = typer.Option(False, "--exact", help="Never build an ANN index; every shard scans its rows."),
+):
+    policy = IndexPolicy(threshold=1 << 62) if exact else IndexPolicy()
+    results: Dict[str, float] = {}
+    for n in sizes:
+        results.update(bench_sharded(n, shards, dim, queries, clients, policy))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    app()
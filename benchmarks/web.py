@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+import typer
+
+from synthetic_mind.action.web import WebClient, WebPolicy, extract_snippet
+
+app = typer.Typer(add_completion=False)
+
+
+def start_stand_in(delay_ms: float) -> ThreadingHTTPServer:
+    # Local stand-in for the search endpoint: keep-alive HTTP/1.1 with a fixed server delay.
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def do_GET(self) -> None:
+            time.sleep(delay_ms / 1000.0)
+            body = f'<div class="result__snippet">stand-in answer for {self.path}</div>'.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _timed(fn, queries: List[str], prefix: str) -> Dict[str, float]:
+    samples = []
+    t0 = time.perf_counter()
+    for q in queries:
+        t = time.perf_counter()
+        fn(q)
+        samples.append(time.perf_counter() - t)
+    wall = time.perf_counter() - t0
+    ms = np.asarray(samples) * 1000.0
+    return {f"{prefix}.p50_ms": float(np.percentile(ms, 50)), f"{prefix}.p95_ms": float(np.percentile(ms, 95)), f"{prefix}.per_s": len(queries) / wall}
+
+
+def bench_web(queries: int = 100, delay_ms: float = 20.0, concurrency: int = 4) -> Dict[str, float]:
+    server = start_stand_in(delay_ms)
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/html/"
+    cache_dir = tempfile.mkdtemp(prefix="web-cache-")
+    qs = [f"question {i}" for i in range(queries)]
+    out: Dict[str, float] = {}
+    try:
+        # Before: a new connection per request, no cache, one at a time.
+        def naive(q: str) -> str:
+            return extract_snippet(requests.get(endpoint, params={"q": q}, timeout=8).text)
+
+        out.update(_timed(naive, qs, "web.naive"))
+        client = WebClient(WebPolicy(endpoint=endpoint, cache_dir=cache_dir, max_concurrency=concurrency))
+        out.update(_timed(client.search, qs, "web.pooled"))
+        out.update(_timed(client.search, qs, "web.cached"))
+        # A fresh client over the same directory: hits come from disk.
+        disk = WebClient(WebPolicy(endpoint=endpoint, cache_dir=cache_dir, max_concurrency=concurrency))
+        out.update(_timed(disk.search, qs, "web.disk_cached"))
+        fresh = [f"other {i}" for i in range(queries)]
+        t0 = time.perf_counter()
+        client.search_many(fresh)
+        out["web.concurrent.per_s"] = queries / (time.perf_counter() - t0)
+
+        async def overlap() -> None:
+            await asyncio.gather(*(client.asearch(f"async {i}") for i in range(queries)))
+
+        t0 = time.perf_counter()
+        asyncio.run(overlap())
+        out["web.async.per_s"] = queries / (time.perf_counter() - t0)
+        client.close()
+        disk.close()
+    finally:
+        server.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return out
+
+
+@app.command()
+def main(
+    queries: int = typer.Option(100, "--queries"),
+    delay_ms: float = typer.Option(20.0, "--delay-ms", help="Stand-in server latency per request."),
+    concurrency: int = typer.Option(4, "--concurrency"),
+):
+    print(json.dumps(bench_web(queries, delay_ms, concurrency), indent=2))
+
+
+if __name__ == "__main__":
+    app()
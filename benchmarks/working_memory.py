@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Dict, List
+import json
+import time
+
+import typer
+
+from synthetic_mind.memory.working import WorkingMemory
+from synthetic_mind.types import Experience
+
+app = typer.Typer(add_completion=False)
+
+
+def _time_op(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def bench_working_memory(capacity: int, repeat: int = 200) -> Dict[str, float]:
+    wm = WorkingMemory(capacity=capacity)
+    now = time.time()
+    for i in range(capacity):
+        wm.add(Experience(id=f"exp-{i}", content="x" * (i % 200), timestamp=now - i))
+    pool = [Experience(id=f"new-{i}", content="y" * (i % 200)) for i in range(repeat)]
+    it = iter(pool)
+    spotlight = wm.topk(6)
+    return {
+        "capacity": capacity,
+        "add_us": _time_op(lambda: wm.add(next(it)), repeat),
+        "topk_us": _time_op(lambda: wm.topk(6), repeat),
+        "reinforce_us": _time_op(lambda: wm.reinforce(spotlight, delta=0.1), repeat),
+    }
+
+
+@app.command()
+def main(
+    capacities: List[int] = typer.Option([8, 100, 1000, 10_000, 100_000], "--capacity"),
+    repeat: int = typer.Option(200, "--repeat"),
+    as_json: bool = typer.Option(False, "--json"),
+):
+    rows = [bench_working_memory(c, repeat) for c in capacities]
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'capacity':>10} {'add_us':>10} {'topk_us':>10} {'reinforce_us':>13}")
+    for r in rows:
+        print(f"{r['capacity']:>10} {r['add_us']:>10.1f} {r['topk_us']:>10.1f} {r['reinforce_us']:>13.1f}")
+
+
+if __name__ == "__main__":
+    app()
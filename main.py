@@ -1,34 +1,214 @@
-import json
-from typing import Optional
-
-import typer
-from rich.console import Console
-from rich.panel import Panel
-
-from synthetic_mind.core import SyntheticMind
-
-app = typer.Typer(add_completion=False)
-console = Console()
-
-
-@app.command()
-def run(prompt: Optional[str] = typer.Option(None, "--prompt", "-p"), trace: bool = typer.Option(False, "--trace")):
-    mind = SyntheticMind(trace=trace)
-    if prompt is None:
-        console.print(Panel.fit("Enter interactive mode. Type 'exit' to quit.", title="Synthetic Mind"))
-        while True:
-            user = console.input("[bold cyan]You[/]: ")
-            if user.strip().lower() in {"exit", "quit"}:
-                break
-            response = mind.step(user)
-            console.print(f"[bold green]Mind[/]: {response}")
-    else:
-        response = mind.step(prompt)
-        if trace:
-            console.rule("Trace JSON")
-            console.print_json(data=mind.last_trace)
-        console.print(response)
-
-
-if __name__ == "__main__":
-    app()
+import json
+import os
+import time
+from typing import List, Optional
+
+_T0 = time.perf_counter()
+
+import typer
+from rich.console import Console
+from rich.markup import escape
+from rich.panel import Panel
+from rich.table import Table
+
+from synthetic_mind.core import MindConfig, SyntheticMind, create_long_term_memory
+from synthetic_mind.memory.bulk import ImportPolicy, export_corpus, import_corpus
+from synthetic_mind.memory.consolidation import ConsolidationPolicy, consolidate as consolidate_ltm
+from synthetic_mind.metrics import METRICS
+
+_IMPORT_S = time.perf_counter() - _T0
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+
+def _print_startup_profile(mind: SyntheticMind, first_step_s: float, first_chunk_s: Optional[float] = None) -> None:
+    table = Table(title="Startup profile")
+    table.add_column("phase")
+    table.add_column("ms", justify="right")
+    table.add_row("imports", f"{_IMPORT_S * 1000:.1f}")
+    for name, secs in mind.startup_profile.items():
+        table.add_row(name, f"{secs * 1000:.1f}")
+    embedder = mind.long_term_memory.embedder_load_s
+    if embedder is not None:
+        table.add_row("embedder load", f"{embedder * 1000:.1f}")
+    if first_chunk_s is not None:
+        table.add_row("first chunk", f"{first_chunk_s * 1000:.1f}")
+    table.add_row("first step", f"{first_step_s * 1000:.1f}")
+    console.print(table)
+
+
+def _print_metrics(fmt: Optional[str]) -> None:
+    if fmt is None:
+        return
+    if fmt == "prom":
+        print(METRICS.to_prometheus(), end="")
+    else:
+        console.print_json(data=METRICS.to_dict())
+
+
+@app.callback(invoke_without_command=True)
+def run(
+    ctx: typer.Context,
+    prompt: Optional[str] = typer.Option(None, "--prompt", "-p"),
+    trace: bool = typer.Option(False, "--trace"),
+    lazy: bool = typer.Option(False, "--lazy", help="Open long-term memory lazily and warm the embedder in the background."),
+    profile_startup: bool = typer.Option(False, "--profile-startup", help="Report where startup time goes."),
+    metrics: Optional[str] = typer.Option(None, "--metrics", help="Print collected metrics on exit: 'json' or 'prom'."),
+):
+    if ctx.invoked_subcommand is not None:
+        return
+    config = MindConfig(ltm_startup="lazy", warm_embedder=True) if lazy else MindConfig()
+    mind = SyntheticMind(config=config, trace=trace)
+    # The mind is closed (and LTM saved) however the session ends.
+    try:
+        if prompt is None:
+            console.print(Panel.fit("Enter interactive mode. Type 'exit' to quit.", title="Synthetic Mind"))
+            while True:
+                try:
+                    user = console.input("[bold cyan]You[/]: ")
+                except (EOFError, KeyboardInterrupt):
+                    # Ctrl-D / Ctrl-C at the prompt end the session like 'exit'.
+                    console.print()
+                    break
+                if user.strip().lower() in {"exit", "quit"}:
+                    break
+                t0 = time.perf_counter()
+                first_chunk_s = None
+                # Parts print as they arrive; the episode is recorded after the last one.
+                for part in mind.step_stream(user):
+                    if first_chunk_s is None:
+                        first_chunk_s = time.perf_counter() - t0
+                        console.print(f"[bold green]Mind[/]: {escape(part)}", highlight=False)
+                    else:
+                        console.print(part, markup=False, highlight=False)
+                if profile_startup:
+                    _print_startup_profile(mind, time.perf_counter() - t0, first_chunk_s)
+                    profile_startup = False
+        else:
+            t0 = time.perf_counter()
+            response = mind.step(prompt)
+            if profile_startup:
+                _print_startup_profile(mind, time.perf_counter() - t0)
+            if trace:
+                console.rule("Trace JSON")
+                console.print_json(data=mind.last_trace)
+            console.print(response)
+    finally:
+        mind.close()
+    _print_metrics(metrics)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8765, "--port"),
+    workers: int = typer.Option(8, "--workers", help="Threads running mind steps."),
+    embed_batch: int = typer.Option(32, "--embed-batch", help="Max texts per shared embedding batch (0 disables)."),
+    embed_wait_ms: float = typer.Option(2.0, "--embed-wait-ms", help="Max time a request waits for its batch to fill."),
+    trace: bool = typer.Option(False, "--trace"),
+):
+    from synthetic_mind.server import serve as serve_http
+
+    console.print(Panel.fit(f"Serving on http://{host}:{port}", title="Synthetic Mind"))
+    config = MindConfig(embed_batch_max_size=embed_batch, embed_batch_max_wait_ms=embed_wait_ms)
+    serve_http(config, host=host, port=port, max_workers=workers, trace=trace)
+
+
+@app.command()
+def consolidate(
+    dedup_threshold: float = typer.Option(0.97, "--dedup-threshold", help="Cosine similarity at which episodes are merged."),
+    max_episodes: Optional[int] = typer.Option(None, "--max-episodes"),
+    max_age_days: Optional[float] = typer.Option(None, "--max-age-days"),
+    keep_tag: Optional[List[str]] = typer.Option(None, "--keep-tag", help="Never expire episodes with this tag (repeatable)."),
+    vacuum: bool = typer.Option(True, "--vacuum/--no-vacuum", help="Drop tombstoned episodes from storage when enough have piled up."),
+    force_vacuum: bool = typer.Option(False, "--force-vacuum", help="Vacuum regardless of the tombstone ratio."),
+    storage_dir: str = typer.Option("storage", "--storage-dir"),
+):
+    policy = ConsolidationPolicy(
+        dedup_threshold=dedup_threshold,
+        max_episodes=max_episodes,
+        max_age_days=max_age_days,
+        keep_tags=keep_tag or [],
+        vacuum_ratio=0.0 if force_vacuum else ConsolidationPolicy().vacuum_ratio,
+    )
+    ltm = create_long_term_memory(MindConfig(storage_dir=storage_dir))
+    try:
+        ltm.wait_for_index()
+        report = consolidate_ltm(ltm, policy, vacuum=vacuum)
+    finally:
+        ltm.close()
+    _print_report("Consolidation", report)
+
+
+def _print_report(title: str, report: dict) -> None:
+    table = Table(title=title)
+    table.add_column("metric")
+    table.add_column("value", justify="right")
+    for key, value in report.items():
+        table.add_row(key, f"{value:.2f}" if isinstance(value, float) else str(value))
+    console.print(table)
+
+
+@app.command("import")
+def import_(
+    source: str = typer.Argument(..., help="JSONL (optionally .gz) or parquet file of query/response/tags records."),
+    storage_dir: str = typer.Option("storage", "--storage-dir"),
+    embed_model: str = typer.Option(MindConfig().embed_model, "--embed-model"),
+    workers: int = typer.Option(0, "--workers", help="Embedding processes (0 embeds in this process)."),
+    chunk_rows: int = typer.Option(2048, "--chunk-rows", help="Records read and embedded together."),
+    checkpoint_rows: int = typer.Option(100_000, "--checkpoint-rows", help="Save and checkpoint after this many episodes."),
+    reuse_embeddings: bool = typer.Option(True, "--reuse-embeddings/--reembed", help="Use an 'embedding' field when its size matches the model."),
+    restart: bool = typer.Option(False, "--restart", help="Ignore an earlier checkpoint for this file."),
+):
+    # Interrupted imports resume from the last checkpoint on the next run with the same file.
+    ltm = create_long_term_memory(MindConfig(storage_dir=storage_dir, embed_model=embed_model))
+    policy = ImportPolicy(workers=workers, chunk_rows=chunk_rows, checkpoint_rows=checkpoint_rows, reuse_embeddings=reuse_embeddings)
+
+    def progress(state: dict) -> None:
+        rate = state["imported"] / state["elapsed_s"] if state["elapsed_s"] > 0 else 0.0
+        console.print(f"{state['resumed_at'] + state['records']:,} records, {state['imported']:,} episodes imported ({rate:,.0f}/s)")
+
+    try:
+        report = import_corpus(ltm, source, policy, restart=restart, progress=progress)
+    finally:
+        ltm.close()
+    _print_report("Import", report)
+
+
+@app.command("replay")
+def replay_(
+    transcripts: str = typer.Argument(..., help="Directory of .jsonl/.json/.txt transcripts (searched recursively)."),
+    snapshot: str = typer.Option("storage", "--snapshot", help="LTM storage directory, opened read-only."),
+    out: str = typer.Option("replay.parquet", "--out", "-o", help="Per-turn results (parquet)."),
+    workers: int = typer.Option(os.cpu_count() or 1, "--workers", help="Replay processes (0 runs in this process)."),
+    batch: int = typer.Option(8, "--batch", help="Transcripts per task handed to a worker."),
+    embed_model: str = typer.Option(MindConfig().embed_model, "--embed-model"),
+    trace: bool = typer.Option(True, "--trace/--no-trace", help="Store each turn's trace as JSON."),
+):
+    from synthetic_mind.replay import replay as replay_transcripts
+
+    last = [0.0]
+
+    def progress(state: dict) -> None:
+        if state["elapsed_s"] - last[0] >= 5.0:
+            last[0] = state["elapsed_s"]
+            console.print(f"{state['turns']:,} turns ({state['turns'] / state['elapsed_s']:,.0f}/s)")
+
+    report = replay_transcripts(transcripts, snapshot, out, MindConfig(embed_model=embed_model), workers=workers, batch=batch, trace=trace, progress=progress)
+    _print_report("Replay", report)
+
+
+@app.command()
+def export(
+    target: str = typer.Argument(..., help="Output .jsonl[.gz] or .parquet file."),
+    storage_dir: str = typer.Option("storage", "--storage-dir"),
+    chunk_rows: int = typer.Option(8192, "--chunk-rows"),
+    embeddings: bool = typer.Option(True, "--embeddings/--no-embeddings"),
+):
+    # Reads saved segments directly; run after the writers have saved.
+    _print_report("Export", export_corpus(storage_dir, target, chunk_rows=chunk_rows, embeddings=embeddings))
+
+
+if __name__ == "__main__":
+    app()
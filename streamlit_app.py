@@ -1,41 +1,58 @@
-import json
-import streamlit as st
-
-from synthetic_mind.core import SyntheticMind
-
-st.set_page_config(page_title="Synthetic Mind", page_icon="🧠", layout="wide")
-
-if "mind" not in st.session_state:
-    st.session_state.mind = SyntheticMind(trace=True)
-
-st.title("🧠 Synthetic Mind")
-
-with st.sidebar:
-    st.header("Meta-Turing Probes")
-    if st.button("Why did you say that?"):
-        st.session_state.last_probe = st.session_state.mind.why_did_you_say()
-    if st.button("What don't you know?"):
-        st.session_state.last_probe = st.session_state.mind.what_dont_you_know()
-    if st.button("Summarize chain-of-thought"):
-        st.session_state.last_probe = st.session_state.mind.summarize_chain_of_thought()
-    st.markdown("---")
-    st.write(st.session_state.get("last_probe", ""))
-
-col1, col2 = st.columns([3, 2])
-with col1:
-    st.subheader("Chat")
-    if "history" not in st.session_state:
-        st.session_state.history = []
-    user = st.text_input("You", value="", placeholder="Type a message and press Enter")
-    if user:
-        reply = st.session_state.mind.step(user)
-        st.session_state.history.append((user, reply))
-        st.rerun()
-    for u, r in reversed(st.session_state.history[-20:]):
-        st.markdown(f"**You**: {u}")
-        st.markdown(f"**Mind**: {r}")
-
-with col2:
-    st.subheader("Trace")
-    trace = getattr(st.session_state.mind, "last_trace", {})
-    st.json(trace)
+import json
+import streamlit as st
+
+from synthetic_mind.action.effectors import ANSWER_SEPARATOR
+from synthetic_mind.core import MindConfig, SyntheticMind, create_long_term_memory
+from synthetic_mind.metrics import METRICS
+
+st.set_page_config(page_title="Synthetic Mind", page_icon="🧠", layout="wide")
+
+
+# One long-term memory per process, shared by every browser session (like MindServer):
+# the storage directory takes a single writer.
+@st.cache_resource
+def shared_long_term_memory():
+    return create_long_term_memory(MindConfig())
+
+
+if "mind" not in st.session_state:
+    st.session_state.mind = SyntheticMind(trace=True, long_term_memory=shared_long_term_memory())
+
+st.title("🧠 Synthetic Mind")
+
+with st.sidebar:
+    st.header("Meta-Turing Probes")
+    if st.button("Why did you say that?"):
+        st.session_state.last_probe = st.session_state.mind.why_did_you_say()
+    if st.button("What don't you know?"):
+        st.session_state.last_probe = st.session_state.mind.what_dont_you_know()
+    if st.button("Summarize chain-of-thought"):
+        st.session_state.last_probe = st.session_state.mind.summarize_chain_of_thought()
+    st.markdown("---")
+    st.write(st.session_state.get("last_probe", ""))
+    st.markdown("---")
+    with st.expander("Metrics"):
+        st.json(METRICS.to_dict())
+        st.download_button("Prometheus text", METRICS.to_prometheus(), file_name="metrics.prom")
+
+col1, col2 = st.columns([3, 2])
+with col1:
+    st.subheader("Chat")
+    if "history" not in st.session_state:
+        st.session_state.history = []
+    user = st.text_input("You", value="", placeholder="Type a message and press Enter")
+    if user:
+        st.markdown(f"**You**: {user}")
+        # write_stream renders each answer part as it arrives and returns the joined text.
+        parts = st.session_state.mind.step_stream(user)
+        reply = st.write_stream(p if i == 0 else ANSWER_SEPARATOR + p for i, p in enumerate(parts))
+        st.session_state.history.append((user, reply))
+        st.rerun()
+    for u, r in reversed(st.session_state.history[-20:]):
+        st.markdown(f"**You**: {u}")
+        st.markdown(f"**Mind**: {r}")
+
+with col2:
+    st.subheader("Trace")
+    trace = getattr(st.session_state.mind, "last_trace", {})
+    st.json(trace)
@@ -1,3 +1,3 @@
-from .core import SyntheticMind
-
-__all__ = ["SyntheticMind"]
+from .core import SyntheticMind
+
+__all__ = ["SyntheticMind"]
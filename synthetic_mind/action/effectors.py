@@ -1,68 +1,75 @@
-from __future__ import annotations
-
-import ast
-import builtins
-from typing import Optional
-import requests
-
-from ..types import Action, Thought
-from ..goals.drives import GoalSystem
-
-
-SAFE_BUILTINS = {
-    k: getattr(builtins, k)
-    for k in ["abs", "min", "max", "sum", "len", "range", "enumerate", "sorted", "map", "filter", "any", "all"]
-}
-
-
-class ActionExecutor:
-    def __init__(self) -> None:
-        self.tools_enabled = True
-
-    def decide(self, thought: Thought) -> Action:
-        return Action(kind="say", payload=thought.proposal)
-
-    def execute(self, action: Action) -> str:
-        if action.kind == "say":
-            return action.payload
-        if action.kind == "web_search":
-            return self._web_search(action.payload)
-        if action.kind == "code_exec":
-            return self._safe_exec(action.payload)
-        return f"[unhandled action: {action.kind}]"
-
-    def _web_search(self, query: str) -> str:
-        try:
-            r = requests.get("https://duckduckgo.com/html/", params={"q": query}, timeout=8)
-            text = r.text
-            # very naive extract of first result snippet
-            start = text.find("result__snippet")
-            if start != -1:
-                snippet = text[start : start + 300]
-                return f"Search snippet: {snippet}"
-            return "No snippet extracted."
-        except Exception as e:
-            return f"Search error: {e}"
-
-    def _safe_exec(self, code: str) -> str:
-        try:
-            ast.parse(code)  # syntax check
-            env: dict = {"__builtins__": SAFE_BUILTINS}
-            exec(code, env, env)
-            result = env.get("result")
-            return f"Code result: {result}"
-        except Exception as e:
-            return f"Exec error: {e}"
-
-    def compose_full_answer(self, base: str, rationale: str, uncertainty: Optional[float] = None) -> str:
-        parts = [base]
-        parts.append(f"Reasoning: {rationale}")
-        if uncertainty is not None:
-            if uncertainty > 0.6:
-                parts.append("I am uncertain; I propose to gather more context.")
-            elif uncertainty > 0.3:
-                parts.append("I am moderately confident; I welcome correction.")
-            else:
-                parts.append("I am confident in this answer.")
-        parts.append("Would you like to go deeper or explore related questions?")
-        return " \n".join(parts)
+from __future__ import annotations
+
+import ast
+import asyncio
+import builtins
+from typing import Iterator, Optional
+
+from ..types import Action, Thought
+from ..goals.drives import GoalSystem
+from .sandbox import SAFE_BUILTIN_NAMES, SandboxPool, shared_sandbox
+from .web import WebClient, shared_web_client
+
+
+SAFE_BUILTINS = {k: getattr(builtins, k) for k in SAFE_BUILTIN_NAMES}
+
+# compose_full_answer joins the parts from iter_answer_parts with this.
+ANSWER_SEPARATOR = " \n"
+
+
+class ActionExecutor:
+    def __init__(self, sandbox: Optional[SandboxPool] = None, web: Optional[WebClient] = None) -> None:
+        self.tools_enabled = True
+        # code_exec runs in this pool's worker processes, never in the caller's.
+        self.sandbox = sandbox
+        self.web = web
+
+    def decide(self, thought: Thought) -> Action:
+        return Action(kind="say", payload=thought.proposal)
+
+    def execute(self, action: Action) -> str:
+        if action.kind == "say":
+            return action.payload
+        if action.kind == "web_search":
+            return self._web_search(action.payload)
+        if action.kind == "code_exec":
+            return self._safe_exec(action.payload)
+        return f"[unhandled action: {action.kind}]"
+
+    async def aexecute(self, action: Action) -> str:
+        # Lets several web searches, or a search and other work, overlap on one event loop.
+        if action.kind == "web_search":
+            return await self._web().asearch(action.payload)
+        return await asyncio.get_running_loop().run_in_executor(None, self.execute, action)
+
+    def _web(self) -> WebClient:
+        if self.web is None:
+            self.web = shared_web_client()
+        return self.web
+
+    def _web_search(self, query: str) -> str:
+        return self._web().search(query)
+
+    def _safe_exec(self, code: str) -> str:
+        try:
+            ast.parse(code)  # syntax check
+        except SyntaxError as e:
+            return f"Exec error: {e}"
+        if self.sandbox is None:
+            self.sandbox = shared_sandbox()
+        return self.sandbox.run(code)
+
+    def iter_answer_parts(self, base: str, rationale: str, uncertainty: Optional[float] = None) -> Iterator[str]:
+        yield base
+        yield f"Reasoning: {rationale}"
+        if uncertainty is not None:
+            if uncertainty > 0.6:
+                yield "I am uncertain; I propose to gather more context."
+            elif uncertainty > 0.3:
+                yield "I am moderately confident; I welcome correction."
+            else:
+                yield "I am confident in this answer."
+        yield "Would you like to go deeper or explore related questions?"
+
+    def compose_full_answer(self, base: str, rationale: str, uncertainty: Optional[float] = None) -> str:
+        return ANSWER_SEPARATOR.join(self.iter_answer_parts(base, rationale, uncertainty))
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import multiprocessing as mp
+import queue
+import signal
+import threading
+import time
+
+from pydantic import BaseModel
+
+from ..metrics import METRICS
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+SAFE_BUILTIN_NAMES = ["abs", "min", "max", "sum", "len", "range", "enumerate", "sorted", "map", "filter", "any", "all"]
+
+
+class SandboxPolicy(BaseModel):
+    workers: int = 2
+    timeout_s: float = 2.0  # wall clock per call, from handing the snippet to a worker
+    cpu_s: int = 1  # CPU seconds per call (RLIMIT_CPU); the worker is killed past it
+    memory_mb: int = 256  # address space a call may add on top of the idle worker (RLIMIT_AS)
+    max_output_chars: int = 2000
+    cache_entries: int = 256  # results of identical snippets; 0 disables
+
+
+def _limit_memory(memory_mb: int) -> None:
+    # The budget is relative to the worker's own footprint, which already includes the
+    # interpreter and whatever the forkserver preloaded.
+    try:
+        with open("/proc/self/statm") as f:
+            size = int(f.read().split()[0]) * resource.getpagesize()
+    except OSError:
+        return
+    limit = size + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _limit_cpu(cpu_s: int) -> None:
+    # RLIMIT_CPU counts the process lifetime in whole seconds, so each call moves the soft
+    # limit to "used so far, rounded up, + cpu_s": a reused worker never gets less than
+    # cpu_s. Passing the soft limit raises SIGXCPU, which kills the worker.
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime) + cpu_s
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.RLIM_INFINITY))
+
+
+def _run_snippet(code: str, max_chars: int) -> str:
+    import builtins
+
+    try:
+        compiled = compile(code, "<sandbox>", "exec")
+        env: Dict[str, Any] = {"__builtins__": {k: getattr(builtins, k) for k in SAFE_BUILTIN_NAMES}}
+        exec(compiled, env, env)
+        return f"Code result: {env.get('result')}"[:max_chars]
+    except MemoryError:
+        return "Exec error: memory limit exceeded"
+    except Exception as e:
+        return f"Exec error: {e}"[:max_chars]
+
+
+def _worker_main(conn: Any, policy: Dict[str, Any]) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None:
+        _limit_memory(policy["memory_mb"])
+    while True:
+        try:
+            code = conn.recv()
+        except EOFError:
+            break
+        if code is None:
+            break
+        if resource is not None:
+            _limit_cpu(policy["cpu_s"])
+        conn.send(_run_snippet(code, policy["max_output_chars"]))
+
+
+def _context() -> Any:
+    # Workers fork from a forkserver that has imported this module once, so a fresh worker
+    # costs a fork rather than an interpreter start, and never inherits the caller's
+    # threads or locks.
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return mp.get_context("spawn")
+
+
+class _Worker:
+    def __init__(self, ctx: Any, policy: SandboxPolicy) -> None:
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, policy.model_dump()), name="sandbox-worker", daemon=True)
+        self.process.start()
+        child.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+# Runs untrusted snippets in warm worker processes with only SAFE_BUILTIN_NAMES available.
+# Each call is bounded by a wall-clock timeout and per-call CPU and memory rlimits. A worker
+# that times out or dies is killed and replaced, and the other workers keep serving.
+# Snippets cannot import or do I/O, so equal code gives an equal result, and every
+# outcome except a timeout or kill is cached. A closed pool refuses further calls.
+class SandboxPool:
+    def __init__(self, policy: Optional[SandboxPolicy] = None) -> None:
+        self.policy = policy or SandboxPolicy()
+        self._ctx = _context()
+        # None is the closed marker: close() puts one, and every caller that takes it puts it back.
+        self._idle: "queue.Queue[Optional[_Worker]]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._started = False
+        self._closed = False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("sandbox pool is closed")
+            if self._started:
+                return
+            for _ in range(self.policy.workers):
+                self._add_worker()
+            self._started = True
+
+    def _add_worker(self) -> None:
+        worker = _Worker(self._ctx, self.policy)
+        self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+                self._add_worker()
+
+    def run(self, code: str) -> str:
+        if self._closed:
+            raise RuntimeError("sandbox pool is closed")
+        cached = self._cached(code)
+        if cached is not None:
+            METRICS.inc("sandbox_exec_total", labels={"result": "cached"})
+            return cached
+        self.start()
+        t0 = time.perf_counter()
+        worker = self._idle.get()
+        if worker is None:
+            self._idle.put(None)
+            raise RuntimeError("sandbox pool is closed")
+        result, outcome = self._call(worker, code)
+        METRICS.observe("sandbox_exec_seconds", time.perf_counter() - t0)
+        METRICS.inc("sandbox_exec_total", labels={"result": outcome})
+        if outcome in ("ok", "error") and self.policy.cache_entries > 0:
+            with self._lock:
+                self._cache[code] = result
+                if len(self._cache) > self.policy.cache_entries:
+                    self._cache.popitem(last=False)
+        return result
+
+    def _call(self, worker: _Worker, code: str) -> Tuple[str, str]:
+        try:
+            worker.conn.send(code)
+            if worker.conn.poll(self.policy.timeout_s):
+                result = worker.conn.recv()
+                self._idle.put(worker)
+                return result, "error" if result.startswith("Exec error") else "ok"
+            self._replace(worker)
+            return f"Exec error: timed out after {self.policy.timeout_s:g}s", "timeout"
+        except (EOFError, OSError):
+            worker.process.join(timeout=1.0)
+            exitcode = worker.process.exitcode
+            self._replace(worker)
+            if exitcode is not None and exitcode == -getattr(signal, "SIGXCPU", 0):
+                return f"Exec error: CPU limit of {self.policy.cpu_s}s exceeded", "killed"
+            return f"Exec error: sandbox worker exited ({exitcode})", "killed"
+
+    def _cached(self, code: str) -> Optional[str]:
+        if self.policy.cache_entries <= 0:
+            return None
+        with self._lock:
+            result = self._cache.get(code)
+            if result is not None:
+                self._cache.move_to_end(code)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": len(self._workers), "idle": self._idle.qsize(), "cached": len(self._cache)}
+
+    def close(self) -> None:
+        # Callers waiting for a worker wake up and raise; calls already running finish or
+        # fail with their worker.
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._closed = True
+        self._idle.put(None)
+        for worker in workers:
+            worker.stop()
+
+
+_SHARED: Dict[str, SandboxPool] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_sandbox(policy: Optional[SandboxPolicy] = None) -> SandboxPool:
+    # One pool per distinct policy per process, shared by every mind and session. Workers
+    # start on first use.
+    policy = policy or SandboxPolicy()
+    key = policy.model_dump_json()
+    with _SHARED_LOCK:
+        pool = _SHARED.get(key)
+        if pool is None:
+            pool = _SHARED[key] = SandboxPool(policy)
+        return pool
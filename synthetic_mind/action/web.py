@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from pydantic import BaseModel
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..memory.embed_cache import normalize_text
+from ..metrics import METRICS
+
+
+class WebPolicy(BaseModel):
+    endpoint: str = "https://duckduckgo.com/html/"  # point at a local stand-in to benchmark
+    query_param: str = "q"
+    connect_timeout_s: float = 3.0
+    read_timeout_s: float = 8.0
+    pool_size: int = 8  # kept-alive connections per host
+    max_concurrency: int = 4  # requests in flight at once, across all callers
+    cache_dir: Optional[str] = None  # on-disk response cache; None keeps results in memory only
+    cache_ttl_s: float = 24 * 3600.0
+    memory_entries: int = 4096  # in-process cache, least recently used evicted first; 0 disables
+    user_agent: str = "synthetic-mind/0.1"
+
+
+def extract_snippet(html: str) -> str:
+    # very naive extract of first result snippet
+    start = html.find("result__snippet")
+    if start != -1:
+        return f"Search snippet: {html[start : start + 300]}"
+    return "No snippet extracted."
+
+
+# Search client for the web_search action. One requests.Session keeps TLS connections
+# alive across calls. A semaphore caps requests in flight. Identical concurrent queries
+# share a single request. Successful answers are cached per normalized query for
+# cache_ttl_s, in memory up to memory_entries and on disk when cache_dir is set; errors
+# are never cached.
+class WebClient:
+    def __init__(self, policy: Optional[WebPolicy] = None) -> None:
+        self.policy = policy or WebPolicy()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.policy.pool_size, pool_maxsize=self.policy.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = self.policy.user_agent
+        self._slots = threading.BoundedSemaphore(self.policy.max_concurrency)
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def key(self, query: str) -> str:
+        text = f"{self.policy.endpoint}\0{normalize_text(query).lower()}"
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def search(self, query: str) -> str:
+        k = self.key(query)
+        cached = self._cache_get(k)
+        if cached is not None:
+            METRICS.inc("web_search_total", labels={"result": "cached"})
+            return cached
+        with self._lock:
+            fut = self._inflight.get(k)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[k] = Future()
+        if not owner:
+            METRICS.inc("web_search_total", labels={"result": "shared"})
+            return fut.result()
+        try:
+            try:
+                text, ok = self._fetch(query)
+            except BaseException as e:
+                fut.set_exception(e)
+                raise
+            # Waiters get the answer before the cache write, which may be slow or fail.
+            fut.set_result(text)
+            if ok:
+                self._cache_put(k, text)
+            return text
+        finally:
+            with self._lock:
+                del self._inflight[k]
+
+    def _fetch(self, query: str) -> Tuple[str, bool]:
+        t0 = time.perf_counter()
+        try:
+            with self._slots:
+                r = self.session.get(
+                    self.policy.endpoint,
+                    params={self.policy.query_param: query},
+                    timeout=(self.policy.connect_timeout_s, self.policy.read_timeout_s),
+                )
+                r.raise_for_status()
+                text = r.text
+            METRICS.inc("web_search_total", labels={"result": "fetched"})
+            return extract_snippet(text), True
+        except Exception as e:
+            METRICS.inc("web_search_total", labels={"result": "error"})
+            return f"Search error: {e}", False
+        finally:
+            METRICS.observe("web_search_seconds", time.perf_counter() - t0)
+
+    def search_many(self, queries: List[str]) -> List[str]:
+        return list(self._pool().map(self.search, queries))
+
+    async def asearch(self, query: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), self.search, query)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.policy.max_concurrency, thread_name_prefix="web-search")
+            return self._executor
+
+    # Cache
+    def _path(self, k: str) -> str:
+        return os.path.join(self.policy.cache_dir, k[:2], k + ".json")
+
+    def _cache_get(self, k: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(k)
+            if hit is not None:
+                self._memory.move_to_end(k)
+        if hit is not None and now - hit[0] < self.policy.cache_ttl_s:
+            return hit[1]
+        if not self.policy.cache_dir:
+            return None
+        try:
+            with open(self._path(k), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - entry["ts"] >= self.policy.cache_ttl_s:
+            return None
+        self._remember(k, entry["ts"], entry["text"])
+        return entry["text"]
+
+    def _remember(self, k: str, ts: float, text: str) -> None:
+        if self.policy.memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[k] = (ts, text)
+            self._memory.move_to_end(k)
+            while len(self._memory) > self.policy.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _cache_put(self, k: str, text: str) -> None:
+        ts = time.time()
+        self._remember(k, ts, text)
+        if not self.policy.cache_dir:
+            return
+        # The disk copy is best effort: a full or read-only cache_dir only costs refetches.
+        path = self._path(k)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"ts": ts, "text": text}, f)
+            os.replace(tmp, path)
+        except OSError:
+            METRICS.inc("web_cache_write_errors_total")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def prune(self) -> int:
+        # Drops expired entries from memory and disk; returns how many files were removed.
+        cutoff = time.time() - self.policy.cache_ttl_s
+        with self._lock:
+            self._memory = OrderedDict((k, v) for k, v in self._memory.items() if v[0] >= cutoff)
+        removed = 0
+        if not self.policy.cache_dir:
+            return removed
+        for root, _, files in os.walk(self.policy.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.session.close()
+
+
+_SHARED: Dict[str, WebClient] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_web_client(policy: Optional[WebPolicy] = None) -> WebClient:
+    # One client (connection pool, cache, concurrency limit) per distinct policy per process.
+    policy = policy or WebPolicy()
+    key = policy.model_dump_json()
+    with _SHARED_LOCK:
+        client = _SHARED.get(key)
+        if client is None:
+            client = _SHARED[key] = WebClient(policy)
+        return client
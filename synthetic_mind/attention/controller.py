@@ -1,26 +1,89 @@
-from __future__ import annotations
-
-from typing import List
-
-from ..memory.working import WorkingMemory
-from ..types import Experience
-from ..goals.drives import GoalSystem
-from ..memory.long_term import LongTermMemory
-
-
-class AttentionController:
-    def __init__(self) -> None:
-        pass
-
-    def select(self, wm: WorkingMemory, goals: GoalSystem, k: int = 4) -> List[Experience]:
-        return wm.topk(k)
-
-    def select_with_retrieval(self, wm: WorkingMemory, goals: GoalSystem, ltm: LongTermMemory, query: str, k: int = 6) -> List[Experience]:
-        wm_items = wm.topk(max(2, k // 2))
-        retrieved = ltm.search(query, top_k=max(2, k))
-        exps: List[Experience] = list(wm_items)
-        for idx, score in retrieved[: max(1, k - len(exps))]:
-            ep = ltm.episodes[idx]
-            content = f"LT:{score:.2f} Q:{ep['query']} A:{ep['response']}"
-            exps.append(Experience(id=f"ltm-{idx}", content=content, saliency=min(1.0, 0.4 + score * 0.6)))
-        return exps[:k]
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..memory.working import WorkingMemory
+from ..types import Experience
+from ..goals.drives import GoalSystem
+from ..memory.embed_cache import normalize_text
+from ..memory.long_term import LongTermMemory
+from ..metrics import METRICS
+
+
+class _Retrieval:
+    def __init__(self, ltm: LongTermMemory, generation: int, rows: int, q: Optional[np.ndarray], hits: List[Tuple[int, float]]) -> None:
+        self.ltm = ltm
+        self.generation = generation
+        self.rows = rows
+        self.q = q
+        self.hits = hits
+        self.experiences: Dict[int, Experience] = {}
+
+
+class AttentionController:
+    def __init__(self, cache_size: int = 256) -> None:
+        # Retrieval results keyed by (normalized query, k). An entry stays valid while the
+        # LTM generation is unchanged; episodes appended since are scored incrementally.
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], _Retrieval]" = OrderedDict()
+
+    def select(self, wm: WorkingMemory, goals: GoalSystem, k: int = 4) -> List[Experience]:
+        return wm.topk(k)
+
+    def select_with_retrieval(self, wm: WorkingMemory, goals: GoalSystem, ltm: LongTermMemory, query: str, k: int = 6) -> List[Experience]:
+        wm_items = wm.topk(max(2, k // 2))
+        exps: List[Experience] = list(wm_items)
+        want = max(1, k - len(exps))
+        # Hits are resolved at the generation they were found at. If a vacuum or load
+        # renumbered rows in between, the retrieval is redone once, then LTM is skipped.
+        for _ in range(2):
+            entry = self._retrieve(ltm, query, max(2, k))
+            hits = entry.hits[:want]
+            missing = [idx for idx, _ in hits if idx not in entry.experiences]
+            found = ltm.episodes_at(missing, entry.generation) if missing else []
+            if found is not None:
+                break
+        else:
+            return exps[:k]
+        scores = dict(hits)
+        for idx, ep in zip(missing, found):
+            score = scores[idx]
+            content = f"LT:{score:.2f} Q:{ep['query']} A:{ep['response']}"
+            entry.experiences[idx] = Experience(id=f"ltm-{idx}", content=content, saliency=min(1.0, 0.4 + score * 0.6))
+        exps.extend(entry.experiences[idx] for idx, _ in hits)
+        return exps[:k]
+
+    def _retrieve(self, ltm: LongTermMemory, query: str, top_k: int) -> _Retrieval:
+        if self.cache_size <= 0:
+            hits, q, rows, generation = ltm.search_at(query, top_k=top_k)
+            return _Retrieval(ltm, generation, rows, q, hits)
+        key = (normalize_text(query), top_k)
+        entry = self._cache.get(key)
+        if entry is not None and entry.ltm is ltm and entry.generation == ltm.generation and entry.rows <= len(ltm.episodes):
+            self._cache.move_to_end(key)
+            if entry.rows == len(ltm.episodes):
+                METRICS.inc("attention_retrieval_cache_total", labels={"result": "hit"})
+                return entry
+            # Merge the cached top-k with the best of the rows appended since. Entries answered
+            # without a query vector (lexical retrieval) are recomputed instead.
+            if entry.q is not None:
+                fresh, rows, generation = ltm.search_range_at(entry.q, entry.rows, top_k)
+                if generation == entry.generation:
+                    entry.hits = sorted(entry.hits + fresh, key=lambda h: -h[1])[:top_k]
+                    entry.rows = rows
+                    METRICS.inc("attention_retrieval_cache_total", labels={"result": "incremental"})
+                    return entry
+        METRICS.inc("attention_retrieval_cache_total", labels={"result": "miss"})
+        hits, q, rows, generation = ltm.search_at(query, top_k=top_k)
+        entry = _Retrieval(ltm, generation, rows, q, hits)
+        if rows:
+            self._cache[key] = entry
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
@@ -1,110 +1,318 @@
-from __future__ import annotations
-
-from typing import Any, Dict, List, Optional
-from pydantic import BaseModel
-
-from .types import Experience, Thought, Action
-from .memory.working import WorkingMemory
-from .attention.controller import AttentionController
-from .reasoning.engine import ReasoningEngine
-from .action.effectors import ActionExecutor
-from .self_model.model import SelfModel
-from .goals.drives import GoalSystem
-from .memory.long_term import LongTermMemory
-
-
-class MindConfig(BaseModel):
-    working_memory_capacity: int = 8
-    storage_dir: Optional[str] = "storage"
-    save_every_n_steps: int = 3
-
-
-class SyntheticMind:
-    def __init__(self, config: Optional[MindConfig] = None, trace: bool = False) -> None:
-        self.config = config or MindConfig()
-        self.trace_enabled = trace
-        self.working_memory = WorkingMemory(capacity=self.config.working_memory_capacity)
-        self.attention = AttentionController()
-        self.reasoning = ReasoningEngine()
-        self.action = ActionExecutor()
-        self.self_model = SelfModel()
-        self.goals = GoalSystem()
-        self.long_term_memory = LongTermMemory(storage_dir=self.config.storage_dir)
-        self.long_term_memory.load()
-        self.last_trace: Dict[str, Any] = {}
-        self._steps = 0
-
-    def ingest(self, text: str) -> Experience:
-        exp = Experience.from_text(text)
-        self.working_memory.add(exp)
-        return exp
-
-    def _is_trivial(self, text: str) -> bool:
-        t = text.strip().lower()
-        if len(t) <= 24 and any(greet in t for greet in ["hi", "hello", "hey", "how are you", "what's up", "sup", "yo", "good morning", "good evening"]):
-            return True
-        return False
-
-    def step(self, text: str) -> str:
-        exp = self.ingest(text)
-        self.self_model.note_state(current_intent="respond_to_prompt", observation=text)
-
-        trivial = self._is_trivial(text)
-        if trivial:
-            spotlight: List[Experience] = self.attention.select(self.working_memory, self.goals)
-        else:
-            spotlight = self.attention.select_with_retrieval(self.working_memory, self.goals, self.long_term_memory, query=text)
-
-        self.self_model.assess_contradictions([e.content for e in spotlight])
-        thought: Thought = self.reasoning.think(spotlight, self.self_model, self.long_term_memory)
-        composed = self.action.compose_full_answer(thought.proposal, thought.rationale, self.self_model.snapshot().get("uncertainty"))
-        action: Action = Action(kind="say", payload= composed)
-        output: str = self.action.execute(action)
-        self.working_memory.reinforce(spotlight, delta=0.1)
-        tags = self._extract_tags(text)
-        self.long_term_memory.record_episode(query=text, response=output, thought=thought, tags=tags)
-        self._steps += 1
-        if not trivial and (self._steps % self.config.save_every_n_steps == 0):
-            self.long_term_memory.save()
-        if self.trace_enabled:
-            self.last_trace = {
-                "input": text,
-                "spotlight": [e.summary() for e in spotlight],
-                "thought": thought.model_dump(),
-                "action": action.model_dump(),
-                "self_model": self.self_model.snapshot(),
-                "tags": tags,
-                "trivial": trivial,
-            }
-        return output
-
-    def why_did_you_say(self) -> str:
-        if not self.last_trace:
-            return "No prior action to explain."
-        t = self.last_trace.get("thought", {})
-        return f"Because: {t.get('rationale', 'no rationale')}"
-
-    def what_dont_you_know(self) -> str:
-        if not self.last_trace:
-            return "I don't know yet; I need an input."
-        u = self.self_model.snapshot().get("uncertainty", 0.2)
-        if u > 0.6:
-            return "I am uncertain about the premises and need clarification or evidence."
-        if u > 0.3:
-            return "I may be missing constraints; providing more details can help."
-        return "I am confident about the last topic, but open to counterpoints."
-
-    def summarize_chain_of_thought(self) -> str:
-        if not self.last_trace:
-            return "No chain available."
-        t = self.last_trace.get("thought", {})
-        spot = ", ".join(s.get("content", "")[:60] for s in self.last_trace.get("spotlight", [])[:3])
-        return f"I focused on: {spot}. Rationale: {t.get('rationale', '')}. Plan: answer, verify, then ask a follow-up."
-
-    def _extract_tags(self, text: str) -> List[str]:
-        tags: List[str] = []
-        lower = text.lower()
-        for key in ["math", "reason", "self", "who", "what", "why", "how", "goal", "philosophy", "ethics", "science", "coding"]:
-            if key in lower:
-                tags.append(key)
-        return tags
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import copy
+import os
+import time
+from pydantic import BaseModel, Field
+
+from .types import Experience, Thought, Action
+from .memory.working import WorkingMemory
+from .attention.controller import AttentionController
+from .reasoning.engine import ReasoningEngine
+from .reasoning.matcher import Hits, RuleRegistry
+from .action.effectors import ANSWER_SEPARATOR, ActionExecutor
+from .action.sandbox import SandboxPolicy, shared_sandbox
+from .action.web import WebPolicy, shared_web_client
+from .self_model.model import SelfModel
+from .goals.drives import GoalSystem
+from .memory.long_term import LongTermMemory
+from .memory.sharded import ShardedLongTermMemory
+from .memory.ann import IndexPolicy
+from .memory.lexical import RetrievalPolicy
+from .memory.consolidation import ConsolidationPolicy, Consolidator
+from .memory.writer import BackgroundWriter
+from .metrics import METRICS, Spans
+
+
+class MindConfig(BaseModel):
+    working_memory_capacity: int = 8
+    storage_dir: Optional[str] = "storage"
+    embed_model: str = "sentence-transformers/all-MiniLM-L6-v2"  # "hashing" for the offline stand-in
+    save_every_n_steps: int = 3
+    ltm_compact_after_segments: int = 8
+    ltm_mmap: bool = False
+    ltm_index: IndexPolicy = Field(default_factory=IndexPolicy)
+    ltm_retrieval: RetrievalPolicy = Field(default_factory=RetrievalPolicy)  # "vector" | "lexical" (BM25) | "hybrid" | "auto"
+    embed_cache_entries: int = 4096
+    embed_cache_bytes: Optional[int] = None
+    embed_cache_persist: bool = False
+    embed_batch_max_size: int = 0  # >1 enables cross-caller micro-batching
+    embed_batch_max_wait_ms: float = 2.0
+    write_behind: bool = False
+    write_queue_size: int = 256
+    ltm_startup: str = "eager"  # "eager" | "lazy"
+    ltm_shards: int = 0  # >1 splits LTM over that many worker processes
+    ltm_shard_by: str = "hash"  # "hash" (of the query) | "time"
+    warm_embedder: bool = False
+    rules_path: Optional[str] = None  # JSON file with extra rules, tags and greetings
+    consolidation: Optional[ConsolidationPolicy] = None  # background dedup/retention passes over LTM
+    retrieval_cache_size: int = 256  # cached LTM retrievals per mind; 0 disables
+    sandbox: SandboxPolicy = Field(default_factory=SandboxPolicy)  # worker pool for code_exec actions, shared per process
+    web: WebPolicy = Field(default_factory=WebPolicy)  # web_search endpoint, pool and cache; cache_dir defaults to <storage_dir>/web_cache
+    metrics: bool = True  # per-stage step timings; METRICS.enabled = False turns off all recording
+
+
+def create_long_term_memory(config: MindConfig) -> LongTermMemory:
+    kwargs: Dict[str, Any] = dict(
+        model_name=config.embed_model,
+        storage_dir=config.storage_dir,
+        compact_after=config.ltm_compact_after_segments,
+        mmap_mode="r" if config.ltm_mmap else None,
+        index_policy=config.ltm_index,
+        retrieval=config.ltm_retrieval,
+        cache_entries=config.embed_cache_entries,
+        cache_bytes=config.embed_cache_bytes,
+        persist_cache=config.embed_cache_persist,
+        batch_max_size=config.embed_batch_max_size,
+        batch_max_wait_ms=config.embed_batch_max_wait_ms,
+    )
+    if config.ltm_shards > 1:
+        ltm = ShardedLongTermMemory(shards=config.ltm_shards, shard_by=config.ltm_shard_by, **kwargs)
+    else:
+        ltm = LongTermMemory(**kwargs)
+    ltm.load(lazy=config.ltm_startup == "lazy")
+    if config.warm_embedder:
+        ltm.warm_embedder()
+    return ltm
+
+
+class SyntheticMind:
+    def __init__(
+        self,
+        config: Optional[MindConfig] = None,
+        trace: bool = False,
+        long_term_memory: Optional[LongTermMemory] = None,
+    ) -> None:
+        # Passing long_term_memory shares one store (and its embedder) between minds;
+        # the caller then owns it and close() leaves it open.
+        t0 = time.perf_counter()
+        self.config = config or MindConfig()
+        self.trace_enabled = trace
+        self.working_memory = WorkingMemory(capacity=self.config.working_memory_capacity)
+        self.attention = AttentionController(cache_size=self.config.retrieval_cache_size)
+        # One keyword registry serves rules, tag extraction and greeting detection.
+        self.rules = RuleRegistry()
+        if self.config.rules_path:
+            self.rules.load(self.config.rules_path)
+        self.reasoning = ReasoningEngine(self.rules)
+        web = self.config.web
+        if web.cache_dir is None and self.config.storage_dir:
+            web = web.model_copy(update={"cache_dir": os.path.join(self.config.storage_dir, "web_cache")})
+        self.action = ActionExecutor(sandbox=shared_sandbox(self.config.sandbox), web=shared_web_client(web))
+        self.self_model = SelfModel()
+        self.goals = GoalSystem()
+        self._owns_ltm = long_term_memory is None
+        t1 = time.perf_counter()
+        self.long_term_memory = long_term_memory or create_long_term_memory(self.config)
+        t2 = time.perf_counter()
+        self._writer: Optional[BackgroundWriter] = None
+        if self.config.write_behind:
+            self._writer = BackgroundWriter(self.long_term_memory, max_queue=self.config.write_queue_size)
+        # A shared store is consolidated by its owner (e.g. MindServer), not by each mind.
+        self.consolidator: Optional[Consolidator] = None
+        if self.config.consolidation is not None and self._owns_ltm:
+            self.consolidator = Consolidator(self.long_term_memory, self.config.consolidation)
+            self.consolidator.start()
+        self.last_trace: Dict[str, Any] = {}
+        self._steps = 0
+        self.startup_profile: Dict[str, float] = {"components": t1 - t0, "ltm_load": t2 - t1}
+        self.startup_profile.update({f"ltm_load.{k}": v for k, v in self.long_term_memory.load_profile.items()})
+
+    # Per-conversation state (working memory, self-model, goals). Long-term memory, rules and
+    # effectors are untouched, so one mind can replay many conversations in turn.
+    def conversation_state(self) -> Tuple[WorkingMemory, SelfModel, GoalSystem]:
+        return copy.deepcopy((self.working_memory, self.self_model, self.goals))
+
+    def reset_conversation(self, state: Optional[Tuple[WorkingMemory, SelfModel, GoalSystem]] = None) -> None:
+        # Starts from a copy of `state` (e.g. from conversation_state()) or from scratch.
+        if state is not None:
+            self.working_memory, self.self_model, self.goals = copy.deepcopy(state)
+        else:
+            self.working_memory = WorkingMemory(capacity=self.config.working_memory_capacity)
+            self.self_model = SelfModel()
+            self.goals = GoalSystem()
+        self.attention.clear_cache()
+        self.last_trace = {}
+        self._steps = 0
+
+    def ingest(self, text: str) -> Experience:
+        exp = Experience.from_text(text)
+        self.working_memory.add(exp)
+        return exp
+
+    def _is_trivial(self, text: str, hits: Optional[Hits] = None) -> bool:
+        t = text.strip().lower()
+        if len(t) <= 24 and (hits or self.rules.scan(t)).greeting:
+            return True
+        return False
+
+    def step(self, text: str) -> str:
+        return ANSWER_SEPARATOR.join(self.step_stream(text))
+
+    def step_stream(self, text: str) -> Iterator[str]:
+        # Yields the answer parts as soon as reasoning is done; WM reinforcement, episode
+        # recording and saving run after the last part (or when the consumer stops early).
+        spans = Spans(self.config.metrics or self.trace_enabled)
+        t0 = time.perf_counter()
+        thought, spotlight, hits, trivial = self._think(text, spans)
+        parts = list(self.action.iter_answer_parts(thought.proposal, thought.rationale, self.self_model.snapshot().get("uncertainty")))
+        spans.lap("compose")
+        first_chunk = time.perf_counter() - t0
+        if self.config.metrics:
+            METRICS.observe("mind_step_first_chunk_seconds", first_chunk, {"path": "trivial" if trivial else "retrieval"})
+        try:
+            yield from parts
+        finally:
+            spans.skip()
+            output = ANSWER_SEPARATOR.join(parts)
+            tags = self._settle(text, spotlight, hits, trivial, thought, output, spans)
+            self._record(text, output, thought, tags, trivial, spans)
+            self._finish_spans(spans, trivial)
+            if self.trace_enabled and "timings" in self.last_trace:
+                self.last_trace["timings"]["first_chunk"] = first_chunk * 1000.0
+
+    def _record(self, text: str, output: str, thought: Thought, tags: List[str], trivial: bool, spans: Spans) -> None:
+        self._steps += 1
+        should_save = not trivial and (self._steps % self.config.save_every_n_steps == 0)
+        if self._writer is not None:
+            self._writer.record(query=text, response=output, thought=thought, tags=tags)
+            spans.lap("record")
+            if should_save:
+                self._writer.save()
+                spans.lap("save")
+        else:
+            self.long_term_memory.record_episode(query=text, response=output, thought=thought, tags=tags)
+            spans.lap("record")
+            if should_save:
+                self.long_term_memory.save()
+                spans.lap("save")
+
+    def _finish_spans(self, spans: Spans, trivial: bool) -> None:
+        if not spans.enabled:
+            return
+        total = sum(spans.timings.values())
+        if self.config.metrics:
+            METRICS.observe_many("mind_step_stage_seconds", "stage", spans.timings)
+            METRICS.observe("mind_step_seconds", total, {"path": "trivial" if trivial else "retrieval"})
+            METRICS.inc("mind_steps_total")
+        if self.trace_enabled and self.last_trace:
+            self.last_trace["timings"] = dict(spans.as_ms(), total=total * 1000.0)
+
+    def step_many(self, prompts: List[str]) -> List[str]:
+        # Episodes are recorded in one batch after all prompts are answered, so
+        # prompts in the same call do not retrieve each other.
+        outputs: List[str] = []
+        thoughts: List[Thought] = []
+        tags: List[List[str]] = []
+        should_save = False
+        for text in prompts:
+            output, thought, t, trivial = self._respond(text, Spans(False))
+            outputs.append(output)
+            thoughts.append(thought)
+            tags.append(t)
+            self._steps += 1
+            if not trivial and (self._steps % self.config.save_every_n_steps == 0):
+                should_save = True
+        if self._writer is not None:
+            self._writer.record_many(list(prompts), outputs, thoughts, tags)
+            if should_save:
+                self._writer.save()
+            return outputs
+        self.long_term_memory.record_episodes(list(prompts), outputs, thoughts, tags)
+        if should_save:
+            self.long_term_memory.save()
+        return outputs
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+        self.long_term_memory.save()
+
+    def close(self) -> None:
+        if self.consolidator is not None:
+            self.consolidator.stop()
+        if self._writer is not None:
+            self._writer.close()
+        if self._owns_ltm:
+            self.long_term_memory.close()
+        else:
+            self.long_term_memory.save()
+
+    def _respond(self, text: str, spans: Spans) -> Tuple[str, Thought, List[str], bool]:
+        thought, spotlight, hits, trivial = self._think(text, spans)
+        output = self.action.compose_full_answer(thought.proposal, thought.rationale, self.self_model.snapshot().get("uncertainty"))
+        spans.lap("compose")
+        tags = self._settle(text, spotlight, hits, trivial, thought, output, spans)
+        spans.skip()
+        return output, thought, tags, trivial
+
+    def _think(self, text: str, spans: Spans) -> Tuple[Thought, List[Experience], Hits, bool]:
+        if self._writer is not None:
+            # Read-your-writes: earlier episodes must be indexed before this step reads LTM.
+            self._writer.flush()
+            spans.lap("writer_flush")
+        exp = self.ingest(text)
+        spans.lap("ingest")
+        self.self_model.note_state(current_intent="respond_to_prompt", observation=text)
+        spans.lap("self_model")
+
+        # Greetings and tags come from one scan of the prompt.
+        hits = self.rules.scan(text.lower())
+        trivial = self._is_trivial(text, hits)
+        if trivial:
+            spotlight: List[Experience] = self.attention.select(self.working_memory, self.goals)
+        else:
+            spotlight = self.attention.select_with_retrieval(self.working_memory, self.goals, self.long_term_memory, query=text)
+        spans.lap("attention")
+
+        self.self_model.assess_contradictions([e.content for e in spotlight])
+        spans.lap("contradictions")
+        thought: Thought = self.reasoning.think(spotlight, self.self_model, self.long_term_memory)
+        spans.lap("reasoning")
+        return thought, spotlight, hits, trivial
+
+    def _settle(self, text: str, spotlight: List[Experience], hits: Hits, trivial: bool, thought: Thought, composed: str, spans: Spans) -> List[str]:
+        action: Action = Action(kind="say", payload=composed)
+        self.action.execute(action)
+        self.working_memory.reinforce(spotlight, delta=0.1)
+        spans.lap("reinforce")
+        tags = self._extract_tags(text, hits)
+        spans.lap("tags")
+        if self.trace_enabled:
+            self.last_trace = {
+                "input": text,
+                "spotlight": [e.summary() for e in spotlight],
+                "thought": thought.model_dump(),
+                "action": action.model_dump(),
+                "self_model": self.self_model.snapshot(),
+                "tags": tags,
+                "trivial": trivial,
+            }
+        return tags
+
+    def why_did_you_say(self) -> str:
+        if not self.last_trace:
+            return "No prior action to explain."
+        t = self.last_trace.get("thought", {})
+        return f"Because: {t.get('rationale', 'no rationale')}"
+
+    def what_dont_you_know(self) -> str:
+        if not self.last_trace:
+            return "I don't know yet; I need an input."
+        u = self.self_model.snapshot().get("uncertainty", 0.2)
+        if u > 0.6:
+            return "I am uncertain about the premises and need clarification or evidence."
+        if u > 0.3:
+            return "I may be missing constraints; providing more details can help."
+        return "I am confident about the last topic, but open to counterpoints."
+
+    def summarize_chain_of_thought(self) -> str:
+        if not self.last_trace:
+            return "No chain available."
+        t = self.last_trace.get("thought", {})
+        spot = ", ".join(s.get("content", "")[:60] for s in self.last_trace.get("spotlight", [])[:3])
+        return f"I focused on: {spot}. Rationale: {t.get('rationale', '')}. Plan: answer, verify, then ask a follow-up."
+
+    def _extract_tags(self, text: str, hits: Optional[Hits] = None) -> List[str]:
+        return (hits or self.rules.scan(text.lower())).tags
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import math
+
+import numpy as np
+from pydantic import BaseModel
+
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None
+
+
+class IndexPolicy(BaseModel):
+    kind: str = "ivf"  # "flat" | "ivf" | "hnsw"; approximate kinds only kick in above threshold
+    threshold: int = 200_000
+    nlist: Optional[int] = None  # IVF cells; defaults to ~4*sqrt(n)
+    nprobe: int = 16
+    hnsw_m: int = 32
+    ef_search: int = 64
+    ef_construction: int = 80
+    train_sample_per_list: int = 64
+    filter_exact_max: int = 65536  # tag-filtered searches with at most this many candidates are scored exactly
+    # In-memory vector codec. Anything but "flat" keeps only compressed codes in the index
+    # (below threshold too) and re-ranks a shortlist of top_k * rerank_factor candidates
+    # against the full-precision, memory-mapped embedding matrix.
+    codec: str = "flat"  # "flat" | "fp16" | "sq8" | "pq"
+    pq_m: int = 48  # PQ sub-quantizers (8 bits each); must divide the embedding dim
+    pq_train_sample: int = 16384
+    rerank_factor: int = 4
+    rebuild_removed_ratio: float = 0.2  # rebuild an HNSW graph once this share of its nodes are removed episodes
+
+    def wants_ann(self, rows: int) -> bool:
+        return faiss is not None and self.kind in ("ivf", "hnsw") and rows >= self.threshold
+
+    @property
+    def compressed(self) -> bool:
+        return faiss is not None and self.codec != "flat"
+
+    def wants_index(self, rows: int) -> bool:
+        # PQ codebooks need a few thousand rows to train; scalar codecs need none.
+        min_rows = 256 * 39 if self.codec == "pq" else 1
+        return self.wants_ann(rows) or (self.compressed and rows >= min_rows)
+
+    def codec_factory(self) -> str:
+        # "np": no polysemous training, which only serves Hamming-filtered search and
+        # makes PQ training several times slower.
+        return {"flat": "Flat", "fp16": "SQfp16", "sq8": "SQ8", "pq": f"PQ{self.pq_m}x8np"}[self.codec]
+
+    def nlist_for(self, rows: int) -> int:
+        if self.nlist:
+            return int(self.nlist)
+        # faiss wants ~39 training points per centroid
+        return int(max(1, min(65536, 4 * math.sqrt(max(rows, 1)), rows // 39)))
+
+
+def build_index(policy: IndexPolicy, vectors: np.ndarray, ids: Optional[np.ndarray] = None) -> Any:
+    # Vectors are labelled with stable episode ids (row positions by default): IVF stores
+    # ids natively, other kinds are wrapped in an IndexIDMap.
+    n, dim = vectors.shape
+    codec = policy.codec_factory()
+    sample = n
+    if not policy.wants_ann(n):
+        # Compressed exhaustive scan below the ANN threshold.
+        index = faiss.index_factory(dim, codec, faiss.METRIC_INNER_PRODUCT)
+        sample = policy.pq_train_sample
+    elif policy.kind == "ivf":
+        nlist = policy.nlist_for(n)
+        index = faiss.index_factory(dim, f"IVF{nlist},{codec}", faiss.METRIC_INNER_PRODUCT)
+        sample = max(nlist * policy.train_sample_per_list, policy.pq_train_sample if policy.codec == "pq" else 0)
+    elif policy.kind == "hnsw":
+        spec = f"HNSW{policy.hnsw_m}_PQ{policy.pq_m}" if policy.codec == "pq" else f"HNSW{policy.hnsw_m},{codec}"
+        index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = policy.ef_construction
+        sample = policy.pq_train_sample
+    else:
+        raise ValueError(f"unknown approximate index kind: {policy.kind}")
+    if not index.is_trained:
+        sample = min(n, sample)
+        train = vectors if sample == n else vectors[np.sort(np.random.default_rng(0).choice(n, sample, replace=False))]
+        index.train(np.ascontiguousarray(train, dtype=np.float32))
+    if not hasattr(index, "nprobe"):
+        index = faiss.IndexIDMap(index)
+    add_vectors(index, vectors, np.arange(n, dtype=np.int64) if ids is None else ids)
+    set_search_params(index, nprobe=policy.nprobe, ef_search=policy.ef_search)
+    return index
+
+
+def add_vectors(index: Any, vectors: np.ndarray, ids: np.ndarray) -> None:
+    # Add in chunks so memory-mapped blocks are paged in gradually.
+    for start in range(0, vectors.shape[0], 65536):
+        chunk = np.ascontiguousarray(vectors[start : start + 65536], dtype=np.float32)
+        index.add_with_ids(chunk, np.ascontiguousarray(ids[start : start + 65536], dtype=np.int64))
+
+
+def _inner(index: Any) -> Any:
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def supports_remove(index: Any) -> bool:
+    # HNSW graphs cannot drop nodes; removed ids are filtered at search time instead.
+    return not hasattr(_inner(index), "hnsw")
+
+
+def search_params(index: Any, sel: Any) -> Any:
+    inner = _inner(index)
+    if hasattr(inner, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=inner.hnsw.efSearch)
+    if hasattr(inner, "nprobe"):
+        return faiss.SearchParametersIVF(sel=sel, nprobe=inner.nprobe)
+    return faiss.SearchParameters(sel=sel)
+
+
+def set_search_params(index: Any, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    if index is None:
+        return
+    index = _inner(index)
+    if nprobe is not None and hasattr(index, "nprobe"):
+        index.nprobe = int(nprobe)
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(ef_search)
+
+
+def describe(index: Any) -> Dict[str, Any]:
+    if index is None:
+        return {"kind": "flat"}
+    ntotal = int(index.ntotal)
+    index = _inner(index)
+    kind = "hnsw" if hasattr(index, "hnsw") else "ivf" if hasattr(index, "nprobe") else "flat"
+    info: Dict[str, Any] = {"kind": kind, "ntotal": ntotal}
+    if hasattr(index, "nprobe"):
+        info["nlist"] = int(index.nlist)
+        info["nprobe"] = int(index.nprobe)
+    if hasattr(index, "hnsw"):
+        info["ef_search"] = int(index.hnsw.efSearch)
+    return info
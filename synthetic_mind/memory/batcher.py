@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+_WAIT_SAMPLES = 4096
+
+
+# Micro-batching front for an encode function. Callers on any thread (or coroutine, via
+# encode_async) submit texts and block on a future; one worker thread drains the queue into
+# batches of up to max_batch_size texts, waiting at most max_wait_ms after the first queued
+# request for more to arrive, runs a single encode per batch and hands each caller its rows.
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        self._encode = encode
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self._pending: Deque[Tuple[List[str], Future, float]] = collections.deque()
+        self._pending_texts = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # Stats
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._histogram: Dict[int, int] = {}
+        self._waits: Deque[float] = collections.deque(maxlen=_WAIT_SAMPLES)
+        self._encode_s = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending_texts
+
+    @property
+    def closed(self) -> bool:
+        return self._stopping
+
+    def submit(self, texts: List[str]) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("embedding batcher is closed")
+            if not texts:
+                fut.set_result(np.zeros((0, 0), dtype=np.float32))
+                return fut
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ltm-embed-batcher", daemon=True)
+                self._thread.start()
+            self._pending.append((list(texts), fut, time.perf_counter()))
+            self._pending_texts += len(texts)
+            self._cond.notify()
+        return fut
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    async def encode_async(self, texts: List[str]) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _take_batch(self) -> Optional[List[Tuple[List[str], Future, float]]]:
+        with self._cond:
+            while not self._pending:
+                if self._stopping:
+                    return None
+                self._cond.wait()
+            # Linger until the batch is full or the oldest request has waited max_wait_s.
+            deadline = self._pending[0][2] + self.max_wait_s
+            while self._pending_texts < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch: List[Tuple[List[str], Future, float]] = []
+            size = 0
+            # Requests are never split; an oversized one forms its own batch.
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_size):
+                item = self._pending.popleft()
+                batch.append(item)
+                size += len(item[0])
+            self._pending_texts -= size
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            texts = [t for item in batch for t in item[0]]
+            started = time.perf_counter()
+            try:
+                vecs = self._encode(texts)
+            except BaseException as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                continue
+            finally:
+                self._record(batch, len(texts), started)
+            offset = 0
+            for item, fut, _ in batch:
+                fut.set_result(vecs[offset : offset + len(item)])
+                offset += len(item)
+
+    def _record(self, batch: List[Tuple[List[str], Future, float]], size: int, started: float) -> None:
+        with self._cond:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts += size
+            bucket = 1
+            while bucket < size:
+                bucket *= 2
+            self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+            self._waits.extend(started - submitted for _, _, submitted in batch)
+            self._encode_s += time.perf_counter() - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = np.asarray(self._waits) * 1000.0
+            return {
+                "queue_depth": self._pending_texts,
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "mean_batch_size": self._texts / self._batches if self._batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._histogram.items())),
+                "wait_ms_mean": float(waits.mean()) if waits.size else 0.0,
+                "wait_ms_p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+                "wait_ms_p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+                "wait_ms_max": float(waits.max()) if waits.size else 0.0,
+                "encode_s_total": self._encode_s,
+            }
+
+    def close(self) -> None:
+        # Queued requests are still encoded; submit() raises from now on.
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, IO, Iterator, List, Optional, Tuple
+import glob
+import gzip
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+
+from ..metrics import METRICS
+from ..types import Thought
+from .episodes import EPISODE_SCHEMA, ID_FIELD, normalize_table, row_ids
+from .long_term import TOMBSTONES, LongTermMemory, episode_text
+from .segments import SegmentStore
+
+EMBEDDING_FIELD = "embedding"
+
+
+class ImportPolicy(BaseModel):
+    chunk_rows: int = 2048  # records read, embedded and recorded together
+    workers: int = 0  # embedding processes; 0 embeds in this process
+    threads_per_worker: int = 1
+    max_inflight: int = 0  # chunks read ahead of the recorder; 0 means two per worker
+    batch_size: int = 64  # encoder batch inside a chunk
+    checkpoint_rows: int = 100_000  # save LTM and the checkpoint after this many new episodes
+    reuse_embeddings: bool = True  # take an "embedding" field from the corpus instead of encoding
+
+
+# Readers. A corpus is JSONL (optionally .gz) or parquet with a `query` field and optional
+# `response`, `tags` (list or comma-joined), `ts`, `thought` and `embedding`. Chunks come
+# back as (records without embeddings, embeddings or None, records consumed).
+def corpus_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".parquet", ".pq")):
+        return "parquet"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise ValueError(f"unsupported corpus format: {path} (expected .jsonl[.gz] or .parquet)")
+
+
+def read_chunks(path: str, chunk_rows: int, skip: int = 0) -> Iterator[Tuple[List[Dict[str, Any]], Optional[np.ndarray], int]]:
+    if corpus_format(path) == "parquet":
+        yield from _read_parquet(path, chunk_rows, skip)
+    else:
+        yield from _read_jsonl(path, chunk_rows, skip)
+
+
+def _read_jsonl(path: str, chunk_rows: int, skip: int) -> Iterator[Tuple[List[Dict[str, Any]], Optional[np.ndarray], int]]:
+    opener: Callable[..., IO[str]] = gzip.open if path.endswith(".gz") else open  # type: ignore[assignment]
+    with opener(path, "rt", encoding="utf-8") as f:
+        records: List[Dict[str, Any]] = []
+        embs: List[Any] = []
+        seen = 0
+        for line in f:
+            if not line.strip():
+                continue
+            seen += 1
+            if seen <= skip:
+                continue
+            record = json.loads(line)
+            embs.append(record.pop(EMBEDDING_FIELD, None))
+            records.append(record)
+            if len(records) >= chunk_rows:
+                yield records, _stack(embs), len(records)
+                records, embs = [], []
+        if records:
+            yield records, _stack(embs), len(records)
+
+
+def _read_parquet(path: str, chunk_rows: int, skip: int) -> Iterator[Tuple[List[Dict[str, Any]], Optional[np.ndarray], int]]:
+    f = pq.ParquetFile(path)
+    # Whole row groups before the resume point are never read.
+    groups, start = [], 0
+    for rg in range(f.metadata.num_row_groups):
+        rows = f.metadata.row_group(rg).num_rows
+        if start + rows > skip:
+            groups.append(rg)
+        else:
+            skip -= rows
+        start += rows
+    if not groups:
+        return
+    for batch in f.iter_batches(batch_size=chunk_rows, row_groups=groups):
+        if skip:
+            cut = min(skip, batch.num_rows)
+            batch, skip = batch.slice(cut), skip - cut
+            if not batch.num_rows:
+                continue
+        embs = None
+        if EMBEDDING_FIELD in batch.schema.names:
+            col = batch.column(batch.schema.get_field_index(EMBEDDING_FIELD))
+            if col.null_count == 0:
+                embs = np.asarray(col.flatten().to_numpy(zero_copy_only=False), dtype=np.float32).reshape(batch.num_rows, -1)
+            batch = batch.drop_columns([EMBEDDING_FIELD])
+        yield batch.to_pylist(), embs, batch.num_rows
+
+
+def _unit_rows(embs: np.ndarray) -> Tuple[Optional[np.ndarray], int]:
+    # Cosine scores and dedup thresholds assume unit vectors: rows off by more than 1e-3 are
+    # rescaled (and counted). None when a row is zero or not finite; the chunk is re-encoded.
+    norms = np.linalg.norm(embs, axis=1)
+    if not np.isfinite(norms).all() or not norms.all():
+        return None, 0
+    off = np.abs(norms - 1.0) > 1e-3
+    if off.any():
+        embs = embs / norms[:, None]
+    return embs.astype(np.float32, copy=False), int(off.sum())
+
+
+def _stack(embs: List[Any]) -> Optional[np.ndarray]:
+    if not embs or any(e is None for e in embs):
+        return None
+    return np.asarray(embs, dtype=np.float32)
+
+
+def _parse(records: List[Dict[str, Any]], now: float) -> Tuple[List[int], Dict[str, list]]:
+    # Keeps records with a non-empty query; returns their positions and column lists.
+    keep: List[int] = []
+    cols: Dict[str, list] = {"queries": [], "responses": [], "thoughts": [], "tags": [], "ts": []}
+    for i, r in enumerate(records):
+        query = r.get("query")
+        if not query:
+            continue
+        response = r.get("response") or ""
+        tags = r.get("tags") or []
+        if isinstance(tags, str):
+            tags = [t for t in tags.split(",") if t]
+        thought = r.get("thought") or {}
+        keep.append(i)
+        cols["queries"].append(str(query))
+        cols["responses"].append(str(response))
+        cols["thoughts"].append(
+            Thought(
+                mode=thought.get("mode") or "imported",
+                rationale=thought.get("rationale") or "bulk import",
+                proposal=thought.get("proposal") or str(response),
+            )
+        )
+        cols["tags"].append([str(t) for t in tags])
+        cols["ts"].append(float(r["ts"]) if r.get("ts") is not None else now)
+    return keep, cols
+
+
+# Embedding workers: each process builds one encoder (same model name, so the vectors
+# match the ones LongTermMemory computes) and encodes whole chunks.
+_ENCODER: Optional[LongTermMemory] = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    global _ENCODER
+    try:
+        import torch  # type: ignore
+
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+    _ENCODER = LongTermMemory(model_name=model_name)
+
+
+def _encode(texts: List[str], batch_size: int) -> np.ndarray:
+    return _ENCODER.embed_many(texts, batch_size=batch_size)
+
+
+# Checkpoints. One JSON file per source (keyed by path, size and mtime) in the storage
+# directory. It is written before each save with both the previous and the new
+# (records, rows) pair, so after a crash the number of rows on disk tells which of the two
+# the store reached, and the import resumes at exactly that record.
+def checkpoint_path(storage_dir: str, source: str) -> str:
+    st = os.stat(source)
+    key = hashlib.blake2b(f"{os.path.abspath(source)}\0{st.st_size}\0{int(st.st_mtime)}".encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(storage_dir, f"import-{key}.json")
+
+
+def _write_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _resume_point(path: Optional[str], rows: int) -> Tuple[int, Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return 0, {}
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if rows == state["rows"]:
+        return int(state["records"]), state
+    if rows == state["prev_rows"]:
+        return int(state["prev_records"]), state
+    raise ValueError(f"{path} expects {state['prev_rows']} or {state['rows']} stored episodes, found {rows}; rerun with restart")
+
+
+def import_corpus(
+    ltm: LongTermMemory,
+    source: str,
+    policy: Optional[ImportPolicy] = None,
+    restart: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    # Streams `source` into ltm chunk by chunk. Reading and encoding run ahead of the
+    # recorder by at most max_inflight chunks, so memory stays bounded by the chunk size
+    # rather than the corpus. Expects to be the only writer to ltm's storage.
+    policy = policy or ImportPolicy()
+    ckpt = checkpoint_path(ltm.storage_dir, source) if ltm.storage_dir else None
+    if ckpt:
+        os.makedirs(ltm.storage_dir, exist_ok=True)
+        if restart and os.path.exists(ckpt):
+            os.remove(ckpt)
+    skip, state = _resume_point(ckpt, len(ltm.episodes))
+    report: Dict[str, Any] = {"source": source, "resumed_at": skip, "records": 0, "imported": 0, "skipped": 0, "reused_embeddings": 0, "rescaled_embeddings": 0}
+    if state.get("done") and skip == state["records"]:
+        report["already_done"] = True
+        return report
+    records_done, saved = skip, (skip, len(ltm.episodes))
+    pool: Optional[ProcessPoolExecutor] = None
+    if policy.workers > 0:
+        pool = ProcessPoolExecutor(
+            max_workers=policy.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(ltm.model_name, policy.threads_per_worker),
+        )
+    inflight = policy.max_inflight or 2 * max(1, policy.workers)
+    pending: Deque[Tuple[Dict[str, list], Any, int]] = deque()
+    dim: List[int] = []
+    t0 = time.perf_counter()
+
+    def checkpoint(done: bool = False) -> None:
+        nonlocal saved
+        rows = len(ltm.episodes)
+        if ckpt:
+            _write_checkpoint(ckpt, {"source": os.path.abspath(source), "prev_records": saved[0], "prev_rows": saved[1], "records": records_done, "rows": rows, "done": done})
+        ltm.save()
+        saved = (records_done, rows)
+        METRICS.inc("ltm_import_checkpoints_total")
+        if progress is not None:
+            progress({**report, "elapsed_s": time.perf_counter() - t0})
+
+    def record_next() -> None:
+        nonlocal records_done
+        cols, embs, consumed = pending.popleft()
+        if isinstance(embs, Future):
+            embs = embs.result()
+        if cols["queries"]:
+            ltm.record_embedded(cols["queries"], cols["responses"], cols["thoughts"], cols["tags"], embs, ts=cols["ts"])
+        records_done += consumed
+        report["records"] += consumed
+        report["imported"] += len(cols["queries"])
+        report["skipped"] += consumed - len(cols["queries"])
+        METRICS.inc("ltm_imported_episodes_total", len(cols["queries"]))
+        if len(ltm.episodes) - saved[1] >= policy.checkpoint_rows:
+            checkpoint()
+
+    try:
+        for records, given, consumed in read_chunks(source, policy.chunk_rows, skip):
+            keep, cols = _parse(records, time.time())
+            embs: Any = None
+            if keep and given is not None and policy.reuse_embeddings:
+                if not dim:
+                    dim.append(int(ltm.embed("dimension probe").shape[0]))
+                if given.shape[1] == dim[0]:
+                    embs, rescaled = _unit_rows(given[keep])
+                    if embs is not None:
+                        report["reused_embeddings"] += len(keep)
+                        report["rescaled_embeddings"] += rescaled
+            if keep and embs is None:
+                texts = [episode_text(q, r, t) for q, r, t in zip(cols["queries"], cols["responses"], cols["thoughts"])]
+                embs = pool.submit(_encode, texts, policy.batch_size) if pool is not None else ltm.embed_many(texts, batch_size=policy.batch_size)
+            pending.append((cols, embs, consumed))
+            while len(pending) >= inflight:
+                record_next()
+        while pending:
+            record_next()
+        checkpoint(done=True)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    report["elapsed_s"] = time.perf_counter() - t0
+    report["episodes_per_s"] = report["imported"] / report["elapsed_s"] if report["elapsed_s"] > 0 else 0.0
+    return report
+
+
+# Export reads the saved segments directly (one shard directory after another for a
+# sharded store), one record batch at a time with its slice of the memory-mapped
+# embeddings, and skips tombstoned episodes. It never loads the store.
+def store_directories(storage_dir: str) -> List[str]:
+    # Opened read-only: no lock, no cleanup, so exporting a live store leaves its writer alone.
+    if SegmentStore(storage_dir, read_only=True).exists():
+        return [storage_dir]
+    shards = sorted(d for d in glob.glob(os.path.join(storage_dir, "shard-*")) if SegmentStore(d, read_only=True).exists())
+    if not shards:
+        raise ValueError(f"no segment store under {storage_dir}")
+    return shards
+
+
+def _dead_ids(directory: str) -> np.ndarray:
+    path = os.path.join(directory, TOMBSTONES)
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=np.int64)
+    with np.load(path) as data:
+        return data["dead"].astype(np.int64)
+
+
+def iter_episodes(storage_dir: str, chunk_rows: int = 8192) -> Iterator[Tuple[pa.Table, np.ndarray]]:
+    for directory in store_directories(storage_dir):
+        dead = _dead_ids(directory)
+        files, embs = SegmentStore(directory, read_only=True).open(mmap_mode="r")
+        start = 0
+        for f, emb in zip(files, embs):
+            offset = 0
+            for batch in f.iter_batches(batch_size=chunk_rows):
+                table = normalize_table(pa.Table.from_batches([batch]), start=start + offset)
+                block = emb[offset : offset + table.num_rows]
+                offset += table.num_rows
+                live = ~np.isin(row_ids(table, start), dead)
+                if not live.all():
+                    table, block = table.filter(pa.array(live)), block[live]
+                if table.num_rows:
+                    yield table, np.asarray(block, dtype=np.float32)
+            start += f.metadata.num_rows
+
+
+def export_corpus(
+    storage_dir: str,
+    target: str,
+    chunk_rows: int = 8192,
+    embeddings: bool = True,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    fmt = corpus_format(target)
+    report: Dict[str, Any] = {"target": target, "episodes": 0}
+    t0 = time.perf_counter()
+    writer: Optional[pq.ParquetWriter] = None
+    opener: Callable[..., IO[str]] = gzip.open if target.endswith(".gz") else open  # type: ignore[assignment]
+    out = opener(target + ".tmp", "wt", encoding="utf-8") if fmt == "jsonl" else None
+    finished = False
+    try:
+        for table, block in iter_episodes(storage_dir, chunk_rows):
+            if embeddings:
+                flat = pa.array(block.reshape(-1), pa.float32())
+                table = table.append_column(EMBEDDING_FIELD, pa.FixedSizeListArray.from_arrays(flat, block.shape[1]))
+            if out is not None:
+                for row in table.to_pylist():
+                    out.write(json.dumps(row, ensure_ascii=False))
+                    out.write("\n")
+            else:
+                if writer is None:
+                    writer = pq.ParquetWriter(target + ".tmp", table.schema)
+                writer.write_table(table)
+            report["episodes"] += table.num_rows
+            if progress is not None:
+                progress({**report, "elapsed_s": time.perf_counter() - t0})
+        if writer is None and out is None:
+            # Nothing to export: an empty file with the episode schema.
+            writer = pq.ParquetWriter(target + ".tmp", EPISODE_SCHEMA.append(pa.field(ID_FIELD, pa.int64())))
+        finished = True
+    finally:
+        if writer is not None:
+            writer.close()
+        if out is not None:
+            out.close()
+        if not finished:
+            try:
+                os.remove(target + ".tmp")
+            except OSError:
+                pass
+    os.replace(target + ".tmp", target)
+    METRICS.inc("ltm_exported_episodes_total", report["episodes"])
+    report["elapsed_s"] = time.perf_counter() - t0
+    report["bytes"] = os.path.getsize(target)
+    return report
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import threading
+import time
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from ..metrics import METRICS
+from .long_term import LongTermMemory
+
+
+class ConsolidationPolicy(BaseModel):
+    dedup_threshold: float = 0.97  # cosine similarity at which two episodes are the same memory
+    dedup_neighbors: int = 8
+    max_episodes: Optional[int] = None  # oldest unprotected episodes go first
+    max_age_days: Optional[float] = None
+    tag_max_age_days: Dict[str, float] = Field(default_factory=dict)  # e.g. {"math": 30}
+    keep_tags: List[str] = Field(default_factory=list)  # never expired or trimmed
+    vacuum_ratio: float = 0.2  # vacuum once this share of rows are tombstones
+    interval_s: float = 900.0  # background pass period
+
+
+def deduplicate(ltm: LongTermMemory, policy: ConsolidationPolicy, batch_size: int = 64) -> Dict[str, int]:
+    # Each episode recorded since the last pass looks up its nearest neighbours through the
+    # index, and the group of it plus every neighbour at or above the threshold is merged.
+    # The newest copy survives, so it keeps the latest phrasing and timestamp plus the
+    # summed count. The pass covers the rows present when it starts; episodes recorded
+    # meanwhile are left for the next one.
+    ids, _, _ = ltm.columns()
+    start, stop = int(np.searchsorted(ids, ltm.dedup_watermark)), len(ids)
+    checked = merged = 0
+    for lo in range(start, stop, batch_size):
+        rows = np.arange(lo, min(stop, lo + batch_size))
+        rows = rows[~ltm.episodes.dead[rows]]
+        if not rows.size:
+            continue
+        checked += int(rows.size)
+        for row, hits in zip(rows, ltm.search_vectors(ltm.vectors(rows), top_k=policy.dedup_neighbors + 1)):
+            # Hits are searched for the whole batch up front; rows merged away earlier in
+            # this batch are dead by now and must neither merge nor survive again.
+            dead = ltm.episodes.dead
+            if dead[row]:
+                continue
+            group = [r for r, score in hits if r != row and score >= policy.dedup_threshold and not dead[r]]
+            if group:
+                group.append(int(row))
+                merged += ltm.merge(max(group), group)
+    if stop:
+        ltm.dedup_watermark = int(ids[stop - 1]) + 1
+    return {"checked": checked, "merged": merged}
+
+
+def retention_candidates(ltm: LongTermMemory, policy: ConsolidationPolicy, now: Optional[float] = None) -> Dict[str, np.ndarray]:
+    # Works on the rows present at the start; tag postings may already list newer ones.
+    _, ts, dead = ltm.columns()
+    n = len(ts)
+    now = time.time() if now is None else now
+    live = ~dead
+    protected = np.zeros(n, dtype=bool)
+    for tag in policy.keep_tags:
+        rows = ltm.tags_index.get(tag)
+        protected[rows[rows < n]] = True
+    expirable = live & ~protected
+    out: Dict[str, np.ndarray] = {}
+    expired = np.zeros(n, dtype=bool)
+    if policy.max_age_days is not None:
+        expired |= ts < now - policy.max_age_days * 86400.0
+    for tag, days in policy.tag_max_age_days.items():
+        rows = ltm.tags_index.get(tag)
+        rows = rows[rows < n]
+        expired[rows[ts[rows] < now - days * 86400.0]] = True
+    out["expired"] = np.flatnonzero(expired & expirable)
+    if policy.max_episodes is not None:
+        remaining = expirable & ~expired
+        excess = int(live.sum()) - out["expired"].size - policy.max_episodes
+        if excess > 0:
+            rows = np.flatnonzero(remaining)
+            out["trimmed"] = rows[np.argsort(ts[rows], kind="stable")[:excess]]
+    return out
+
+
+def consolidate(ltm: LongTermMemory, policy: Optional[ConsolidationPolicy] = None, now: Optional[float] = None, vacuum: bool = True) -> Dict[str, Any]:
+    # One pass: merge near-duplicates, apply retention, vacuum when tombstones pile up, save.
+    # Stores that are not a single LongTermMemory (sharded) run the pass themselves.
+    policy = policy or ConsolidationPolicy()
+    if not isinstance(ltm, LongTermMemory):
+        return ltm.consolidate(policy, now=now, vacuum=vacuum)
+    t0 = time.perf_counter()
+    report: Dict[str, Any] = dict(deduplicate(ltm, policy))
+    for reason, rows in retention_candidates(ltm, policy, now).items():
+        report[reason] = ltm.remove(rows)
+    ltm.save()
+    report["vacuumed"] = 0
+    if vacuum and ltm.episodes.dead_rows and ltm.episodes.dead_rows >= policy.vacuum_ratio * len(ltm.episodes):
+        report["vacuumed"] = ltm.vacuum()
+    report["episodes"] = len(ltm.episodes) - ltm.episodes.dead_rows
+    report["tombstones"] = ltm.episodes.dead_rows
+    report["seconds"] = time.perf_counter() - t0
+    METRICS.observe("ltm_consolidate_seconds", report["seconds"])
+    for key in ("merged", "expired", "trimmed"):
+        METRICS.inc("ltm_consolidated_episodes_total", report.get(key, 0), labels={"reason": key})
+    return report
+
+
+# Runs consolidate() every policy.interval_s on a daemon thread. Errors are kept on
+# last_error instead of killing the thread.
+class Consolidator:
+    def __init__(self, ltm: LongTermMemory, policy: ConsolidationPolicy) -> None:
+        self.ltm = ltm
+        self.policy = policy
+        self.last_report: Dict[str, Any] = {}
+        self.last_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ltm-consolidator", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.policy.interval_s):
+            self.run_once()
+
+    def run_once(self) -> Dict[str, Any]:
+        try:
+            self.last_report = consolidate(self.ltm, self.policy)
+        except Exception as e:
+            self.last_error = e
+        return self.last_report
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+# LRU cache of embeddings keyed by a hash of (model name, normalized text). Bounded by
+# entry count and optionally by bytes; can be persisted to an .npz file and reloaded.
+class EmbeddingCache:
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 4096,
+        max_bytes: Optional[int] = None,
+        path: Optional[str] = None,
+        persist_interval_s: float = 60.0,
+    ) -> None:
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self.persist_interval_s = persist_interval_s
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_persist = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.model_name}\0{normalize_text(text)}".encode("utf-8"), digest_size=16).digest()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                k = self.key(text)
+                vec = self._entries.get(k)
+                if vec is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(k)
+                out.append(vec)
+        return out
+
+    def put_many(self, texts: List[str], vecs: np.ndarray) -> None:
+        with self._lock:
+            for text, vec in zip(texts, vecs):
+                self._put(self.key(text), vec)
+            self._evict()
+
+    def _put(self, k: bytes, vec: np.ndarray) -> None:
+        vec = np.array(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        old = self._entries.pop(k, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[k] = vec
+        self._bytes += vec.nbytes
+        self._dirty = True
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, vec = self._entries.popitem(last=False)
+            self._bytes -= vec.nbytes
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path: Optional[str] = None, force: bool = True) -> None:
+        path = path or self.path
+        if not path or not self._dirty:
+            return
+        if not force and time.monotonic() - self._last_persist < self.persist_interval_s:
+            return
+        with self._lock:
+            keys = np.frombuffer(b"".join(self._entries.keys()), dtype=np.uint8).reshape(-1, 16)
+            vecs = np.stack(list(self._entries.values())) if self._entries else np.zeros((0, 0), dtype=np.float32)
+            self._dirty = False
+            self._last_persist = time.monotonic()
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, model_name=np.array(self.model_name), keys=keys, vecs=vecs)
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        try:
+            data = np.load(path)
+            if str(data["model_name"]) != self.model_name:
+                return
+            keys, vecs = data["keys"], data["vecs"]
+        except Exception:
+            return
+        with self._lock:
+            # Saved in LRU order, so replaying keeps recency.
+            for k, vec in zip(keys, vecs):
+                self._put(k.tobytes(), vec)
+            self._evict()
+            self._dirty = False
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import List
+import re
+import zlib
+
+import numpy as np
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+# Deterministic, dependency-free stand-in for SentenceTransformer: signed feature hashing of
+# word unigrams and bigrams into `dim` buckets, L2-normalized. Texts sharing words land close
+# together, which is enough for offline benchmarks and tests. Selected on LongTermMemory with
+# model_name="hashing" (384 dims, like all-MiniLM-L6-v2) or "hashing-<dim>".
+class HashingEmbedder:
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = int(dim)
+
+    @classmethod
+    def from_name(cls, name: str) -> "HashingEmbedder":
+        _, _, dim = name.partition("-")
+        return cls(int(dim)) if dim else cls()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, texts: List[str], batch_size: int = 64, convert_to_numpy: bool = True, normalize_embeddings: bool = True, **_: object) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _TOKEN.findall(text.lower())
+            feats = words + [a + " " + b for a, b in zip(words, words[1:])]
+            if not feats:
+                continue
+            h = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in feats), dtype=np.uint32, count=len(feats))
+            signs = np.where(h & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(out[row], (h % self.dim).astype(np.intp), signs)
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            np.divide(out, norms, out=out, where=norms > 0)
+        return out
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from typing import List, Optional
+import numpy as np
+
+
+# Float32 embedding rows kept as a few large contiguous blocks instead of one array per row.
+# Blocks loaded from disk are frozen (and may be read-only memory maps); rows appended at
+# runtime go into a tail buffer whose capacity doubles when full.
+class EmbeddingMatrix:
+    def __init__(self, dim: Optional[int] = None, capacity: int = 1024) -> None:
+        self.dim = dim
+        self._blocks: List[np.ndarray] = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._tail: Optional[np.ndarray] = None
+        self._tail_rows = 0
+        self._initial_capacity = max(1, capacity)
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1]) + self._tail_rows
+
+    @property
+    def frozen_rows(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def nbytes(self) -> int:
+        tail = self._tail.nbytes if self._tail is not None else 0
+        return sum(b.nbytes for b in self._blocks) + tail
+
+    def add_block(self, block: np.ndarray) -> None:
+        if self._tail_rows:
+            raise ValueError("frozen blocks must be added before any appended rows")
+        if block.ndim != 2 or block.dtype != np.float32:
+            block = np.asarray(block, dtype=np.float32).reshape(block.shape[0], -1)
+        self._check_dim(block.shape[1])
+        if block.shape[0] == 0:
+            return
+        self._blocks.append(block)
+        self._offsets = np.append(self._offsets, self._offsets[-1] + block.shape[0])
+
+    def append(self, rows: np.ndarray) -> None:
+        rows = np.asarray(rows, dtype=np.float32)
+        if rows.ndim == 1:
+            rows = rows.reshape(1, -1)
+        self._check_dim(rows.shape[1])
+        needed = self._tail_rows + rows.shape[0]
+        if self._tail is None or needed > self._tail.shape[0]:
+            capacity = self._tail.shape[0] if self._tail is not None else self._initial_capacity
+            while capacity < needed:
+                capacity *= 2
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            if self._tail_rows:
+                grown[: self._tail_rows] = self._tail[: self._tail_rows]
+            self._tail = grown
+        self._tail[self._tail_rows : needed] = rows
+        self._tail_rows = needed
+
+    def truncate(self, n: int) -> None:
+        # Drops rows from n on; a frozen block straddling n is kept as a view of its first rows.
+        frozen = self.frozen_rows
+        if n >= frozen:
+            self._tail_rows = min(self._tail_rows, n - frozen)
+            return
+        b = int(np.searchsorted(self._offsets, n, side="right")) - 1
+        start = int(self._offsets[b])
+        blocks, offsets = self._blocks[:b], self._offsets[: b + 1]
+        if n > start:
+            blocks.append(self._blocks[b][: n - start])
+            offsets = np.append(offsets, n)
+        self._blocks, self._offsets = blocks, offsets
+        self._tail_rows = 0
+
+    def _check_dim(self, dim: int) -> None:
+        if self.dim is None:
+            self.dim = int(dim)
+        elif int(dim) != self.dim:
+            raise ValueError(f"embedding dim {dim} does not match matrix dim {self.dim}")
+
+    def _parts(self) -> List[np.ndarray]:
+        parts = list(self._blocks)
+        if self._tail_rows:
+            parts.append(self._tail[: self._tail_rows])
+        return parts
+
+    def scores(self, q: np.ndarray) -> np.ndarray:
+        parts = self._parts()
+        if not parts:
+            return np.zeros(0, dtype=np.float32)
+        if len(parts) == 1:
+            return parts[0] @ q
+        return np.concatenate([p @ q for p in parts])
+
+    def slice(self, start: int, stop: int) -> np.ndarray:
+        stop = min(stop, len(self))
+        if start >= stop:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        out: List[np.ndarray] = []
+        base = 0
+        for part in self._parts():
+            end = base + part.shape[0]
+            if end > start and base < stop:
+                out.append(part[max(start, base) - base : min(stop, end) - base])
+            base = end
+        # A range inside a single block is returned as a view, without copying.
+        return out[0] if len(out) == 1 else np.concatenate(out, axis=0)
+
+    def view(self) -> np.ndarray:
+        return self.slice(0, len(self))
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        out = np.empty((ids.shape[0], self.dim or 0), dtype=np.float32)
+        frozen = self.frozen_rows
+        in_tail = ids >= frozen
+        if in_tail.any():
+            out[in_tail] = self._tail[ids[in_tail] - frozen]
+        if (~in_tail).any():
+            block_ids = np.searchsorted(self._offsets, ids[~in_tail], side="right") - 1
+            sel = np.flatnonzero(~in_tail)
+            for b in np.unique(block_ids):
+                mask = block_ids == b
+                out[sel[mask]] = self._blocks[b][ids[~in_tail][mask] - self._offsets[b]]
+        return out
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        return self.rows(np.array([idx]))[0]
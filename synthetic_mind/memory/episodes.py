@@ -0,0 +1,443 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import ast
+import bisect
+import json
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+THOUGHT_TYPE = pa.struct([("mode", pa.string()), ("rationale", pa.string()), ("proposal", pa.string())])
+EPISODE_SCHEMA = pa.schema(
+    [
+        ("ts", pa.float64()),
+        ("query", pa.string()),
+        ("response", pa.string()),
+        ("thought", THOUGHT_TYPE),
+        ("tags", pa.list_(pa.string())),
+    ]
+)
+FIELDS = tuple(EPISODE_SCHEMA.names)
+# Stable episode id. Segments written before ids existed get their row positions.
+ID_FIELD = "id"
+_TEXT_FIELDS = ("query", "response", "thought")
+# Unsealed rows are Python objects; past this many they are moved into an Arrow chunk.
+SEAL_ROWS = 4096
+
+
+def parse_thought(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    # Segments written before the struct column stored str(dict).
+    for parse in (ast.literal_eval, json.loads):
+        try:
+            parsed = parse(value)
+            if isinstance(parsed, dict):
+                return parsed
+        except Exception:
+            pass
+    return {"raw": value}
+
+
+def _thought_struct(thought: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    return {
+        "mode": thought.get("mode"),
+        "rationale": thought.get("rationale", thought.get("raw")),
+        "proposal": thought.get("proposal"),
+    }
+
+
+def normalize_table(table: pa.Table, start: Optional[int] = None) -> pa.Table:
+    # Upgrades older layouts (thought as str(dict), tags as a comma-joined string). The id
+    # column is kept when present, or numbered from `start` when given.
+    if table.schema.field("thought").type != THOUGHT_TYPE:
+        thoughts = pa.array([_thought_struct(parse_thought(t)) for t in table.column("thought").to_pylist()], THOUGHT_TYPE)
+        table = table.set_column(table.schema.get_field_index("thought"), "thought", thoughts)
+    if "tags" in table.column_names and pa.types.is_string(table.schema.field("tags").type):
+        tags = pa.array([t.split(",") if t else [] for t in table.column("tags").to_pylist()], pa.list_(pa.string()))
+        table = table.set_column(table.schema.get_field_index("tags"), "tags", tags)
+    ids = table.column(ID_FIELD) if ID_FIELD in table.column_names else None
+    out = table.select(list(FIELDS)).cast(EPISODE_SCHEMA)
+    if ids is None and start is not None:
+        ids = pa.array(np.arange(start, start + table.num_rows, dtype=np.int64))
+    return out if ids is None else out.append_column(ID_FIELD, ids.cast(pa.int64()))
+
+
+def row_ids(table: pa.Table, start: int) -> np.ndarray:
+    if ID_FIELD in table.column_names:
+        return table.column(ID_FIELD).to_numpy().astype(np.int64, copy=False)
+    return np.arange(start, start + table.num_rows, dtype=np.int64)
+
+
+# A 1-D numpy array that grows by capacity doubling; view() is the filled prefix.
+class Growable:
+    def __init__(self, dtype: Any, capacity: int = 1024) -> None:
+        self._buf = np.empty(capacity, dtype=dtype)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def extend(self, values: Any) -> None:
+        values = np.asarray(values, dtype=self._buf.dtype).reshape(-1)
+        needed = self._n + values.shape[0]
+        if needed > self._buf.shape[0]:
+            capacity = self._buf.shape[0]
+            while capacity < needed:
+                capacity *= 2
+            grown = np.empty(capacity, dtype=self._buf.dtype)
+            grown[: self._n] = self._buf[: self._n]
+            self._buf = grown
+        self._buf[self._n : needed] = values
+        self._n = needed
+
+    def view(self) -> np.ndarray:
+        return self._buf[: self._n]
+
+    def truncate(self, n: int) -> None:
+        self._n = min(self._n, n)
+
+
+class _Chunk:
+    # A frozen run of rows: an Arrow table already in memory, or a parquet row group
+    # that is read the first time one of its text columns is needed.
+    def __init__(self, start: int, rows: int, table: Optional[pa.Table] = None, source: Optional[Tuple[pq.ParquetFile, int]] = None) -> None:
+        self.start = start
+        self.rows = rows
+        self._table = table
+        self._source = source
+        self._columns: Dict[str, pa.Array] = {}
+
+    @property
+    def table(self) -> pa.Table:
+        if self._table is None:
+            f, rg = self._source
+            self._table = normalize_table(f.read_row_group(rg)).select(list(FIELDS))
+        return self._table
+
+    def column(self, name: str) -> pa.Array:
+        col = self._columns.get(name)
+        if col is None:
+            col = self.table.column(name).combine_chunks()
+            self._columns[name] = col
+        return col
+
+
+class EpisodeRow(Mapping):
+    __slots__ = ("_table", "_idx")
+
+    def __init__(self, table: "EpisodeTable", idx: int) -> None:
+        self._table = table
+        self._idx = idx
+
+    def __getitem__(self, key: str) -> Any:
+        return self._table.value(self._idx, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.fields)
+
+    def __len__(self) -> int:
+        return len(self._table.fields)
+
+    def __repr__(self) -> str:
+        return f"EpisodeRow({dict(self)!r})"
+
+
+# Columnar episode store. ts lives in one float64 array and tags as dictionary-encoded
+# ids (a tag vocabulary plus per-row offsets into an int32 id array) for all rows. Text
+# columns stay in Arrow offset+buffer arrays: sealed chunks from parquet segments, plus
+# per-column lists for rows recorded since the last seal (the next save, or once
+# SEAL_ROWS accumulate). Rows are exposed as read-only EpisodeRow mappings, so
+# ltm.episodes[idx]["query"] keeps working.
+# Each row also carries a stable id (ascending with position, so ids map back to rows by
+# binary search), a tombstone flag and a merge count; consolidation tombstones rows and
+# vacuum() drops them without renumbering ids.
+class EpisodeTable(Sequence):
+    fields = FIELDS
+
+    def __init__(self) -> None:
+        self._chunks: List[_Chunk] = []
+        self._chunk_starts: List[int] = []
+        self._frozen = 0
+        self._ts = Growable(np.float64)
+        self._tag_offsets = Growable(np.int64)
+        self._tag_offsets.extend([0])
+        self._tag_ids = Growable(np.int32)
+        self._ids = Growable(np.int64)
+        self._dead = Growable(np.bool_)
+        self._counts = Growable(np.int64)
+        self.next_id = 0
+        self.dead_rows = 0
+        self.tag_vocab: List[str] = []
+        self._tag_lookup: Dict[str, int] = {}
+        self._tail: Dict[str, List[Any]] = {name: [] for name in _TEXT_FIELDS}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [EpisodeRow(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("episode index out of range")
+        return EpisodeRow(self, i)
+
+    @property
+    def ts(self) -> np.ndarray:
+        return self._ts.view()
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids.view()
+
+    @property
+    def dead(self) -> np.ndarray:
+        return self._dead.view()
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts.view()
+
+    def live_rows(self) -> np.ndarray:
+        return np.flatnonzero(~self._dead.view())
+
+    def rows_of(self, ids: Any) -> np.ndarray:
+        # Row positions of stable ids; -1 for ids no longer (or never) in the table.
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        view = self._ids.view()
+        pos = np.searchsorted(view, ids)
+        found = pos < view.shape[0]
+        found[found] = view[pos[found]] == ids[found]
+        return np.where(found, pos, -1)
+
+    def tombstone(self, rows: Any) -> np.ndarray:
+        # Marks rows dead and returns the ones that were still live.
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        dead = self._dead.view()
+        rows = rows[(rows >= 0) & (rows < len(self))]
+        rows = rows[~dead[rows]]
+        dead[rows] = True
+        self.dead_rows += int(rows.size)
+        return rows
+
+    def _extend_rows(self, ids: np.ndarray) -> None:
+        self._ids.extend(ids)
+        self._dead.extend(np.zeros(ids.shape[0], dtype=np.bool_))
+        self._counts.extend(np.ones(ids.shape[0], dtype=np.int64))
+        if ids.size:
+            self.next_id = max(self.next_id, int(ids[-1]) + 1)
+
+    def tag_id(self, tag: str) -> int:
+        tid = self._tag_lookup.get(tag)
+        if tid is None:
+            tid = len(self.tag_vocab)
+            self.tag_vocab.append(tag)
+            self._tag_lookup[tag] = tid
+        return tid
+
+    def tags_of(self, idx: int) -> List[str]:
+        offsets = self._tag_offsets.view()
+        return [self.tag_vocab[t] for t in self._tag_ids.view()[offsets[idx] : offsets[idx + 1]]]
+
+    def value(self, idx: int, key: str) -> Any:
+        if key == "ts":
+            return float(self._ts.view()[idx])
+        if key == "tags":
+            return self.tags_of(idx)
+        if key not in _TEXT_FIELDS:
+            raise KeyError(key)
+        with self._lock:
+            if idx >= self._frozen:
+                return self._tail[key][idx - self._frozen]
+            c = self._chunks[bisect.bisect_right(self._chunk_starts, idx) - 1]
+        return c.column(key)[idx - c.start].as_py()
+
+    # Appending
+    def append_batch(
+        self,
+        ts: Iterable[float],
+        queries: List[str],
+        responses: List[str],
+        thoughts: List[Dict[str, Any]],
+        tags: List[List[str]],
+        ids: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        if ids is None:
+            ids = np.arange(self.next_id, self.next_id + len(queries), dtype=np.int64)
+        self._tail["query"].extend(queries)
+        self._tail["response"].extend(responses)
+        self._tail["thought"].extend(_thought_struct(t) for t in thoughts)
+        self._extend_tags(tags)
+        self._extend_rows(np.asarray(ids, dtype=np.int64))
+        self._ts.extend(list(ts))
+        if len(self._tail["query"]) >= SEAL_ROWS:
+            self.seal()
+        return ids
+
+    def append(self, episode: Dict[str, Any]) -> None:
+        self.append_batch([episode["ts"]], [episode["query"]], [episode["response"]], [episode["thought"]], [episode.get("tags", [])])
+
+    def extend(self, episodes: Iterable[Dict[str, Any]]) -> None:
+        for e in episodes:
+            self.append(e)
+
+    def _extend_tags(self, tags: List[List[str]]) -> None:
+        ids = [self.tag_id(t) for tg in tags for t in (tg or [])]
+        lengths = np.fromiter((len(tg or []) for tg in tags), dtype=np.int64, count=len(tags))
+        self._tag_ids.extend(ids)
+        self._tag_offsets.extend(self._tag_offsets.view()[-1] + np.cumsum(lengths))
+
+    def _encode_tags(self, tags: pa.ChunkedArray) -> None:
+        arr = tags.combine_chunks() if isinstance(tags, pa.ChunkedArray) else tags
+        lengths = pc.fill_null(pc.list_value_length(arr), 0).to_numpy(zero_copy_only=False).astype(np.int64)
+        values = pc.list_flatten(arr)
+        if len(values):
+            encoded = pc.dictionary_encode(values).combine_chunks() if isinstance(values, pa.ChunkedArray) else pc.dictionary_encode(values)
+            remap = np.array([self.tag_id(t) for t in encoded.dictionary.to_pylist()], dtype=np.int32)
+            self._tag_ids.extend(remap[encoded.indices.to_numpy(zero_copy_only=False)])
+        self._tag_offsets.extend(self._tag_offsets.view()[-1] + np.cumsum(lengths))
+
+    # Sealed chunks
+    def add_table(self, table: pa.Table) -> None:
+        if self._tail["query"]:
+            raise ValueError("sealed chunks must be added before any appended rows")
+        table = normalize_table(table)
+        ids = row_ids(table, self._frozen)
+        table = table.select(list(FIELDS))
+        self._add_chunk(_Chunk(self._frozen, table.num_rows, table=table), table.column("ts"), table.column("tags"), ids)
+
+    def add_row_group(self, f: pq.ParquetFile, row_group: int) -> None:
+        # Only ts and tags are read now; text columns load on first access.
+        if self._tail["query"]:
+            raise ValueError("sealed chunks must be added before any appended rows")
+        cols = _read_light(f, row_group)
+        ids = row_ids(cols, self._frozen)
+        self._add_chunk(_Chunk(self._frozen, cols.num_rows, source=(f, row_group)), cols.column("ts"), cols.column("tags"), ids)
+
+    def _add_chunk(self, chunk: _Chunk, ts: pa.ChunkedArray, tags: pa.ChunkedArray, ids: np.ndarray) -> None:
+        if chunk.rows == 0:
+            return
+        self._chunks.append(chunk)
+        self._chunk_starts.append(chunk.start)
+        self._frozen += chunk.rows
+        self._ts.extend(ts.to_numpy())
+        self._encode_tags(tags)
+        self._extend_rows(ids)
+
+    def truncate(self, n: int) -> None:
+        # Drops rows from n on. A sealed chunk straddling n keeps its first rows.
+        if n >= len(self):
+            return
+        with self._lock:
+            if n < self._frozen:
+                keep = bisect.bisect_left(self._chunk_starts, n)
+                del self._chunks[keep:], self._chunk_starts[keep:]
+                if self._chunks and self._chunks[-1].start + self._chunks[-1].rows > n:
+                    c = self._chunks[-1]
+                    self._chunks[-1] = _Chunk(c.start, n - c.start, table=c.table.slice(0, n - c.start))
+                self._frozen = n
+            self._tail = {name: values[: n - self._frozen] for name, values in self._tail.items()}
+            self._ts.truncate(n)
+            self.dead_rows -= int(self._dead.view()[n:].sum())
+            for arr in (self._ids, self._dead, self._counts):
+                arr.truncate(n)
+            self._tag_ids.truncate(int(self._tag_offsets.view()[n]))
+            self._tag_offsets.truncate(n + 1)
+
+    def seal(self) -> None:
+        # Moves rows recorded since the last seal into an Arrow chunk.
+        n = len(self._tail["query"])
+        if not n:
+            return
+        table = self._tail_table(0, n)
+        with self._lock:
+            self._chunks.append(_Chunk(self._frozen, n, table=table))
+            self._chunk_starts.append(self._frozen)
+            self._frozen += n
+            self._tail = {name: [] for name in _TEXT_FIELDS}
+
+    def _tail_table(self, start: int, stop: int) -> pa.Table:
+        base = self._frozen
+        return self._build_table(base + start, base + stop, self._tail["query"][start:stop], self._tail["response"][start:stop], self._tail["thought"][start:stop])
+
+    def _build_table(self, start: int, stop: int, queries: List[str], responses: List[str], thoughts: List[Dict[str, Any]]) -> pa.Table:
+        offsets = self._tag_offsets.view()[start : stop + 1]
+        ids = self._tag_ids.view()[offsets[0] : offsets[-1]]
+        tags = pa.ListArray.from_arrays(
+            pa.array(offsets - offsets[0], pa.int32()),
+            pa.DictionaryArray.from_arrays(pa.array(ids, pa.int32()), pa.array(self.tag_vocab, pa.string())).cast(pa.string()),
+        )
+        return pa.table(
+            [
+                pa.array(self._ts.view()[start:stop], pa.float64()),
+                pa.array(queries, pa.string()),
+                pa.array(responses, pa.string()),
+                pa.array(thoughts, THOUGHT_TYPE),
+                tags,
+            ],
+            schema=EPISODE_SCHEMA,
+        )
+
+    def to_arrow(self, start: int = 0, stop: Optional[int] = None) -> pa.Table:
+        stop = len(self) if stop is None else min(stop, len(self))
+        parts: List[pa.Table] = []
+        for c in self._chunks:
+            lo, hi = max(start, c.start), min(stop, c.start + c.rows)
+            if lo < hi:
+                parts.append(c.table.slice(lo - c.start, hi - lo))
+        if stop > self._frozen:
+            parts.append(self._tail_table(max(start, self._frozen) - self._frozen, stop - self._frozen))
+        ids = pa.array(self._ids.view()[start:stop], pa.int64())
+        if not parts:
+            return EPISODE_SCHEMA.empty_table().append_column(ID_FIELD, ids)
+        table = parts[0] if len(parts) == 1 else pa.concat_tables(parts)
+        return table.append_column(ID_FIELD, ids)
+
+    def take(self, rows: np.ndarray, tail_from: int, kept: Optional[pa.Table] = None) -> "EpisodeTable":
+        # A new table holding `rows` (all below tail_from) as one sealed chunk plus rows
+        # [tail_from, len) as unsealed tail; ids, tombstones and counts carry over.
+        # `kept` is to_arrow(0, tail_from).take(rows) when the caller already built it.
+        out = EpisodeTable()
+        out.next_id = self.next_id
+        out.add_table(kept if kept is not None else self.to_arrow(0, tail_from).take(pa.array(rows, pa.int64())))
+        extra = self.to_arrow(tail_from, len(self))
+        if extra.num_rows:
+            cols = extra.to_pydict()
+            out.append_batch(cols["ts"], cols["query"], cols["response"], cols["thought"], cols["tags"], ids=np.asarray(cols[ID_FIELD], dtype=np.int64))
+        src = np.concatenate([np.asarray(rows, dtype=np.int64), np.arange(tail_from, len(self), dtype=np.int64)])
+        out._counts.view()[:] = self._counts.view()[src]
+        out.tombstone(np.flatnonzero(self._dead.view()[src]))
+        return out
+
+    def tag_postings(self) -> Dict[str, np.ndarray]:
+        # Rows per tag, built with one stable sort over all (row, tag id) pairs.
+        offsets = self._tag_offsets.view()
+        ids = self._tag_ids.view()
+        if ids.size == 0:
+            return {}
+        rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(offsets))
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        bounds = np.flatnonzero(np.diff(sorted_ids)) + 1
+        out: Dict[str, np.ndarray] = {}
+        for group in np.split(order, bounds):
+            out[self.tag_vocab[int(ids[group[0]])]] = np.unique(rows[group])
+        return out
+
+
+def _read_light(f: pq.ParquetFile, row_group: int) -> pa.Table:
+    columns = ["ts", "tags"] + ([ID_FIELD] if ID_FIELD in f.schema_arrow.names else [])
+    table = f.read_row_group(row_group, columns=columns)
+    if pa.types.is_string(table.schema.field("tags").type):
+        tags = pa.array([t.split(",") if t else [] for t in table.column("tags").to_pylist()], pa.list_(pa.string()))
+        table = table.set_column(1, "tags", tags)
+    return table
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import os
+import re
+
+import numpy as np
+from pydantic import BaseModel
+
+from .episodes import Growable
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class RetrievalPolicy(BaseModel):
+    mode: str = "vector"  # "vector" | "lexical" | "hybrid" | "auto"
+    hybrid_alpha: float = 0.5  # weight of the vector score in hybrid fusion; the rest is BM25
+    auto_min_score: float = 0.8  # "auto" answers lexically when the best BM25 match scores this high
+    candidates_factor: int = 4  # hybrid fuses top_k * factor candidates from each side
+    k1: float = 1.2
+    b: float = 0.75
+
+    @property
+    def lexical(self) -> bool:
+        return self.mode != "vector"
+
+
+# Incrementally built BM25 inverted index over episode text. Rows are appended in order, so
+# each term's postings (row, term frequency) stay sorted and grow by capacity doubling like
+# TagIndex. Scores are divided by the summed idf of the query terms, so about 1.0 means
+# every query term matched once in a document of average length; repeated terms and short
+# documents score a little higher. That keeps lexical scores near the 0..1 range that
+# cosine scores use downstream.
+class LexicalIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._terms: Dict[str, int] = {}
+        self._rows: List[np.ndarray] = []
+        self._tfs: List[np.ndarray] = []
+        self._sizes: List[int] = []
+        self._doc_len = Growable(np.float32)
+        self._total_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    @property
+    def terms(self) -> int:
+        return len(self._terms)
+
+    def add(self, texts: Iterable[str]) -> None:
+        row = len(self)
+        grouped: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths: List[int] = []
+        for text in texts:
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                rows, tfs = grouped.setdefault(term, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+            row += 1
+        self._doc_len.extend(lengths)
+        self._total_len += float(sum(lengths))
+        for term, (rows, tfs) in grouped.items():
+            self._extend(term, np.asarray(rows, dtype=np.int64), np.asarray(tfs, dtype=np.int32))
+
+    def _extend(self, term: str, rows: np.ndarray, tfs: np.ndarray) -> None:
+        t = self._terms.get(term)
+        if t is None:
+            t = self._terms[term] = len(self._rows)
+            self._rows.append(rows)
+            self._tfs.append(tfs)
+            self._sizes.append(rows.size)
+            return
+        size = self._sizes[t]
+        buf_r, buf_t = self._rows[t], self._tfs[t]
+        if size + rows.size > buf_r.shape[0]:
+            capacity = max(8, buf_r.shape[0])
+            while capacity < size + rows.size:
+                capacity *= 2
+            grown_r = np.empty(capacity, dtype=np.int64)
+            grown_t = np.empty(capacity, dtype=np.int32)
+            grown_r[:size] = buf_r[:size]
+            grown_t[:size] = buf_t[:size]
+            self._rows[t], self._tfs[t] = buf_r, buf_t = grown_r, grown_t
+        buf_r[size : size + rows.size] = rows
+        buf_t[size : size + rows.size] = tfs
+        self._sizes[t] = size + rows.size
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        t = self._terms.get(term)
+        if t is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        n = self._sizes[t]
+        return self._rows[t][:n], self._tfs[t][:n]
+
+    def _idf(self, df: int) -> float:
+        n = len(self)
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def _contributions(self, query: str) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], float]:
+        # Per-term (rows, partial scores) and the normaliser (summed idf of every query term,
+        # including terms no episode contains).
+        n = len(self)
+        if not n:
+            return [], 1.0
+        avg = self._total_len / n or 1.0
+        doc_len = self._doc_len.view()
+        parts: List[Tuple[np.ndarray, np.ndarray]] = []
+        norm = 0.0
+        for term in set(tokenize(query)):
+            rows, tfs = self.postings(term)
+            idf = self._idf(rows.size)
+            norm += idf
+            if not rows.size:
+                continue
+            tf = tfs.astype(np.float32)
+            denom = tf + self.k1 * (1.0 - self.b + self.b * doc_len[rows] / avg)
+            parts.append((rows, idf * tf * (self.k1 + 1.0) / denom))
+        return parts, norm or 1.0
+
+    def scores(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Matching rows and their normalised scores. Dense accumulation once the postings
+        # touched are a sizeable share of all rows, sparse otherwise.
+        parts, norm = self._contributions(query)
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = np.concatenate([r for r, _ in parts])
+        contrib = np.concatenate([c for _, c in parts])
+        if rows.size * 8 >= len(self):
+            dense = np.bincount(rows, weights=contrib, minlength=len(self))
+            hit = np.flatnonzero(dense)
+            summed = dense[hit]
+        else:
+            hit, inverse = np.unique(rows, return_inverse=True)
+            summed = np.bincount(inverse, weights=contrib)
+        return hit, (summed / norm).astype(np.float32)
+
+    def score_rows(self, query: str, rows: np.ndarray) -> np.ndarray:
+        hit, scores = self.scores(query)
+        out = np.zeros(rows.shape[0], dtype=np.float32)
+        if hit.size:
+            at = np.searchsorted(hit, rows)
+            at = np.minimum(at, hit.size - 1)
+            found = hit[at] == rows
+            out[found] = scores[at[found]]
+        return out
+
+    def search(self, query: str, top_k: int, exclude: Optional[np.ndarray] = None, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        # exclude: boolean mask of rows to skip (tombstones); allowed: sorted candidate rows.
+        hit, scores = self.scores(query)
+        if exclude is not None and hit.size:
+            keep = ~exclude[hit]
+            hit, scores = hit[keep], scores[keep]
+        if allowed is not None and hit.size:
+            keep = np.isin(hit, allowed, assume_unique=True)
+            hit, scores = hit[keep], scores[keep]
+        k = min(top_k, hit.size)
+        if k <= 0:
+            return []
+        order = np.argpartition(-scores, k - 1)[:k]
+        kth = scores[order].min()
+        above = np.flatnonzero(scores > kth)
+        order = np.concatenate([above, np.flatnonzero(scores == kth)[: k - above.size]])
+        order = order[np.lexsort((order, -scores[order]))]
+        return [(int(hit[i]), float(scores[i])) for i in order]
+
+    def take(self, keep: np.ndarray, tail_from: int) -> "LexicalIndex":
+        # The index after a vacuum: rows in `keep` (sorted, < tail_from) are renumbered
+        # densely and rows from tail_from on (appended during the vacuum) follow them.
+        n = len(self)
+        remap = np.full(n, -1, dtype=np.int64)
+        remap[keep] = np.arange(keep.size)
+        remap[tail_from:] = keep.size + np.arange(n - tail_from)
+        out = LexicalIndex(self.k1, self.b)
+        for term, t in self._terms.items():
+            rows = remap[self._rows[t][: self._sizes[t]]]
+            ok = rows >= 0
+            if ok.any():
+                out._extend(term, rows[ok], self._tfs[t][: self._sizes[t]][ok])
+        lengths = self._doc_len.view()[remap >= 0]
+        out._doc_len.extend(lengths)
+        out._total_len = float(lengths.sum())
+        return out
+
+    def truncate(self, rows: int) -> None:
+        # Drops rows from `rows` on. Terms keep their slots; one left without postings scores
+        # like a term no row ever contained.
+        if rows >= len(self):
+            return
+        for t, size in enumerate(self._sizes):
+            if size and self._rows[t][size - 1] >= rows:
+                self._sizes[t] = int(np.searchsorted(self._rows[t][:size], rows))
+        self._total_len -= float(self._doc_len.view()[rows:].sum(dtype=np.float64))
+        self._doc_len.truncate(rows)
+
+    # Persistence: one npz of CSR arrays (terms, offsets, rows, tfs) plus document lengths.
+    def to_arrays(self, last_id: int) -> Dict[str, np.ndarray]:
+        terms = list(self._terms)
+        slots = [self._terms[t] for t in terms]
+        sizes = np.asarray([self._sizes[t] for t in slots], dtype=np.int64)
+        rows = np.concatenate([self._rows[t][: self._sizes[t]] for t in slots]) if slots else np.zeros(0, np.int64)
+        tfs = np.concatenate([self._tfs[t][: self._sizes[t]] for t in slots]) if slots else np.zeros(0, np.int32)
+        return {
+            "terms": np.asarray(terms, dtype=np.str_),
+            "offsets": np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+            "rows": rows.astype(np.int32) if len(self) < 2**31 else rows,
+            "tfs": tfs.astype(np.uint16) if tfs.size and tfs.max() < 2**16 else tfs,
+            "doc_len": self._doc_len.view().astype(np.uint32),
+            "meta": np.array([self.k1, self.b, float(last_id)], dtype=np.float64),
+        }
+
+    def save(self, path: str, last_id: int) -> int:
+        return write_arrays(path, self.to_arrays(last_id))
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["LexicalIndex", int]:
+        # Returns the index and the episode id of the last row it covers (-1 when empty).
+        with np.load(path) as data:
+            k1, b, last_id = (float(v) for v in data["meta"])
+            index = cls(k1, b)
+            offsets = data["offsets"]
+            rows = data["rows"].astype(np.int64)
+            tfs = data["tfs"].astype(np.int32)
+            for t, term in enumerate(data["terms"].tolist()):
+                lo, hi = int(offsets[t]), int(offsets[t + 1])
+                index._terms[term] = t
+                index._rows.append(rows[lo:hi])
+                index._tfs.append(tfs[lo:hi])
+                index._sizes.append(hi - lo)
+            doc_len = data["doc_len"].astype(np.float32)
+        index._doc_len.extend(doc_len)
+        index._total_len = float(doc_len.sum())
+        return index, int(last_id)
+
+
+def write_arrays(path: str, arrays: Dict[str, np.ndarray]) -> int:
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(path + ".tmp", path)
+    return os.path.getsize(path)
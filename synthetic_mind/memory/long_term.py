@@ -1,160 +1,921 @@
-from __future__ import annotations
-
-from typing import List, Dict, Any, Tuple, Optional
-import time
-import os
-import numpy as np
-
-try:
-    import faiss  # type: ignore
-except Exception:  # pragma: no cover
-    faiss = None
-
-# Lazy import moved into _ensure_embedder
-# from sentence_transformers import SentenceTransformer
-import pyarrow as pa
-import pyarrow.parquet as pq
-from ..types import Thought
-
-
-class LongTermMemory:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", storage_dir: Optional[str] = None) -> None:
-        self.episodes: List[Dict[str, Any]] = []
-        self.tags_index: Dict[str, List[int]] = {}
-        self._embedder = None
-        self.model_name = model_name
-        self.dim = None
-        self.index = None
-        self._embeddings: List[np.ndarray] = []
-        if faiss is not None:
-            # Will instantiate after we know dim, but allow empty index for load()
-            self.index = None
-        self.storage_dir = storage_dir
-        if self.storage_dir:
-            os.makedirs(self.storage_dir, exist_ok=True)
-
-    def _ensure_embedder(self) -> None:
-        if self._embedder is None:
-            from sentence_transformers import SentenceTransformer
-            self._embedder = SentenceTransformer(self.model_name)
-            self.dim = self._embedder.get_sentence_embedding_dimension()
-            if faiss is not None and self.index is None and self._embeddings:
-                self.index = faiss.IndexFlatIP(self.dim)
-                self.index.add(np.stack(self._embeddings, axis=0).astype(np.float32))
-
-    def _embed(self, text: str) -> np.ndarray:
-        self._ensure_embedder()
-        vec = self._embedder.encode([text], convert_to_numpy=True, normalize_embeddings=True)[0]
-        return vec.astype(np.float32)
-
-    def record_episode(self, query: str, response: str, thought: Thought, tags: List[str] | None = None) -> None:
-        entry = {
-            "ts": float(time.time()),
-            "query": query,
-            "response": response,
-            "thought": thought.model_dump(),
-            "tags": tags or [],
-        }
-        idx = len(self.episodes)
-        self.episodes.append(entry)
-        text = f"Q: {query}\nA: {response}\nWhy: {thought.rationale}"
-        emb = self._embed(text)
-        self._embeddings.append(emb)
-        if faiss is not None:
-            if self.index is None:
-                # Initialize index now that we know dim
-                self.index = faiss.IndexFlatIP(int(emb.shape[0]))
-            self.index.add(emb.reshape(1, -1))
-        for t in entry["tags"]:
-            self.tags_index.setdefault(t, []).append(idx)
-
-    def recent(self, k: int = 5) -> List[Dict[str, Any]]:
-        return self.episodes[-k:]
-
-    def search(self, query: str, top_k: int = 5, required_tags: List[str] | None = None) -> List[Tuple[int, float]]:
-        if not self.episodes:
-            return []
-        q = self._embed(query)
-        if self.index is not None:
-            D, I = self.index.search(q.reshape(1, -1), min(top_k, len(self.episodes)))
-            candidates = [(int(i), float(d)) for i, d in zip(I[0], D[0]) if i != -1]
-        else:
-            sims = np.array([float(np.dot(q, e)) for e in self._embeddings])
-            order = np.argsort(-sims)[:top_k]
-            candidates = [(int(i), float(sims[int(i)])) for i in order]
-        if required_tags:
-            allowed = set.intersection(*(set(self.tags_index.get(t, [])) for t in required_tags)) if required_tags else set()
-            candidates = [(i, s) for i, s in candidates if i in allowed]
-        return candidates
-
-    def get_episodes(self, indices: List[int]) -> List[Dict[str, Any]]:
-        return [self.episodes[i] for i in indices if 0 <= i < len(self.episodes)]
-
-    # Persistence APIs
-    def save(self, directory: Optional[str] = None) -> None:
-        dir_path = directory or self.storage_dir
-        if not dir_path:
-            return
-        os.makedirs(dir_path, exist_ok=True)
-        rows = []
-        for e in self.episodes:
-            rows.append(
-                {
-                    "ts": e["ts"],
-                    "query": e["query"],
-                    "response": e["response"],
-                    "thought": str(e["thought"]),
-                    "tags": ",".join(e.get("tags", [])),
-                }
-            )
-        table = pa.Table.from_pylist(rows)
-        pq.write_table(table, os.path.join(dir_path, "episodes.parquet"))
-        if self._embeddings:
-            embs = np.stack(self._embeddings, axis=0)
-            np.save(os.path.join(dir_path, "embeddings.npy"), embs)
-        if faiss is not None and self.index is not None:
-            faiss.write_index(self.index, os.path.join(dir_path, "index.faiss"))
-        np.save(os.path.join(dir_path, "tags_index.npy"), self._serialize_tags_index())
-
-    def load(self, directory: Optional[str] = None) -> None:
-        dir_path = directory or self.storage_dir
-        if not dir_path or not os.path.exists(dir_path):
-            return
-        eps_path = os.path.join(dir_path, "episodes.parquet")
-        if os.path.exists(eps_path):
-            table = pq.read_table(eps_path)
-            self.episodes = []
-            for r in table.to_pylist():
-                self.episodes.append(
-                    {
-                        "ts": float(r["ts"]),
-                        "query": r["query"],
-                        "response": r["response"],
-                        "thought": self._safe_eval_thought(r["thought"]),
-                        "tags": r["tags"].split(",") if r["tags"] else [],
-                    }
-                )
-        emb_path = os.path.join(dir_path, "embeddings.npy")
-        if os.path.exists(emb_path):
-            embs = np.load(emb_path)
-            self._embeddings = [embs[i] for i in range(embs.shape[0])]
-            if faiss is not None:
-                # Initialize index later when embedder is ensured (dim may be None now)
-                self.index = faiss.IndexFlatIP(int(embs.shape[1]))
-                self.index.add(embs.astype(np.float32))
-        tags_path = os.path.join(dir_path, "tags_index.npy")
-        if os.path.exists(tags_path):
-            self.tags_index = self._deserialize_tags_index(np.load(tags_path, allow_pickle=True).item())
-
-    def _serialize_tags_index(self) -> Dict[str, np.ndarray]:
-        return {k: np.array(v, dtype=np.int64) for k, v in self.tags_index.items()}
-
-    def _deserialize_tags_index(self, data: Dict[str, Any]) -> Dict[str, List[int]]:
-        return {k: list(map(int, list(v))) for k, v in data.items()}
-
-    def _safe_eval_thought(self, s: str) -> Dict[str, Any]:
-        try:
-            import json
-            return json.loads(s.replace("'", '"'))
-        except Exception:
-            return {"raw": s}
+from __future__ import annotations
+
+from typing import List, Dict, Any, Mapping, Tuple, Optional
+import json
+import threading
+import time
+import os
+import numpy as np
+
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None
+
+# Lazy import moved into _ensure_embedder
+# from sentence_transformers import SentenceTransformer
+import pyarrow as pa
+import pyarrow.parquet as pq
+from ..metrics import METRICS
+from ..types import Thought
+from .ann import IndexPolicy, add_vectors, build_index, describe, search_params, set_search_params, supports_remove
+from .batcher import EmbeddingBatcher
+from .embed_cache import EmbeddingCache
+from .embedders import HashingEmbedder
+from .embeddings import EmbeddingMatrix
+from .episodes import EpisodeTable, normalize_table
+from .lexical import LexicalIndex, RetrievalPolicy, write_arrays
+from .postings import TagIndex
+from .segments import SegmentStore
+
+
+TOMBSTONES = "tombstones.npz"
+LEXICAL = "lexical.npz"
+
+
+class LongTermMemory:
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        storage_dir: Optional[str] = None,
+        compact_after: int = 8,
+        mmap_mode: Optional[str] = None,
+        index_policy: Optional[IndexPolicy] = None,
+        cache_entries: int = 0,
+        cache_bytes: Optional[int] = None,
+        persist_cache: bool = False,
+        batch_max_size: int = 0,
+        batch_max_wait_ms: float = 2.0,
+        retrieval: Optional[RetrievalPolicy] = None,
+    ) -> None:
+        self.episodes = EpisodeTable()
+        self.tags_index = TagIndex()
+        # BM25 index over query/response text. Built on first lexical search (or at load when
+        # the retrieval mode uses it) and then kept up to date by record_embedded.
+        self.retrieval = retrieval or RetrievalPolicy()
+        self.lexical: Optional[LexicalIndex] = None
+        self._lexical_persisted_rows = 0
+        self._embedder = None
+        self._embedder_lock = threading.Lock()
+        self._warmer: Optional[threading.Thread] = None
+        self.load_profile: Dict[str, float] = {}
+        self.embedder_load_s: Optional[float] = None
+        self.model_name = model_name
+        self.dim = None
+        self.index = None
+        # Exact search scores this matrix directly; self.index is only set for approximate tiers.
+        self._embeddings = EmbeddingMatrix()
+        # Bumped whenever existing rows may change (load, removal); appends only grow len().
+        self.generation = 0
+        # Removed ids the index may still hold: an HNSW graph in memory (filtered at search
+        # time), or the persisted copy of a removable index (re-applied when it is loaded).
+        self._index_removed = np.zeros(0, dtype=np.int64)
+        self._index_filter: Optional[Tuple[Any, Any]] = None
+        # Consolidation state: episodes with ids below the watermark were already deduplicated.
+        self._dedup_watermark = 0
+        self._tombstones_dirty = False
+        self.mmap_mode = mmap_mode
+        self.index_policy = index_policy or IndexPolicy()
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._index_builder: Optional[threading.Thread] = None
+        self._index_persisted_rows = 0
+        self.storage_dir = storage_dir
+        self.compact_after = compact_after
+        self._stores: Dict[str, SegmentStore] = {}
+        if self.storage_dir:
+            os.makedirs(self.storage_dir, exist_ok=True)
+        self.embed_cache: Optional[EmbeddingCache] = None
+        if cache_entries > 0:
+            cache_path = os.path.join(self.storage_dir, "embed_cache.npz") if (persist_cache and self.storage_dir) else None
+            self.embed_cache = EmbeddingCache(model_name, max_entries=cache_entries, max_bytes=cache_bytes, path=cache_path)
+        # Coalesces concurrent small encodes (searches, single records) into shared forward passes.
+        self.batcher: Optional[EmbeddingBatcher] = None
+        if batch_max_size > 1:
+            self.batcher = EmbeddingBatcher(self._encode_direct, max_batch_size=batch_max_size, max_wait_ms=batch_max_wait_ms)
+        METRICS.add_collector(self, LongTermMemory._gauges)
+
+    def _gauges(self) -> Dict[str, float]:
+        out = {
+            "ltm_episodes": float(len(self.episodes)),
+            "ltm_dead_episodes": float(self.episodes.dead_rows),
+            "ltm_embedding_bytes": float(self._embeddings.nbytes),
+            "ltm_index_rows": float(self.index.ntotal) if self.index is not None else 0.0,
+        }
+        if self.lexical is not None:
+            out["ltm_lexical_terms"] = float(self.lexical.terms)
+        if self.embed_cache is not None:
+            stats = self.embed_cache.stats()
+            out.update(ltm_embed_cache_entries=stats["entries"], ltm_embed_cache_hits=stats["hits"], ltm_embed_cache_misses=stats["misses"])
+        if self.batcher is not None:
+            out["ltm_embed_batcher_queue_depth"] = float(self.batcher.queue_depth)
+        return out
+
+    def _ensure_embedder(self) -> None:
+        if self._embedder is not None:
+            return
+        with self._embedder_lock:
+            if self._embedder is None:
+                t0 = time.perf_counter()
+                if self.model_name.startswith("hashing"):
+                    embedder = HashingEmbedder.from_name(self.model_name)
+                else:
+                    from sentence_transformers import SentenceTransformer
+                    embedder = SentenceTransformer(self.model_name)
+                self.dim = embedder.get_sentence_embedding_dimension()
+                self._embedder = embedder
+                self.embedder_load_s = time.perf_counter() - t0
+
+    def warm_embedder(self) -> None:
+        # Loads the model on a background thread so the first search does not pay for it.
+        if self._embedder is not None or (self._warmer is not None and self._warmer.is_alive()):
+            return
+        self._warmer = threading.Thread(target=self._ensure_embedder, name="ltm-embedder-warmup", daemon=True)
+        self._warmer.start()
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        if self.embed_cache is None:
+            return self._encode(texts, batch_size)
+        cached = self.embed_cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        if missing:
+            fresh = self._encode(missing, batch_size)
+            self.embed_cache.put_many(missing, fresh)
+            by_text = dict(zip(missing, fresh))
+            cached = [v if v is not None else by_text[t] for t, v in zip(texts, cached)]
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    def _encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        # After close() the batcher is gone and encodes run directly.
+        if self.batcher is not None and not self.batcher.closed and len(texts) < self.batcher.max_batch_size:
+            return self.batcher.encode(texts)
+        return self._encode_direct(texts, batch_size)
+
+    def _encode_direct(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        self._ensure_embedder()
+        t0 = time.perf_counter()
+        vecs = self._embedder.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+        METRICS.observe("ltm_embed_seconds", time.perf_counter() - t0)
+        METRICS.inc("ltm_embed_calls_total")
+        METRICS.inc("ltm_embed_texts_total", len(texts))
+        return np.asarray(vecs, dtype=np.float32).reshape(len(texts), -1)
+
+    def record_episode(self, query: str, response: str, thought: Thought, tags: List[str] | None = None) -> None:
+        self.record_episodes([query], [response], [thought], [tags or []])
+
+    def record_episodes(
+        self,
+        queries: List[str],
+        responses: List[str],
+        thoughts: List[Thought],
+        tags: List[List[str]] | None = None,
+        batch_size: int = 64,
+    ) -> None:
+        if not queries:
+            return
+        if len(responses) != len(queries) or len(thoughts) != len(queries) or (tags is not None and len(tags) != len(queries)):
+            raise ValueError("record_episodes expects queries, responses, thoughts and tags of equal length")
+        tags = tags if tags is not None else [[] for _ in queries]
+        texts = [episode_text(q, r, t) for q, r, t in zip(queries, responses, thoughts)]
+        self.record_embedded(queries, responses, thoughts, tags, self.embed_many(texts, batch_size=batch_size))
+
+    def record_embedded(
+        self,
+        queries: List[str],
+        responses: List[str],
+        thoughts: List[Thought],
+        tags: List[List[str]],
+        embs: np.ndarray,
+        ts: Optional[List[float]] = None,
+        ids: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        # Appends episodes whose embeddings were computed elsewhere (e.g. by a shard router
+        # or a bulk import) and returns their ids. ts defaults to now; ids default to the next
+        # free ones, and given ids (a shard router numbers episodes across shards) must be
+        # ascending and above every id already used.
+        ts = ts if ts is not None else [float(time.time())] * len(queries)
+        with self._lock:
+            if ids is not None:
+                ids = np.asarray(ids, dtype=np.int64)
+                if ids.size and (ids[0] < self.episodes.next_id or np.any(np.diff(ids) <= 0)):
+                    raise ValueError("record_embedded ids must be ascending and above every id already used")
+            start = len(self.episodes)
+            ids = self.episodes.append_batch(ts, list(queries), list(responses), [t.model_dump() for t in thoughts], tags, ids=ids)
+            self._embeddings.append(embs)
+            if self.index is not None:
+                add_vectors(self.index, embs, ids)
+            self.tags_index.add_grouped(self._group_tags(tags, start))
+            if self.lexical is not None and len(self.lexical) == start:
+                self.lexical.add(q + "\n" + r for q, r in zip(queries, responses))
+        self._maybe_build_index()
+        return ids
+
+    def _group_tags(self, tags: List[List[str]], start: int) -> Dict[str, List[int]]:
+        grouped: Dict[str, List[int]] = {}
+        for offset, tg in enumerate(tags):
+            for t in dict.fromkeys(tg or []):
+                grouped.setdefault(t, []).append(start + offset)
+        return grouped
+
+    def recent(self, k: int = 5) -> List[Mapping[str, Any]]:
+        if not self.episodes.dead_rows:
+            return self.episodes[-k:]
+        dead = self.episodes.dead
+        out: List[Mapping[str, Any]] = []
+        i = len(self.episodes) - 1
+        while i >= 0 and len(out) < k:
+            if not dead[i]:
+                out.append(self.episodes[i])
+            i -= 1
+        return out[::-1]
+
+    def search(self, query: str, top_k: int = 5, required_tags: List[str] | None = None, mode: Optional[str] = None) -> List[Tuple[int, float]]:
+        # mode (default: retrieval.mode): "vector" embeds the query; "lexical" answers from
+        # BM25 alone, without the embedder; "hybrid" fuses both; "auto" answers lexically when
+        # the best BM25 match is strong enough and falls back to hybrid otherwise.
+        return self.search_at(query, top_k, required_tags, mode)[0]
+
+    def search_at(
+        self, query: str, top_k: int = 5, required_tags: List[str] | None = None, mode: Optional[str] = None
+    ) -> Tuple[List[Tuple[int, float]], Optional[np.ndarray], int, int]:
+        # search() plus what a caller needs to extend the result later: the query vector (vector
+        # mode only, None otherwise) and the row count and generation the hits were computed at.
+        # All are read under the lock the search holds, so rows appended meanwhile are neither in
+        # the hits nor counted, and search_range_at(q, rows, ...) picks them up exactly once.
+        mode = mode or self.retrieval.mode
+        if mode not in ("vector", "lexical", "auto", "hybrid"):
+            raise ValueError(f"unknown retrieval mode: {mode}")
+        if not self.episodes:
+            return [], None, 0, self.generation
+        t0 = time.perf_counter()
+        # Embedding happens before taking the lock, except for auto's hybrid fallback.
+        q = self.embed(query) if mode in ("vector", "hybrid") else None
+        with self._lock:
+            rows, generation = len(self.episodes), self.generation
+            if mode == "vector":
+                out = self.search_vector(q, top_k=top_k, required_tags=required_tags)
+            elif mode == "hybrid":
+                out = self.search_hybrid(query, q, top_k=top_k, required_tags=required_tags)
+            else:
+                out = self.search_lexical(query, top_k=top_k, required_tags=required_tags)
+                if mode == "auto":
+                    lexical = bool(out) and out[0][1] >= self.retrieval.auto_min_score
+                    METRICS.inc("ltm_auto_search_total", labels={"path": "lexical" if lexical else "hybrid"})
+                    if not lexical:
+                        out = self.search_hybrid(query, self.embed(query), top_k=top_k, required_tags=required_tags)
+        METRICS.observe("ltm_search_seconds", time.perf_counter() - t0, {"filtered": "yes" if required_tags else "no", "mode": mode})
+        return out, q if mode == "vector" else None, rows, generation
+
+    def search_lexical(self, query: str, top_k: int = 5, required_tags: List[str] | None = None) -> List[Tuple[int, float]]:
+        with self._lock:
+            self._ensure_lexical()
+            allowed = self.tags_index.intersect(required_tags) if required_tags else None
+            dead = self.episodes.dead if self.episodes.dead_rows else None
+            return self.lexical.search(query, top_k, exclude=dead, allowed=allowed)
+
+    def search_hybrid(self, query: str, q: np.ndarray, top_k: int = 5, required_tags: List[str] | None = None) -> List[Tuple[int, float]]:
+        # Candidates from both sides, each re-scored on the other, fused as
+        # alpha * cosine + (1 - alpha) * normalised BM25.
+        k = top_k * max(1, self.retrieval.candidates_factor)
+        vector = self.search_vector(q, top_k=k, required_tags=required_tags)
+        with self._lock:
+            lexical = self.search_lexical(query, top_k=k, required_tags=required_tags)
+            rows = np.unique(np.asarray([r for r, _ in vector] + [r for r, _ in lexical], dtype=np.int64))
+            if not rows.size:
+                return []
+            alpha = self.retrieval.hybrid_alpha
+            fused = alpha * (self._embeddings.rows(rows) @ q) + (1.0 - alpha) * self.lexical.score_rows(query, rows)
+        return topk(fused, rows, top_k)
+
+    def _ensure_lexical(self) -> None:
+        # Indexes the rows the lexical index has not seen yet (all of them on first use).
+        if self.lexical is None:
+            self.lexical = LexicalIndex(self.retrieval.k1, self.retrieval.b)
+        start, stop = len(self.lexical), len(self.episodes)
+        for lo in range(start, stop, 50_000):
+            table = self.episodes.to_arrow(lo, min(stop, lo + 50_000))
+            queries = table.column("query").to_pylist()
+            responses = table.column("response").to_pylist()
+            self.lexical.add(f"{q}\n{r}" for q, r in zip(queries, responses))
+
+    def search_vector(self, q: np.ndarray, top_k: int = 5, required_tags: List[str] | None = None) -> List[Tuple[int, float]]:
+        with self._lock:
+            if required_tags:
+                return self._filtered_topk(q, top_k, self.tags_index.intersect(required_tags))
+            if self.index is not None:
+                params = self._removed_filter()
+                D, I = self.index.search(q.reshape(1, -1), min(self._shortlist(top_k), len(self._embeddings)), params=params)
+                return self._from_index(q, D[0], I[0], top_k)
+            return self._exact_topk(q, top_k)
+
+    def _shortlist(self, top_k: int) -> int:
+        return top_k * max(1, self.index_policy.rerank_factor) if self.index_policy.compressed else top_k
+
+    def search_vectors(self, queries: np.ndarray, top_k: int = 5) -> List[List[Tuple[int, float]]]:
+        # search_vector for a batch of query vectors in one index call or matrix product.
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self._embeddings.dim or queries.shape[-1])
+        with self._lock:
+            if self.index is not None:
+                k = min(self._shortlist(top_k), len(self._embeddings))
+                D, I = self.index.search(queries, k, params=self._removed_filter())
+                return [self._from_index(q, d, i, top_k) for q, d, i in zip(queries, D, I)]
+            sims = self._embeddings.scores(queries.T)
+            if sims.shape[0] and self.episodes.dead_rows:
+                sims[self.episodes.dead[: sims.shape[0]]] = -np.inf
+            return [topk(sims[:, j], None, top_k) for j in range(queries.shape[0])]
+
+    def vectors(self, rows: Any) -> np.ndarray:
+        return self._embeddings.rows(np.asarray(rows, dtype=np.int64))
+
+    def _removed_filter(self) -> Any:
+        # Search parameters excluding removed ids still present in an HNSW graph.
+        if not self._index_removed.size or supports_remove(self.index):
+            return None
+        if self._index_filter is None:
+            batch = faiss.IDSelectorBatch(self._index_removed)
+            self._index_filter = (batch, faiss.IDSelectorNot(batch))
+        return search_params(self.index, self._index_filter[1])
+
+    def _from_index(self, q: np.ndarray, D: np.ndarray, I: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        # The index holds stable ids; map them back to rows and drop tombstoned ones.
+        keep = I != -1
+        rows = self.episodes.rows_of(I[keep])
+        ok = rows >= 0
+        ok[ok] = ~self.episodes.dead[rows[ok]]
+        if not self.index_policy.compressed:
+            return [(int(r), float(d)) for r, d in zip(rows[ok], D[keep][ok])]
+        # Codes only approximate the vectors: re-score the shortlist at full precision.
+        rows = rows[ok]
+        return topk(self._embeddings.rows(rows) @ q, rows, top_k)
+
+    def search_range(self, q: np.ndarray, start: int, stop: int, top_k: int = 5) -> List[Tuple[int, float]]:
+        # Exact top-k over rows [start, stop), e.g. only the episodes added since a cached search.
+        with self._lock:
+            stop = min(stop, len(self._embeddings))
+            if start >= stop:
+                return []
+            sims = self._embeddings.slice(start, stop) @ q
+            if self.episodes.dead_rows:
+                sims[self.episodes.dead[start:stop]] = -np.inf
+            return topk(sims, np.arange(start, stop), top_k)
+
+    def search_range_at(self, q: np.ndarray, start: int, top_k: int = 5) -> Tuple[List[Tuple[int, float]], int, int]:
+        # search_range over every row from `start` on, with the row count and generation it saw.
+        with self._lock:
+            rows = len(self.episodes)
+            return self.search_range(q, start, rows, top_k), rows, self.generation
+
+    def _exact_topk(self, q: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        sims = self._embeddings.scores(q)
+        if self.episodes.dead_rows:
+            sims[self.episodes.dead[: sims.shape[0]]] = -np.inf
+        return topk(sims, None, top_k)
+
+    def _filtered_topk(self, q: np.ndarray, top_k: int, allowed: np.ndarray) -> List[Tuple[int, float]]:
+        # Tag filters are applied before scoring: small candidate sets are scored exactly
+        # row by row, large ones go through the approximate index with an id selector.
+        if self.episodes.dead_rows:
+            allowed = allowed[~self.episodes.dead[allowed]]
+        if allowed.size == 0:
+            return []
+        if self.index is None or allowed.size <= self.index_policy.filter_exact_max:
+            if allowed.size * 4 < len(self._embeddings):
+                return topk(self._embeddings.rows(allowed) @ q, allowed, top_k)
+            return topk(self._embeddings.scores(q)[allowed], allowed, top_k)
+        sel = faiss.IDSelectorBatch(self.episodes.ids[allowed])
+        params = search_params(self.index, sel)
+        D, I = self.index.search(q.reshape(1, -1), min(self._shortlist(top_k), int(allowed.size)), params=params)
+        return self._from_index(q, D[0], I[0], top_k)
+
+    def get_episodes(self, indices: List[int]) -> List[Mapping[str, Any]]:
+        return [self.episodes[i] for i in indices if 0 <= i < len(self.episodes)]
+
+    def episodes_at(self, indices: List[int], generation: int) -> Optional[List[Mapping[str, Any]]]:
+        # Episodes by row as numbered at `generation`; None once rows may have changed since.
+        with self._lock:
+            if self.generation != generation:
+                return None
+            return self.get_episodes(indices)
+
+    def columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Ids, timestamps and tombstone flags of every row, read together. Records running
+        # meanwhile only add rows past these and never change them; the flags are a copy.
+        with self._lock:
+            eps = self.episodes
+            n = len(eps)
+            return eps.ids[:n], eps.ts[:n], eps.dead[:n].copy()
+
+    # Approximate index tiering
+    def _maybe_build_index(self) -> None:
+        # Tiers follow live rows: tombstoned ones are left out of every build.
+        rows = len(self._embeddings) - self.episodes.dead_rows
+        if self.index is None:
+            if not self.index_policy.wants_index(rows):
+                return
+        elif not self._index_outgrown(rows):
+            return
+        if self._index_builder is not None and self._index_builder.is_alive():
+            return
+        self._index_builder = threading.Thread(target=self._build_index, name="ltm-index-builder", daemon=True)
+        self._index_builder.start()
+
+    def _index_outgrown(self, rows: int) -> bool:
+        # A compressed exhaustive index is replaced once the store crosses the ANN threshold,
+        # and an HNSW graph once too many of its nodes are removed episodes.
+        if describe(self.index)["kind"] == "flat" and self.index_policy.wants_ann(rows):
+            return True
+        removed = self._index_removed.size
+        return not supports_remove(self.index) and removed > self.index_policy.rebuild_removed_ratio * max(1, self.index.ntotal)
+
+    def _build_index(self) -> None:
+        # Train on a snapshot of live rows without holding the lock, then catch up on rows
+        # added and removed meanwhile and swap the new index in under the lock. Catch-up
+        # goes by stable id, so a vacuum renumbering rows in between is harmless.
+        with self._lock:
+            rows = len(self._embeddings)
+            live = np.flatnonzero(~self.episodes.dead[:rows])
+            if not self.index_policy.wants_index(int(live.size)):
+                # Removals took the store back below the threshold: exact search again, also
+                # after a reload.
+                self.index = None
+                self._index_removed = np.zeros(0, dtype=np.int64)
+                self._index_filter = None
+                self._index_persisted_rows = 0
+                for name in ("ann.json", "ann.faiss") if self.storage_dir else ():
+                    try:
+                        os.remove(os.path.join(self.storage_dir, name))
+                    except OSError:
+                        pass
+                return
+            ids = self.episodes.ids[live]
+            vectors = self._embeddings.slice(0, rows) if live.size == rows else self._embeddings.rows(live)
+            last = int(self.episodes.ids[rows - 1]) if rows else -1
+        index = build_index(self.index_policy, vectors, ids)
+        with self._lock:
+            eps = self.episodes
+            fresh = np.flatnonzero((eps.ids > last) & ~eps.dead)
+            if fresh.size:
+                add_vectors(index, self._embeddings.rows(fresh), eps.ids[fresh])
+            at = eps.rows_of(ids)
+            gone = ids[(at < 0) | eps.dead[np.maximum(at, 0)]]
+            if supports_remove(index):
+                if gone.size:
+                    index.remove_ids(faiss.IDSelectorBatch(gone))
+                # The persisted copy is older; it stops mattering once this index is written.
+                self._index_removed = np.union1d(self._index_removed, gone)
+            else:
+                self._index_removed = gone
+            self._index_filter = None
+            self.index = index
+        self._persist_index()
+
+    def wait_for_index(self) -> None:
+        # A lazy index load may hand over to a build, so wait until no worker is left.
+        while self._index_builder is not None:
+            worker = self._index_builder
+            worker.join()
+            if self._index_builder is worker:
+                break
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        if nprobe is not None:
+            self.index_policy.nprobe = int(nprobe)
+        if ef_search is not None:
+            self.index_policy.ef_search = int(ef_search)
+        with self._lock:
+            set_search_params(self.index, nprobe=nprobe, ef_search=ef_search)
+
+    def index_report(self, k: int = 10, n_queries: int = 200, queries: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        # Recall@k and per-query latency of the active index against exact search
+        # over the same matrix; queries default to a sample of stored embeddings.
+        rows = len(self._embeddings)
+        report: Dict[str, Any] = dict(describe(self.index), rows=rows, k=k, codec=self.index_policy.codec)
+        if rows == 0:
+            return report
+        # Resident bytes per episode: codes plus index structure, against float32 rows.
+        report["float32_bytes_per_episode"] = 4 * int(self._embeddings.dim or 0)
+        if self.index is not None:
+            with self._lock:
+                report["index_bytes_per_episode"] = faiss.serialize_index(self.index).nbytes / max(1, self.index.ntotal)
+        if queries is None:
+            ids = np.random.default_rng(0).choice(rows, min(n_queries, rows), replace=False)
+            queries = self._embeddings.rows(ids)
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        t0 = time.perf_counter()
+        exact = [{i for i, _ in self._exact_topk(q, k)} for q in queries]
+        report["flat_ms"] = 1000.0 * (time.perf_counter() - t0) / len(queries)
+        report["queries"] = int(len(queries))
+        if self.index is None:
+            report["recall_at_k"] = 1.0
+            report["ann_ms"] = report["flat_ms"]
+            return report
+        with self._lock:
+            t0 = time.perf_counter()
+            _, I = self.index.search(queries, k, params=self._removed_filter())
+            report["ann_ms"] = 1000.0 * (time.perf_counter() - t0) / len(queries)
+            I = self.episodes.rows_of(I.ravel()).reshape(I.shape)
+        hits = sum(len(exact[j] & {int(i) for i in I[j] if i != -1}) for j in range(len(queries)))
+        report["recall_at_k"] = hits / float(sum(len(e) for e in exact))
+        if self.index_policy.compressed:
+            t0 = time.perf_counter()
+            reranked = [{i for i, _ in self.search_vector(q, k)} for q in queries]
+            report["reranked_ms"] = 1000.0 * (time.perf_counter() - t0) / len(queries)
+            report["rerank_shortlist"] = self._shortlist(k)
+            hits = sum(len(exact[j] & reranked[j]) for j in range(len(queries)))
+            report["recall_at_k_reranked"] = hits / float(sum(len(e) for e in exact))
+        return report
+
+    def _persist_index(self) -> None:
+        if not self.storage_dir or self.index is None:
+            return
+        with self._lock:
+            index = self.index
+            data = faiss.serialize_index(index)
+            # Every live episode with an id up to max_id is in the serialized index.
+            meta = {
+                "rows": int(index.ntotal),
+                "ids": True,
+                "max_id": int(self.episodes.next_id) - 1,
+                "kind": describe(index)["kind"],
+                "codec": self.index_policy.codec,
+            }
+            removed = self._index_removed
+        path = os.path.join(self.storage_dir, "ann.faiss")
+        with open(path + ".tmp", "wb") as f:
+            f.write(data.tobytes())
+        os.replace(path + ".tmp", path)
+        with open(os.path.join(self.storage_dir, "ann.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self._index_persisted_rows = meta["rows"]
+        if supports_remove(index) and removed.size:
+            with self._lock:
+                self._index_removed = np.setdiff1d(self._index_removed, removed)
+                self._tombstones_dirty = True
+
+    def _load_index(self, dir_path: str) -> None:
+        meta_path = os.path.join(dir_path, "ann.json")
+        path = os.path.join(dir_path, "ann.faiss")
+        if faiss is None or not (os.path.exists(meta_path) and os.path.exists(path)):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("kind") not in (self.index_policy.kind, "flat") or meta.get("codec", "flat") != self.index_policy.codec:
+            return
+        # Indexes written before stable ids are rebuilt; so is one ahead of the store.
+        max_id = int(meta.get("max_id", -1))
+        if not meta.get("ids") or max_id >= self.episodes.next_id:
+            return
+        index = faiss.read_index(path)
+        if index.ntotal != int(meta["rows"]):
+            return
+        set_search_params(index, nprobe=self.index_policy.nprobe, ef_search=self.index_policy.ef_search)
+        with self._lock:
+            eps = self.episodes
+            fresh = np.flatnonzero((eps.ids > max_id) & ~eps.dead)
+            if fresh.size:
+                add_vectors(index, self._embeddings.rows(fresh), eps.ids[fresh])
+            stale = np.union1d(self._index_removed, eps.ids[eps.dead])
+            if not supports_remove(index):
+                self._index_removed = stale
+            elif stale.size:
+                index.remove_ids(faiss.IDSelectorBatch(stale))
+            self._index_filter = None
+            self.index = index
+        self._index_persisted_rows = int(meta["rows"])
+
+    # Persistence APIs
+    def _segment_store(self, dir_path: str, read_only: bool = False) -> SegmentStore:
+        store = self._stores.get(dir_path)
+        if store is None or (store.read_only and not read_only):
+            store = SegmentStore(dir_path, compact_after=self.compact_after, normalize=normalize_table, read_only=read_only)
+            self._stores[dir_path] = store
+        return store
+
+    def _episode_table(self, start: int, stop: int) -> pa.Table:
+        return self.episodes.to_arrow(start, stop)
+
+    def save(self, directory: Optional[str] = None) -> None:
+        dir_path = directory or self.storage_dir
+        if not dir_path:
+            return
+        # Only rows past what the directory's manifest already holds are written.
+        if self.embed_cache is not None and dir_path == self.storage_dir:
+            self.embed_cache.save(force=False)
+        store = self._segment_store(dir_path)
+        # Concurrent savers (several minds sharing this store) must not append the same rows twice.
+        with self._save_lock:
+            if dir_path == self.storage_dir:
+                self._save_tombstones(dir_path)
+            with self._lock:
+                start, stop = store.rows, len(self.episodes)
+                if stop > start:
+                    if dir_path == self.storage_dir:
+                        self.episodes.seal()
+                    table = self._episode_table(start, stop)
+                    embs = self._embeddings.slice(start, stop)
+            if stop > start:
+                t0 = time.perf_counter()
+                written = store.append(table, embs)
+                METRICS.observe("ltm_save_seconds", time.perf_counter() - t0)
+                METRICS.inc("ltm_save_bytes_total", written)
+                METRICS.inc("ltm_saved_episodes_total", stop - start)
+            if dir_path == self.storage_dir:
+                self._save_lexical(dir_path)
+        # The approximate index is rewritten once it holds 10% more rows than the persisted
+        # copy, or once removals have left the persisted copy holding deleted episodes.
+        if self.index is not None and dir_path == self.storage_dir:
+            stale = self._index_removed.size > 0 and supports_remove(self.index)
+            if stale or self.index.ntotal >= 1.1 * max(1, self._index_persisted_rows):
+                if self._index_builder is None or not self._index_builder.is_alive():
+                    self._index_builder = threading.Thread(target=self._persist_index, name="ltm-index-writer", daemon=True)
+                    self._index_builder.start()
+
+    # Consolidation: tombstones, merges and vacuum
+    def remove(self, rows: Any) -> int:
+        # Tombstones episodes by row. They disappear from search and recent() at once; rows
+        # keep their positions (and ids) until vacuum().
+        with self._lock:
+            rows = self.episodes.tombstone(rows)
+            if not rows.size:
+                return 0
+            self._drop_from_index(self.episodes.ids[rows])
+            self.generation += 1
+            self._tombstones_dirty = True
+        METRICS.inc("ltm_removed_episodes_total", rows.size)
+        self._maybe_build_index()
+        return int(rows.size)
+
+    def _drop_from_index(self, ids: np.ndarray) -> None:
+        if self.index is not None and supports_remove(self.index):
+            self.index.remove_ids(faiss.IDSelectorBatch(ids))
+        self._index_removed = np.union1d(self._index_removed, ids)
+        self._index_filter = None
+
+    def truncate(self, rows: int) -> int:
+        # Drops every episode from row `rows` on, e.g. a replay going back to its snapshot.
+        # Unlike remove() nothing is left behind: embeddings, tag and BM25 postings go too,
+        # so searches and BM25 statistics are exactly as they were at `rows`. Ids are not
+        # reused. Only rows that were never saved can be dropped.
+        with self._lock:
+            n = len(self.episodes)
+            if rows >= n:
+                return 0
+            store = self._stores.get(self.storage_dir) if self.storage_dir else None
+            if store is not None and store.rows > rows:
+                raise ValueError(f"cannot truncate to {rows} rows: {store.rows} are already saved")
+            self._drop_from_index(self.episodes.ids[rows:n].copy())
+            self.episodes.truncate(rows)
+            self._embeddings.truncate(rows)
+            self.tags_index.truncate(rows)
+            if self.lexical is not None:
+                self.lexical.truncate(rows)
+            self.generation += 1
+        METRICS.inc("ltm_removed_episodes_total", n - rows)
+        self._maybe_build_index()
+        return n - rows
+
+    def merge(self, survivor: int, rows: Any) -> int:
+        # Folds near-duplicate rows into `survivor`: their counts add up and they are removed.
+        with self._lock:
+            rows = np.asarray(rows, dtype=np.int64).reshape(-1)
+            rows = rows[(rows != survivor) & ~self.episodes.dead[rows]]
+            self.episodes.counts[survivor] += int(self.episodes.counts[rows].sum())
+            return self.remove(rows)
+
+    def vacuum(self) -> int:
+        # Drops tombstoned rows from memory and storage and returns how many went. Ids are
+        # stable, so the approximate index is kept: removed ids were deleted from it already,
+        # or are filtered at search time for HNSW.
+        dir_path = self.storage_dir
+        with self._save_lock:
+            with self._lock:
+                n = len(self.episodes)
+                if not self.episodes.dead_rows:
+                    return 0
+                keep = np.flatnonzero(~self.episodes.dead[:n])
+            t0 = time.perf_counter()
+            table = self.episodes.to_arrow(0, n).take(pa.array(keep, pa.int64()))
+            block = self._embeddings.rows(keep)
+            if dir_path:
+                store = self._segment_store(dir_path)
+                METRICS.inc("ltm_save_bytes_total", store.replace(table, block))
+                mmap_mode = self.mmap_mode or ("r" if self.index_policy.compressed else None)
+                if mmap_mode and table.num_rows:
+                    block = store.open(mmap_mode=mmap_mode)[1][0]
+            with self._lock:
+                episodes = self.episodes.take(keep, n, kept=table)
+                embeddings = EmbeddingMatrix(dim=self._embeddings.dim)
+                embeddings.add_block(block)
+                if len(self._embeddings) > n:
+                    embeddings.append(self._embeddings.slice(n, len(self._embeddings)))
+                self.episodes = episodes
+                self._embeddings = embeddings
+                self.tags_index = TagIndex.from_postings(episodes.tag_postings())
+                if self.lexical is not None:
+                    self.lexical = self.lexical.take(keep, n) if len(self.lexical) == len(episodes) + n - keep.size else None
+                    self._lexical_persisted_rows = 0
+                self.generation += 1
+                self._tombstones_dirty = True
+            if dir_path:
+                self._save_tombstones(dir_path)
+                self._save_lexical(dir_path, force=True)
+        dropped = n - int(keep.size)
+        METRICS.observe("ltm_vacuum_seconds", time.perf_counter() - t0)
+        METRICS.inc("ltm_vacuumed_episodes_total", dropped)
+        return dropped
+
+    @property
+    def dedup_watermark(self) -> int:
+        return self._dedup_watermark
+
+    @dedup_watermark.setter
+    def dedup_watermark(self, value: int) -> None:
+        self._dedup_watermark = int(value)
+        self._tombstones_dirty = True
+
+    def _save_tombstones(self, dir_path: str) -> None:
+        with self._lock:
+            if not self._tombstones_dirty:
+                return
+            eps = self.episodes
+            if self.index is None and self._index_builder is None:
+                self._index_removed = np.zeros(0, dtype=np.int64)
+            merged = np.flatnonzero(eps.counts > 1)
+            arrays = {
+                "dead": eps.ids[eps.dead],
+                "count_ids": eps.ids[merged],
+                "counts": eps.counts[merged],
+                "index_removed": self._index_removed,
+                "next_id": np.array([eps.next_id], dtype=np.int64),
+                "watermark": np.array([self._dedup_watermark], dtype=np.int64),
+            }
+            self._tombstones_dirty = False
+        path = os.path.join(dir_path, TOMBSTONES)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+
+    def _save_lexical(self, dir_path: str, force: bool = False) -> None:
+        # Like the approximate index, postings are rewritten once they cover 10% more rows
+        # than the persisted copy (always on close and after a vacuum).
+        with self._lock:
+            lex = self.lexical
+            if lex is None or not len(lex) or len(lex) > len(self.episodes):
+                return
+            if not force and len(lex) < 1.1 * max(1, self._lexical_persisted_rows):
+                return
+            if len(lex) == self._lexical_persisted_rows:
+                return
+            arrays = lex.to_arrays(int(self.episodes.ids[len(lex) - 1]))
+            self._lexical_persisted_rows = len(lex)
+        t0 = time.perf_counter()
+        written = write_arrays(os.path.join(dir_path, LEXICAL), arrays)
+        METRICS.observe("ltm_lexical_save_seconds", time.perf_counter() - t0)
+        METRICS.inc("ltm_save_bytes_total", written)
+
+    def _load_lexical(self, dir_path: str) -> None:
+        # A persisted index is reused when its last row still holds the episode it was saved
+        # with; rows past it are indexed on the next lexical search.
+        self.lexical = None
+        self._lexical_persisted_rows = 0
+        path = os.path.join(dir_path, LEXICAL)
+        if not self.retrieval.lexical or not os.path.exists(path):
+            return
+        lex, last_id = LexicalIndex.load(path)
+        n = len(lex)
+        if n and n <= len(self.episodes) and int(self.episodes.rows_of(np.array([last_id]))[0]) == n - 1:
+            self.lexical = lex
+            self._lexical_persisted_rows = n
+
+    def _load_tombstones(self, dir_path: str) -> None:
+        self._index_removed = np.zeros(0, dtype=np.int64)
+        self._index_filter = None
+        self._dedup_watermark = 0
+        path = os.path.join(dir_path, TOMBSTONES)
+        if not os.path.exists(path):
+            return
+        with np.load(path) as data:
+            eps = self.episodes
+            eps.next_id = max(eps.next_id, int(data["next_id"][0]))
+            at = eps.rows_of(data["count_ids"])
+            eps.counts[at[at >= 0]] = data["counts"][at >= 0]
+            eps.tombstone(eps.rows_of(data["dead"]))
+            self._index_removed = data["index_removed"].astype(np.int64)
+            self._dedup_watermark = int(data["watermark"][0])
+
+    def close(self) -> None:
+        self.save()
+        if self.storage_dir:
+            with self._save_lock:
+                self._save_lexical(self.storage_dir, force=True)
+        if self.embed_cache is not None:
+            self.embed_cache.save()
+        if self.batcher is not None:
+            self.batcher.close()
+        # Releases the writer locks; a later save() opens (and locks) the store again.
+        for store in self._stores.values():
+            store.close()
+        self._stores.clear()
+
+    def load(self, directory: Optional[str] = None, mmap_mode: Optional[str] = None, lazy: bool = False) -> None:
+        # lazy=True reads only manifest, parquet footers and the tags column up front,
+        # memory-maps embeddings, decodes episode rows on first access and loads the
+        # approximate index in the background.
+        dir_path = directory or self.storage_dir
+        if not dir_path or not os.path.exists(dir_path):
+            return
+        profile: Dict[str, float] = {}
+        t0 = time.perf_counter()
+        # A directory other than storage_dir (a snapshot) is only read, never cleaned up.
+        store = self._segment_store(dir_path, read_only=dir_path != self.storage_dir)
+        profile["manifest"] = time.perf_counter() - t0
+        self.generation += 1
+        self.lexical = None
+        if not store.exists():
+            self._load_legacy(dir_path)
+            self._load_tombstones(dir_path)
+            self._maybe_build_index()
+            profile["episodes"] = time.perf_counter() - t0
+            self.load_profile.update(profile)
+            return
+        self._embeddings = EmbeddingMatrix()
+        self.index = None
+        t0 = time.perf_counter()
+        self.episodes = EpisodeTable()
+        if mmap_mode is None and self.mmap_mode is None and self.index_policy.compressed:
+            # Only compressed codes stay resident; re-ranking pages rows in from disk.
+            mmap_mode = "r"
+        if lazy:
+            files, embs = store.open(mmap_mode=mmap_mode or self.mmap_mode or "r")
+            for f in files:
+                for rg in range(f.metadata.num_row_groups):
+                    self.episodes.add_row_group(f, rg)
+            for emb in embs:
+                self._embeddings.add_block(emb)
+        else:
+            # Each segment's embeddings become one frozen block, memory-mapped when requested.
+            for _, table, emb in store.read(mmap_mode=mmap_mode or self.mmap_mode):
+                self.episodes.add_table(table)
+                self._embeddings.add_block(emb)
+        profile["episodes"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        self._load_tombstones(dir_path)
+        self.tags_index = TagIndex.from_postings(self.episodes.tag_postings())
+        profile["tags"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        self._load_lexical(dir_path)
+        profile["lexical"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        if lazy:
+            self._index_builder = threading.Thread(target=self._load_index_async, args=(dir_path,), name="ltm-index-loader", daemon=True)
+            self._index_builder.start()
+        else:
+            self._load_index(dir_path)
+            self._maybe_build_index()
+        profile["index"] = time.perf_counter() - t0
+        self.load_profile.update(profile)
+
+    def _load_index_async(self, dir_path: str) -> None:
+        self._load_index(dir_path)
+        self._index_builder = None
+        self._maybe_build_index()
+
+    def _load_legacy(self, dir_path: str) -> None:
+        # Single-file layout written before segments existed; the next save()
+        # migrates it by writing every row as the first segment.
+        eps_path = os.path.join(dir_path, "episodes.parquet")
+        if os.path.exists(eps_path):
+            self.episodes = EpisodeTable()
+            self.episodes.add_table(pq.read_table(eps_path))
+            self.tags_index = TagIndex.from_postings(self.episodes.tag_postings())
+        emb_path = os.path.join(dir_path, "embeddings.npy")
+        if os.path.exists(emb_path):
+            self._embeddings = EmbeddingMatrix()
+            self._embeddings.add_block(np.load(emb_path).astype(np.float32))
+
+
+def episode_text(query: str, response: str, thought: Thought) -> str:
+    return f"Q: {query}\nA: {response}\nWhy: {thought.rationale}"
+
+
+# The top_k (id, score) pairs of a score vector, best first; ids maps positions to ids
+# (None: positions are the ids).
+def topk(sims: np.ndarray, ids: Optional[np.ndarray], top_k: int) -> List[Tuple[int, float]]:
+    k = min(top_k, sims.shape[0])
+    if k <= 0:
+        return []
+    order = np.argpartition(-sims, k - 1)[:k]
+    # Equal scores at the cut-off go to the lowest positions, so the result does not depend
+    # on how many other rows were scanned.
+    kth = sims[order].min()
+    above = np.flatnonzero(sims > kth)
+    order = np.concatenate([above, np.flatnonzero(sims == kth)[: k - above.size]])
+    order = order[np.lexsort((order, -sims[order]))]
+    # Tombstoned rows are scored -inf.
+    order = order[sims[order] > -np.inf]
+    if ids is None:
+        return [(int(i), float(sims[i])) for i in order]
+    return [(int(ids[i]), float(sims[i])) for i in order]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+# Tag -> sorted int64 episode ids. Ids are appended in increasing order, so each posting
+# list stays sorted and grows by capacity doubling; intersections run in numpy.
+class TagIndex:
+    def __init__(self) -> None:
+        self._postings: Dict[str, np.ndarray] = {}
+        self._sizes: Dict[str, int] = {}
+
+    @classmethod
+    def from_postings(cls, postings: Dict[str, np.ndarray]) -> "TagIndex":
+        index = cls()
+        for tag, ids in postings.items():
+            index.add(tag, ids)
+        return index
+
+    def add(self, tag: str, ids: Iterable[int]) -> None:
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if ids.size == 0:
+            return
+        buf = self._postings.get(tag)
+        size = self._sizes.get(tag, 0)
+        if buf is None or size + ids.size > buf.shape[0]:
+            capacity = max(8, buf.shape[0] if buf is not None else 0)
+            while capacity < size + ids.size:
+                capacity *= 2
+            grown = np.empty(capacity, dtype=np.int64)
+            if size:
+                grown[:size] = buf[:size]
+            buf = grown
+            self._postings[tag] = buf
+        buf[size : size + ids.size] = ids
+        self._sizes[tag] = size + ids.size
+
+    def add_grouped(self, grouped: Dict[str, List[int]]) -> None:
+        for tag, ids in grouped.items():
+            self.add(tag, ids)
+
+    def truncate(self, rows: int) -> None:
+        # Drops ids from `rows` on; tags left without any are removed.
+        for tag in list(self._postings):
+            size = int(np.searchsorted(self.get(tag), rows))
+            if size:
+                self._sizes[tag] = size
+            else:
+                del self._postings[tag], self._sizes[tag]
+
+    def get(self, tag: str, default=None) -> np.ndarray:
+        buf = self._postings.get(tag)
+        if buf is None:
+            return _EMPTY if default is None else default
+        return buf[: self._sizes[tag]]
+
+    def __getitem__(self, tag: str) -> np.ndarray:
+        if tag not in self._postings:
+            raise KeyError(tag)
+        return self.get(tag)
+
+    def __contains__(self, tag: object) -> bool:
+        return tag in self._postings
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._postings)
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def keys(self) -> List[str]:
+        return list(self._postings)
+
+    def items(self) -> Iterator[Tuple[str, np.ndarray]]:
+        for tag in self._postings:
+            yield tag, self.get(tag)
+
+    def intersect(self, tags: List[str]) -> np.ndarray:
+        # Smallest posting first keeps every intermediate result as small as possible.
+        lists = sorted((self.get(t) for t in set(tags)), key=len)
+        if not lists:
+            return _EMPTY
+        out = lists[0]
+        for ids in lists[1:]:
+            if out.size == 0:
+                break
+            out = np.intersect1d(out, ids, assume_unique=True)
+        return out
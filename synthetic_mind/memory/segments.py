@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+import itertools
+import json
+import os
+import threading
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+MANIFEST = "manifest.json"
+WRITER_LOCK = "writer.lock"
+ROW_GROUP_SIZE = 16384
+
+
+def _fsync_dir(path: str) -> None:
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _lock_writer(directory: str) -> IO[bytes]:
+    # Exclusive for as long as the returned file stays open; the OS drops the lock if the
+    # process dies, so a crashed writer never leaves the directory locked.
+    f = open(os.path.join(directory, WRITER_LOCK), "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        raise RuntimeError(f"segment store {directory} is in use by another writer (open it read_only=True to read it)") from None
+    return f
+
+
+def _merge_start(rows: List[int], factor: int) -> Optional[int]:
+    # Size-ratio merging over the newest segments. Walking back from the newest, an older
+    # segment joins the run while it holds no more rows than the run so far; a run of
+    # `factor` segments is merged. A merge then writes at most about twice its new rows,
+    # so a row is rewritten O(log n) times instead of on every compaction. Past 3 * factor
+    # segments, the newest `factor` are merged regardless. Returns the run's first index.
+    n = len(rows)
+    i, acc = n, 0
+    while i > 0 and (i == n or rows[i - 1] <= acc):
+        acc += rows[i - 1]
+        i -= 1
+    if n - i >= factor:
+        return i
+    if n > 3 * factor:
+        return n - factor
+    return None
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# Append-only episode storage: every save writes one parquet + one npy segment holding
+# only the new rows. The manifest is replaced atomically once the segment files are
+# durable, so a crash leaves either the previous or the new state, never a mix.
+# One writer per directory: a writable store holds writer.lock until close(), and only
+# removes orphaned files while holding it. read_only=True opens someone else's store (a
+# snapshot, an export source): no lock, nothing is created or cleaned up, and every
+# write raises.
+class SegmentStore:
+    def __init__(
+        self,
+        directory: str,
+        compact_after: int = 8,
+        normalize: Optional[Callable[[pa.Table, int], pa.Table]] = None,
+        read_only: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.compact_after = compact_after
+        # Applied to each segment (with its start row) before merging so older schemas can be upgraded.
+        self.normalize = normalize
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._writer_lock: Optional[IO[bytes]] = None
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+            self._writer_lock = _lock_writer(directory)
+        self.manifest = self._read_manifest()
+        if not read_only:
+            self._remove_orphans()
+
+    @property
+    def rows(self) -> int:
+        return int(self.manifest["rows"])
+
+    @property
+    def segments(self) -> List[Dict[str, Any]]:
+        return list(self.manifest["segments"])
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.directory, MANIFEST))
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        path = os.path.join(self.directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"version": 1, "generation": 0, "next_segment": 1, "rows": 0, "segments": []}
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise RuntimeError(f"segment store {self.directory} is open read-only")
+        if self._writer_lock is None:
+            raise RuntimeError(f"segment store {self.directory} is closed")
+
+    def _commit(self, manifest: Dict[str, Any]) -> None:
+        manifest = dict(manifest, generation=int(manifest["generation"]) + 1)
+        data = json.dumps(manifest, indent=2).encode("utf-8")
+        _atomic_write(os.path.join(self.directory, MANIFEST), lambda f: f.write(data))
+        _fsync_dir(self.directory)
+        self.manifest = manifest
+
+    def _paths(self, name: str) -> Tuple[str, str]:
+        return os.path.join(self.directory, f"{name}.parquet"), os.path.join(self.directory, f"{name}.npy")
+
+    def _write_segment(self, name: str, table: pa.Table, embeddings: np.ndarray) -> None:
+        table_path, emb_path = self._paths(name)
+        _atomic_write(table_path, lambda f: pq.write_table(table, f, row_group_size=ROW_GROUP_SIZE))
+        _atomic_write(emb_path, lambda f: np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32)))
+
+    def _remove_orphans(self) -> None:
+        live = {f"{s['name']}{ext}" for s in self.manifest["segments"] for ext in (".parquet", ".npy")}
+        for fname in os.listdir(self.directory):
+            is_segment = fname.startswith("seg-") and (fname.endswith(".parquet") or fname.endswith(".npy"))
+            if fname.endswith(".tmp") or (is_segment and fname not in live):
+                try:
+                    os.remove(os.path.join(self.directory, fname))
+                except OSError:
+                    pass
+
+    def append(self, table: pa.Table, embeddings: np.ndarray) -> int:
+        # Returns bytes written for the new segment.
+        if table.num_rows == 0:
+            return 0
+        if embeddings.shape[0] != table.num_rows:
+            raise ValueError("segment embeddings and episode rows must have the same length")
+        self._check_writable()
+        with self._lock:
+            name = f"seg-{int(self.manifest['next_segment']):06d}"
+            self._write_segment(name, table, embeddings)
+            written = sum(os.path.getsize(p) for p in self._paths(name))
+            manifest = dict(self.manifest)
+            manifest["segments"] = self.segments + [{"name": name, "start": self.rows, "rows": table.num_rows}]
+            manifest["rows"] = self.rows + table.num_rows
+            manifest["next_segment"] = int(manifest["next_segment"]) + 1
+            self._commit(manifest)
+        if _merge_start([int(s["rows"]) for s in self.manifest["segments"]], self.compact_after) is not None:
+            self.compact_async()
+        return written
+
+    def read(
+        self, segments: Optional[List[Dict[str, Any]]] = None, mmap_mode: Optional[str] = None
+    ) -> Iterator[Tuple[Dict[str, Any], pa.Table, np.ndarray]]:
+        for seg in segments if segments is not None else self.segments:
+            table_path, emb_path = self._paths(seg["name"])
+            yield seg, pq.read_table(table_path), np.load(emb_path, mmap_mode=mmap_mode)
+
+    def open(self, mmap_mode: Optional[str] = None) -> Tuple[List[pq.ParquetFile], List[np.ndarray]]:
+        # Opens every segment without decoding rows: parquet footers plus embedding arrays.
+        # Open handles keep the data readable if a compaction unlinks the files meanwhile.
+        files: List[pq.ParquetFile] = []
+        embs: List[np.ndarray] = []
+        for seg in self.segments:
+            table_path, emb_path = self._paths(seg["name"])
+            files.append(pq.ParquetFile(table_path))
+            embs.append(np.load(emb_path, mmap_mode=mmap_mode))
+        return files, embs
+
+    def compact(self) -> bool:
+        # Merges one run picked by _merge_start into a single segment; False when none qualifies.
+        self._check_writable()
+        with self._lock:
+            segments = self.segments
+            first = _merge_start([int(s["rows"]) for s in segments], self.compact_after)
+            if first is None:
+                return False
+            merged = segments[first:]
+            name = f"seg-{int(self.manifest['next_segment']):06d}"
+            self.manifest = dict(self.manifest, next_segment=int(self.manifest["next_segment"]) + 1)
+        # Merging runs unlocked; appends only ever add segments after the merged run.
+        self._merge_segments(name, merged)
+        with self._lock:
+            current = self.segments
+            at = [s["name"] for s in current].index(merged[0]["name"])
+            manifest = dict(self.manifest)
+            merged_seg = {"name": name, "start": int(merged[0]["start"]), "rows": sum(int(s["rows"]) for s in merged)}
+            manifest["segments"] = current[:at] + [merged_seg] + current[at + len(merged) :]
+            self._commit(manifest)
+        for seg in merged:
+            for path in self._paths(seg["name"]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return True
+
+    def _merge_segments(self, name: str, segments: List[Dict[str, Any]]) -> None:
+        # Streams row group by row group: memory stays around one output row group, and
+        # embeddings are copied in slices of memory-mapped source arrays.
+        sources = []
+        for seg in segments:
+            table_path, emb_path = self._paths(seg["name"])
+            sources.append((seg, pq.ParquetFile(table_path), np.load(emb_path, mmap_mode="r")))
+
+        def tables() -> Iterator[pa.Table]:
+            for seg, pf, _ in sources:
+                start = int(seg["start"])
+                for rg in range(pf.metadata.num_row_groups):
+                    table = pf.read_row_group(rg)
+                    yield self.normalize(table, start) if self.normalize is not None else table
+                    start += table.num_rows
+
+        def write_table(f) -> None:
+            # Small source row groups are combined, so merging many small saves does not
+            # leave a file of tiny row groups.
+            writer: Optional[pq.ParquetWriter] = None
+            pending: List[pa.Table] = []
+            for table in itertools.chain(tables(), [None]):
+                if table is not None:
+                    pending.append(table)
+                if pending and (table is None or sum(t.num_rows for t in pending) >= ROW_GROUP_SIZE):
+                    out = pa.concat_tables(pending)
+                    pending = []
+                    if writer is None:
+                        writer = pq.ParquetWriter(f, out.schema)
+                    writer.write_table(out, row_group_size=ROW_GROUP_SIZE)
+            writer.close()
+
+        def write_embeddings(f) -> None:
+            rows = sum(int(seg["rows"]) for seg in segments)
+            header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)), "fortran_order": False, "shape": (rows, sources[0][2].shape[1])}
+            np.lib.format.write_array_header_1_0(f, header)
+            for _, _, emb in sources:
+                for lo in range(0, emb.shape[0], ROW_GROUP_SIZE):
+                    f.write(np.ascontiguousarray(emb[lo : lo + ROW_GROUP_SIZE], dtype=np.float32).tobytes())
+
+        table_path, emb_path = self._paths(name)
+        _atomic_write(table_path, write_table)
+        _atomic_write(emb_path, write_embeddings)
+
+    def replace(self, table: pa.Table, embeddings: np.ndarray) -> int:
+        # Rewrites the store as one segment holding exactly these rows (vacuum) and returns
+        # bytes written; open handles and memory maps on the old segments keep working.
+        if embeddings.shape[0] != table.num_rows:
+            raise ValueError("segment embeddings and episode rows must have the same length")
+        self._check_writable()
+        self.wait()
+        with self._lock:
+            old = self.segments
+            name = f"seg-{int(self.manifest['next_segment']):06d}"
+            self._write_segment(name, table, embeddings)
+            written = sum(os.path.getsize(p) for p in self._paths(name)) if table.num_rows else 0
+            manifest = dict(self.manifest)
+            manifest["segments"] = [{"name": name, "start": 0, "rows": table.num_rows}] if table.num_rows else []
+            manifest["rows"] = table.num_rows
+            manifest["next_segment"] = int(manifest["next_segment"]) + 1
+            self._commit(manifest)
+            if not table.num_rows:
+                for path in self._paths(name):
+                    os.remove(path)
+        for seg in old:
+            for path in self._paths(seg["name"]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return written
+
+    def compact_async(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact_all, name="ltm-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact_all(self) -> None:
+        while self.compact():
+            pass
+
+    def wait(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def close(self) -> None:
+        # Waits for a running compaction, then releases the writer lock.
+        self.wait()
+        if self._writer_lock is not None:
+            self._writer_lock.close()
+            self._writer_lock = None
@@ -0,0 +1,491 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import itertools
+import multiprocessing as mp
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from ..metrics import METRICS
+from ..types import Thought
+from .ann import IndexPolicy
+from .consolidation import ConsolidationPolicy, consolidate
+from .episodes import Growable
+from .lexical import RetrievalPolicy
+from .long_term import LongTermMemory, episode_text, topk
+
+
+# Shard-side operations, run by _shard_main against the shard's own LongTermMemory.
+# (rows, live rows, their timestamps, their ids). Ids are the router's global sequence.
+def _layout(ltm: LongTermMemory) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    rows = ltm.episodes.live_rows()
+    return len(ltm.episodes), rows, ltm.episodes.ts[rows], ltm.episodes.ids[rows]
+
+
+def _load(ltm: LongTermMemory, lazy: bool) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    ltm.load(lazy=lazy)
+    return _layout(ltm)
+
+
+def _search_rows(ltm: LongTermMemory, q: np.ndarray, rows: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+    rows = rows[~ltm.episodes.dead[rows]]
+    return topk(ltm.vectors(rows) @ q, rows, top_k)
+
+
+def _close(ltm: LongTermMemory) -> None:
+    ltm.close()
+    ltm.wait_for_index()
+
+
+_OPS: Dict[str, Callable[..., Any]] = {
+    "load": _load,
+    "layout": _layout,
+    "next_id": lambda ltm: ltm.episodes.next_id,
+    "record": lambda ltm, *args: ltm.record_embedded(*args),
+    "search": lambda ltm, q, k, tags: ltm.search_vector(q, top_k=k, required_tags=tags),
+    "search_many": lambda ltm, qs, k: ltm.search_vectors(qs, top_k=k),
+    "search_lexical": lambda ltm, query, k, tags: ltm.search_lexical(query, top_k=k, required_tags=tags),
+    "search_hybrid": lambda ltm, query, q, k, tags: ltm.search_hybrid(query, q, top_k=k, required_tags=tags),
+    "search_rows": _search_rows,
+    "rows": lambda ltm, rows: [dict(ltm.episodes[int(r)]) for r in rows],
+    "save": lambda ltm: ltm.save(),
+    "wait_for_index": lambda ltm: ltm.wait_for_index(),
+    "consolidate": lambda ltm, policy, now, vacuum: consolidate(ltm, policy, now=now, vacuum=vacuum),
+    "index_report": lambda ltm, k: ltm.index_report(k=k),
+    "close": _close,
+}
+
+
+def _shard_main(conn: Any, kwargs: Dict[str, Any], threads: int) -> None:
+    try:
+        import faiss  # type: ignore
+
+        faiss.omp_set_num_threads(threads)
+    except Exception:  # pragma: no cover
+        pass
+    ltm = LongTermMemory(**kwargs)
+    while True:
+        msg = conn.recv()
+        if msg is None:
+            break
+        rid, op, args = msg
+        try:
+            conn.send((rid, None, _OPS[op](ltm, *args)))
+        except Exception as e:
+            conn.send((rid, e, None))
+    conn.close()
+
+
+# Client end of one shard process. Requests are pipelined over one pipe and answered in
+# order; a reader thread resolves the matching futures, so several threads can have
+# calls in flight to the same shard.
+class _Shard:
+    def __init__(self, ctx: Any, name: str, kwargs: Dict[str, Any], threads: int) -> None:
+        parent, child = ctx.Pipe()
+        self.process = ctx.Process(target=_shard_main, args=(child, kwargs, threads), name=name, daemon=True)
+        self.process.start()
+        child.close()
+        self._conn = parent
+        self._send_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count()
+        self._reader = threading.Thread(target=self._read, name=f"{name}-reader", daemon=True)
+        self._reader.start()
+
+    def call(self, op: str, *args: Any) -> Future:
+        fut: Future = Future()
+        with self._send_lock:
+            rid = next(self._ids)
+            self._pending[rid] = fut
+            self._conn.send((rid, op, args))
+        return fut
+
+    def _read(self) -> None:
+        while True:
+            try:
+                rid, err, result = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            fut = self._pending.pop(rid)
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(result)
+        for fut in self._pending.values():
+            fut.set_exception(RuntimeError(f"{self.process.name} exited"))
+
+    def stop(self) -> None:
+        with self._send_lock:
+            self._conn.send(None)
+        self.process.join()
+        self._reader.join()
+
+
+class _ShardedEpisodes(Sequence):
+    def __init__(self, owner: "ShardedLongTermMemory") -> None:
+        self._owner = owner
+
+    def __len__(self) -> int:
+        return len(self._owner._shard_of)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._owner.get_episodes(list(range(*i.indices(len(self)))))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("episode index out of range")
+        return self._owner.get_episodes([i])[0]
+
+
+# Long-term memory split over worker processes. Each shard is a LongTermMemory in its own
+# process owning storage_dir/shard-NN (segments, tombstones, index). This process embeds,
+# routes each episode by a hash of its query or by time range, fans searches out to every
+# shard and merges the per-shard top-k by score. Rows are numbered globally in insertion
+# order (timestamp order after a load), so episodes[idx], recent() and search results
+# behave as with a single LongTermMemory.
+class ShardedLongTermMemory:
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        storage_dir: Optional[str] = None,
+        shards: int = 4,
+        shard_by: str = "hash",  # "hash" | "time"
+        time_span_s: float = 7 * 86400.0,
+        compact_after: int = 8,
+        mmap_mode: Optional[str] = None,
+        index_policy: Optional[IndexPolicy] = None,
+        cache_entries: int = 0,
+        cache_bytes: Optional[int] = None,
+        persist_cache: bool = False,
+        batch_max_size: int = 0,
+        batch_max_wait_ms: float = 2.0,
+        threads_per_shard: int = 1,
+        retrieval: Optional[RetrievalPolicy] = None,
+    ) -> None:
+        if shard_by not in ("hash", "time"):
+            raise ValueError(f"unknown shard_by: {shard_by}")
+        self.model_name = model_name
+        self.storage_dir = storage_dir
+        self.shard_by = shard_by
+        self.time_span_s = time_span_s
+        self.retrieval = retrieval or RetrievalPolicy()
+        # The model, embedding cache and micro-batcher stay in this process; shards only
+        # ever see vectors. The encoder is never saved or loaded.
+        self._encoder = LongTermMemory(
+            model_name=model_name,
+            storage_dir=storage_dir,
+            cache_entries=cache_entries,
+            cache_bytes=cache_bytes,
+            persist_cache=persist_cache,
+            batch_max_size=batch_max_size,
+            batch_max_wait_ms=batch_max_wait_ms,
+        )
+        ctx = mp.get_context("spawn")
+        self._shards: List[_Shard] = []
+        for i in range(shards):
+            kwargs = dict(
+                model_name=model_name,
+                storage_dir=os.path.join(storage_dir, f"shard-{i:02d}") if storage_dir else None,
+                compact_after=compact_after,
+                mmap_mode=mmap_mode,
+                index_policy=index_policy or IndexPolicy(),
+                retrieval=self.retrieval,
+            )
+            self._shards.append(_Shard(ctx, f"ltm-shard-{i:02d}", kwargs, threads_per_shard))
+        self._lock = threading.RLock()
+        self._shard_of = Growable(np.int32)
+        self._local = Growable(np.int64)
+        self._global: List[Growable] = [Growable(np.int64) for _ in self._shards]
+        # Episode ids are assigned here, so they are one sequence across shards.
+        self._next_id = 0
+        self.episodes = _ShardedEpisodes(self)
+        self.generation = 0
+        self.load_profile: Dict[str, float] = {}
+        METRICS.add_collector(self, ShardedLongTermMemory._gauges)
+
+    def _gauges(self) -> Dict[str, float]:
+        return {"ltm_episodes": float(len(self._shard_of)), "ltm_shards": float(len(self._shards))}
+
+    @property
+    def shards(self) -> int:
+        return len(self._shards)
+
+    @property
+    def batcher(self) -> Any:
+        return self._encoder.batcher
+
+    @property
+    def embed_cache(self) -> Any:
+        return self._encoder.embed_cache
+
+    @property
+    def embedder_load_s(self) -> Optional[float]:
+        return self._encoder.embedder_load_s
+
+    def warm_embedder(self) -> None:
+        self._encoder.warm_embedder()
+
+    def embed(self, text: str) -> np.ndarray:
+        return self._encoder.embed(text)
+
+    def embed_many(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        return self._encoder.embed_many(texts, batch_size=batch_size)
+
+    def _fan_out(self, op: str, *args: Any) -> List[Any]:
+        futures = [shard.call(op, *args) for shard in self._shards]
+        return [f.result() for f in futures]
+
+    # Writes
+    def _route(self, queries: List[str], ts: np.ndarray) -> np.ndarray:
+        n = len(self._shards)
+        if self.shard_by == "time":
+            return ((ts // self.time_span_s).astype(np.int64) % n).astype(np.int32)
+        return np.fromiter((zlib.crc32(q.encode("utf-8")) % n for q in queries), dtype=np.int32, count=len(queries))
+
+    def record_episode(self, query: str, response: str, thought: Thought, tags: List[str] | None = None) -> None:
+        self.record_episodes([query], [response], [thought], [tags or []])
+
+    def record_episodes(
+        self,
+        queries: List[str],
+        responses: List[str],
+        thoughts: List[Thought],
+        tags: List[List[str]] | None = None,
+        batch_size: int = 64,
+    ) -> None:
+        if not queries:
+            return
+        if len(responses) != len(queries) or len(thoughts) != len(queries) or (tags is not None and len(tags) != len(queries)):
+            raise ValueError("record_episodes expects queries, responses, thoughts and tags of equal length")
+        tags = tags if tags is not None else [[] for _ in queries]
+        embs = self.embed_many([episode_text(q, r, t) for q, r, t in zip(queries, responses, thoughts)], batch_size=batch_size)
+        self.record_embedded(queries, responses, thoughts, tags, embs)
+
+    def record_embedded(
+        self,
+        queries: List[str],
+        responses: List[str],
+        thoughts: List[Thought],
+        tags: List[List[str]],
+        embs: np.ndarray,
+        ts: Optional[List[float]] = None,
+    ) -> None:
+        ts = ts if ts is not None else [float(time.time())] * len(queries)
+        targets = self._route(queries, np.asarray(ts, dtype=np.float64))
+        futures = []
+        # Rows are mapped and sent under one lock so every shard sees writes in global order
+        # and a search sent afterwards can resolve them.
+        with self._lock:
+            base = len(self._shard_of)
+            ids = np.arange(self._next_id, self._next_id + len(queries), dtype=np.int64)
+            self._next_id += len(queries)
+            local = np.empty(len(queries), dtype=np.int64)
+            for s in np.unique(targets).tolist():
+                sel = np.flatnonzero(targets == s)
+                start = len(self._global[s])
+                local[sel] = np.arange(start, start + sel.size)
+                self._global[s].extend(base + sel)
+                pick = sel.tolist()
+                futures.append(
+                    self._shards[s].call(
+                        "record",
+                        [queries[i] for i in pick],
+                        [responses[i] for i in pick],
+                        [thoughts[i] for i in pick],
+                        [tags[i] for i in pick],
+                        embs[sel],
+                        [ts[i] for i in pick],
+                        ids[sel],
+                    )
+                )
+            self._shard_of.extend(targets)
+            self._local.extend(local)
+        for f in futures:
+            f.result()
+
+    # Reads
+    def _to_global(self, per_shard: List[List[Tuple[int, float]]], top_k: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            maps = [g.view() for g in self._global]
+        hits: List[Tuple[int, float]] = []
+        for g, found in zip(maps, per_shard):
+            for local, score in found:
+                row = int(g[local]) if local < g.shape[0] else -1
+                if row >= 0:
+                    hits.append((row, score))
+        hits.sort(key=lambda h: -h[1])
+        return hits[:top_k]
+
+    def search(self, query: str, top_k: int = 5, required_tags: List[str] | None = None, mode: Optional[str] = None) -> List[Tuple[int, float]]:
+        # Same modes as LongTermMemory.search. BM25 statistics are per shard, so lexical
+        # scores from different shards are close to, not exactly, single-store scores.
+        return self.search_at(query, top_k, required_tags, mode)[0]
+
+    def search_at(
+        self, query: str, top_k: int = 5, required_tags: List[str] | None = None, mode: Optional[str] = None
+    ) -> Tuple[List[Tuple[int, float]], Optional[np.ndarray], int, int]:
+        # As LongTermMemory.search_at. Holding the lock across the fan-out keeps records from
+        # being sent meanwhile, and shards answer calls in the order they were sent, so every
+        # hit is one of the first `rows` rows.
+        mode = mode or self.retrieval.mode
+        if mode not in ("vector", "lexical", "auto", "hybrid"):
+            raise ValueError(f"unknown retrieval mode: {mode}")
+        if not len(self.episodes):
+            return [], None, 0, self.generation
+        t0 = time.perf_counter()
+        q = self.embed(query) if mode in ("vector", "hybrid") else None
+        with self._lock:
+            rows, generation = len(self._shard_of), self.generation
+            if mode == "vector":
+                out = self.search_vector(q, top_k=top_k, required_tags=required_tags)
+            elif mode == "hybrid":
+                out = self.search_hybrid(query, q, top_k=top_k, required_tags=required_tags)
+            else:
+                out = self.search_lexical(query, top_k=top_k, required_tags=required_tags)
+                if mode == "auto":
+                    lexical = bool(out) and out[0][1] >= self.retrieval.auto_min_score
+                    METRICS.inc("ltm_auto_search_total", labels={"path": "lexical" if lexical else "hybrid"})
+                    if not lexical:
+                        out = self.search_hybrid(query, self.embed(query), top_k=top_k, required_tags=required_tags)
+        METRICS.observe("ltm_search_seconds", time.perf_counter() - t0, {"filtered": "yes" if required_tags else "no", "mode": mode})
+        return out, q if mode == "vector" else None, rows, generation
+
+    def search_lexical(self, query: str, top_k: int = 5, required_tags: List[str] | None = None) -> List[Tuple[int, float]]:
+        return self._to_global(self._fan_out("search_lexical", query, top_k, required_tags), top_k)
+
+    def search_hybrid(self, query: str, q: np.ndarray, top_k: int = 5, required_tags: List[str] | None = None) -> List[Tuple[int, float]]:
+        return self._to_global(self._fan_out("search_hybrid", query, q, top_k, required_tags), top_k)
+
+    def search_vector(self, q: np.ndarray, top_k: int = 5, required_tags: List[str] | None = None) -> List[Tuple[int, float]]:
+        return self._to_global(self._fan_out("search", q, top_k, required_tags), top_k)
+
+    def search_vectors(self, queries: np.ndarray, top_k: int = 5) -> List[List[Tuple[int, float]]]:
+        per_shard = self._fan_out("search_many", queries, top_k)
+        return [self._to_global([found[j] for found in per_shard], top_k) for j in range(len(queries))]
+
+    def search_range(self, q: np.ndarray, start: int, stop: int, top_k: int = 5) -> List[Tuple[int, float]]:
+        with self._lock:
+            stop = min(stop, len(self._shard_of))
+            shard_of = self._shard_of.view()[start:stop].copy()
+            local = self._local.view()[start:stop].copy()
+        futures = {s: self._shards[s].call("search_rows", q, local[shard_of == s], top_k) for s in np.unique(shard_of).tolist()}
+        return self._to_global([futures[s].result() if s in futures else [] for s in range(len(self._shards))], top_k)
+
+    def search_range_at(self, q: np.ndarray, start: int, top_k: int = 5) -> Tuple[List[Tuple[int, float]], int, int]:
+        with self._lock:
+            rows = len(self._shard_of)
+            return self.search_range(q, start, rows, top_k), rows, self.generation
+
+    def episodes_at(self, indices: List[int], generation: int) -> Optional[List[Mapping[str, Any]]]:
+        with self._lock:
+            if self.generation != generation:
+                return None
+            return self.get_episodes(indices)
+
+    def get_episodes(self, indices: List[int]) -> List[Mapping[str, Any]]:
+        with self._lock:
+            n = len(self._shard_of)
+            idx = np.asarray([i for i in indices if 0 <= i < n], dtype=np.int64)
+            shard_of = self._shard_of.view()[idx]
+            local = self._local.view()[idx]
+        out: List[Any] = [None] * idx.size
+        futures = [(sel, self._shards[s].call("rows", local[sel])) for s in np.unique(shard_of).tolist() for sel in [np.flatnonzero(shard_of == s)]]
+        for sel, fut in futures:
+            for i, ep in zip(sel.tolist(), fut.result()):
+                out[i] = ep
+        return out
+
+    def recent(self, k: int = 5) -> List[Mapping[str, Any]]:
+        n = len(self._shard_of)
+        return self.get_episodes(list(range(max(0, n - k), n)))
+
+    # Lifecycle
+    def _relayout(self, layouts: List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]) -> None:
+        # Global rows are the live rows of all shards in timestamp order. Equal timestamps
+        # (one batch shares one) keep the order they were recorded in, by global id; shard
+        # and local row only separate stores written before ids were global.
+        shard = np.concatenate([np.full(rows.size, s, dtype=np.int32) for s, (_, rows, _, _) in enumerate(layouts)])
+        local = np.concatenate([rows for _, rows, _, _ in layouts]).astype(np.int64)
+        ts = np.concatenate([t for _, _, t, _ in layouts]).astype(np.float64)
+        ids = np.concatenate([i for _, _, _, i in layouts]).astype(np.int64)
+        order = np.lexsort((local, shard, ids, ts))
+        with self._lock:
+            self._shard_of = Growable(np.int32)
+            self._shard_of.extend(shard[order])
+            self._local = Growable(np.int64)
+            self._local.extend(local[order])
+            self._global = []
+            for s, (n, _, _, _) in enumerate(layouts):
+                g = Growable(np.int64)
+                g.extend(np.full(n, -1, dtype=np.int64))
+                mine = np.flatnonzero(self._shard_of.view() == s)
+                g.view()[self._local.view()[mine]] = mine
+                self._global.append(g)
+            self.generation += 1
+
+    def load(self, directory: Optional[str] = None, mmap_mode: Optional[str] = None, lazy: bool = False) -> None:
+        # Shards always load their own directories; the arguments mirror LongTermMemory.load.
+        t0 = time.perf_counter()
+        self._relayout(self._fan_out("load", lazy))
+        with self._lock:
+            self._next_id = max([self._next_id] + self._fan_out("next_id"))
+        self.load_profile["shards"] = time.perf_counter() - t0
+
+    def save(self, directory: Optional[str] = None) -> None:
+        if self._encoder.embed_cache is not None:
+            self._encoder.embed_cache.save(force=False)
+        self._fan_out("save")
+
+    def wait_for_index(self) -> None:
+        self._fan_out("wait_for_index")
+
+    def consolidate(self, policy: Optional[ConsolidationPolicy] = None, now: Optional[float] = None, vacuum: bool = True) -> Dict[str, Any]:
+        # Every shard consolidates its own rows in parallel. Hash routing puts repeats of a
+        # query on the same shard, so exact duplicates still merge. max_episodes is a global
+        # cap: once the other rules have run, each shard is given a quota that drops its share
+        # of the globally oldest rows.
+        t0 = time.perf_counter()
+        policy = policy or ConsolidationPolicy()
+        reports = self._fan_out("consolidate", policy.model_copy(update={"max_episodes": None}), now, vacuum)
+        layouts = self._fan_out("layout")
+        live = sum(rows.size for _, rows, _, _ in layouts)
+        if policy.max_episodes is not None and live > policy.max_episodes:
+            ts = np.concatenate([t for _, _, t, _ in layouts])
+            ids = np.concatenate([i for _, _, _, i in layouts])
+            shard = np.concatenate([np.full(rows.size, s, dtype=np.int32) for s, (_, rows, _, _) in enumerate(layouts)])
+            oldest = np.bincount(shard[np.lexsort((ids, ts))[: live - policy.max_episodes]], minlength=len(self._shards))
+            futures = [
+                shard_.call("consolidate", policy.model_copy(update={"max_episodes": int(rows.size - drop)}), now, vacuum)
+                for shard_, (_, rows, _, _), drop in zip(self._shards, layouts, oldest.tolist())
+            ]
+            reports += [f.result() for f in futures]
+            layouts = self._fan_out("layout")
+        self._relayout(layouts)
+        out: Dict[str, Any] = {}
+        for report in reports:
+            for key, value in report.items():
+                if key not in ("episodes", "tombstones"):
+                    out[key] = out.get(key, 0) + value
+        out["episodes"] = len(self._shard_of)
+        out["tombstones"] = sum(n - rows.size for n, rows, _, _ in layouts)
+        out["seconds"] = time.perf_counter() - t0
+        return out
+
+    def index_report(self, k: int = 10) -> List[Dict[str, Any]]:
+        return self._fan_out("index_report", k)
+
+    def close(self) -> None:
+        if self._encoder.embed_cache is not None:
+            self._encoder.embed_cache.save()
+        if self._encoder.batcher is not None:
+            self._encoder.batcher.close()
+        self._fan_out("close")
+        for shard in self._shards:
+            shard.stop()
@@ -1,46 +1,134 @@
-from __future__ import annotations
-
-from typing import List
-import math
-import time
-
-from ..types import Experience
-
-
-class WorkingMemory:
-    def __init__(self, capacity: int = 8) -> None:
-        self.capacity = capacity
-        self.buffer: List[Experience] = []
-
-    def add(self, exp: Experience) -> None:
-        # Insert with base saliency influenced by novelty (length, punctuation)
-        novelty = min(1.0, 0.2 + len(exp.content) / 200.0)
-        exp.saliency = max(0.05, min(1.0, 0.5 * novelty))
-        self.buffer.append(exp)
-        self._trim()
-
-    def _trim(self) -> None:
-        if len(self.buffer) <= self.capacity:
-            return
-        # Drop lowest effective score first
-        self.buffer.sort(key=lambda e: self._effective_score(e))
-        self.buffer = self.buffer[-self.capacity :]
-        # Preserve temporal order after trim
-        self.buffer.sort(key=lambda e: e.timestamp)
-
-    def _effective_score(self, e: Experience) -> float:
-        # Recency decay + saliency
-        age_s = max(0.0, time.time() - e.timestamp)
-        recency = math.exp(-age_s / 120.0)  # ~2 min half-life-ish
-        return 0.6 * e.saliency + 0.4 * recency
-
-    def topk(self, k: int) -> List[Experience]:
-        return sorted(self.buffer, key=lambda e: self._effective_score(e), reverse=True)[:k]
-
-    def reinforce(self, items: List[Experience], delta: float = 0.1) -> None:
-        ids = {i.id for i in items}
-        for e in self.buffer:
-            if e.id in ids:
-                e.saliency = min(1.0, e.saliency + delta)
-            else:
-                e.saliency = max(0.01, e.saliency * 0.98)
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+import time
+
+import numpy as np
+
+from ..types import Experience
+
+
+# Saliency and timestamps live in numpy arrays indexed by slot; Experience objects are
+# kept alongside and have their saliency synced whenever they are handed out. Every
+# operation reads the clock once and scores all items in one vectorized pass.
+class WorkingMemory:
+    def __init__(self, capacity: int = 8) -> None:
+        self.capacity = capacity
+        self._items: List[Optional[Experience]] = []
+        self._saliency = np.zeros(0, dtype=np.float64)
+        self._timestamp = np.zeros(0, dtype=np.float64)
+        self._seq = np.zeros(0, dtype=np.int64)
+        self._active = np.zeros(0, dtype=bool)
+        self._free: List[int] = []
+        self._slots: Dict[str, List[int]] = {}
+        self._count = 0
+        self._next_seq = 0
+        self._grow(capacity + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def buffer(self) -> List[Experience]:
+        slots = self._active_slots()
+        return [self._sync(int(s)) for s in slots[np.argsort(self._seq[slots])]]
+
+    def _grow(self, size: int) -> None:
+        old = len(self._items)
+        if size <= old:
+            return
+        self._items.extend([None] * (size - old))
+        self._saliency = np.concatenate([self._saliency, np.zeros(size - old)])
+        self._timestamp = np.concatenate([self._timestamp, np.zeros(size - old)])
+        self._seq = np.concatenate([self._seq, np.zeros(size - old, dtype=np.int64)])
+        self._active = np.concatenate([self._active, np.zeros(size - old, dtype=bool)])
+        self._free.extend(range(size - 1, old - 1, -1))
+
+    def _active_slots(self) -> np.ndarray:
+        return np.flatnonzero(self._active)
+
+    def _sync(self, slot: int) -> Experience:
+        e = self._items[slot]
+        e.saliency = float(self._saliency[slot])
+        return e
+
+    def add(self, exp: Experience) -> None:
+        # Insert with base saliency influenced by novelty (length, punctuation)
+        novelty = min(1.0, 0.2 + len(exp.content) / 200.0)
+        exp.saliency = max(0.05, min(1.0, 0.5 * novelty))
+        if not self._free:
+            self._grow(2 * len(self._items))
+        slot = self._free.pop()
+        self._items[slot] = exp
+        self._saliency[slot] = exp.saliency
+        self._timestamp[slot] = exp.timestamp
+        self._seq[slot] = self._next_seq
+        self._active[slot] = True
+        self._slots.setdefault(exp.id, []).append(slot)
+        self._next_seq += 1
+        self._count += 1
+        self._trim()
+
+    def _remove(self, slot: int) -> None:
+        e = self._items[slot]
+        slots = self._slots.get(e.id, [])
+        slots.remove(slot)
+        if not slots:
+            self._slots.pop(e.id, None)
+        self._items[slot] = None
+        self._active[slot] = False
+        self._free.append(slot)
+        self._count -= 1
+
+    def _trim(self) -> None:
+        if self._count <= self.capacity:
+            return
+        # Drop lowest effective score first
+        scores = self._scores(time.time())
+        scores[~self._active] = np.inf
+        for slot in self._smallest(scores, self._count - self.capacity):
+            self._remove(int(slot))
+
+    def _smallest(self, keys: np.ndarray, n: int) -> np.ndarray:
+        # Slots of the n smallest keys. Ties at the cut go to the earliest inserted items;
+        # argpartition alone would pick among them arbitrarily. Small buffers just sort.
+        if n >= keys.size:
+            return np.arange(keys.size)
+        if keys.size <= 64:
+            return np.lexsort((self._seq, keys))[:n]
+        pick = np.argpartition(keys, n - 1)[:n]
+        cut = keys[pick].max()
+        tied = np.flatnonzero(keys == cut)
+        if tied.size == 1:
+            return pick
+        below = pick[keys[pick] < cut]
+        tied = tied[np.argsort(self._seq[tied], kind="stable")[: n - below.size]]
+        return np.concatenate([below, tied])
+
+    def _scores(self, now: float) -> np.ndarray:
+        # Recency decay + saliency, for every slot (free slots included)
+        age_s = np.maximum(0.0, now - self._timestamp)
+        recency = np.exp(-age_s / 120.0)  # ~2 min half-life-ish
+        return 0.6 * self._saliency + 0.4 * recency
+
+    def topk(self, k: int) -> List[Experience]:
+        k = min(k, self._count)
+        if k <= 0:
+            return []
+        scores = self._scores(time.time())
+        scores[~self._active] = -np.inf
+        pick = self._smallest(-scores, k)
+        # Highest score first; ties keep insertion order.
+        pick = pick[np.lexsort((self._seq[pick], -scores[pick]))]
+        return [self._sync(int(slot)) for slot in pick[:k]]
+
+    def reinforce(self, items: List[Experience], delta: float = 0.1) -> None:
+        hit = np.zeros(len(self._items), dtype=bool)
+        for item in items:
+            for slot in self._slots.get(item.id, ()):
+                hit[slot] = True
+        decay = self._active & ~hit
+        self._saliency[decay] = np.maximum(0.01, self._saliency[decay] * 0.98)
+        self._saliency[hit] = np.minimum(1.0, self._saliency[hit] + delta)
+        for slot in np.flatnonzero(hit):
+            self._sync(int(slot))
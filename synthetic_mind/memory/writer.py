@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Any, List, Optional, Tuple
+import queue
+import threading
+
+from ..types import Thought
+from .long_term import LongTermMemory
+
+
+_SAVE = "save"
+_RECORD = "record"
+_STOP = "stop"
+
+
+# Write-behind worker for LongTermMemory: episode embedding, indexing and saves run on
+# a single thread fed by a bounded queue, so callers only block when the queue is full.
+class BackgroundWriter:
+    def __init__(self, ltm: LongTermMemory, max_queue: int = 256) -> None:
+        self.ltm = ltm
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ltm-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def record(self, query: str, response: str, thought: Thought, tags: List[str] | None = None) -> None:
+        self.record_many([query], [response], [thought], [tags or []])
+
+    def record_many(self, queries: List[str], responses: List[str], thoughts: List[Thought], tags: List[List[str]]) -> None:
+        self._put(_RECORD, (list(queries), list(responses), list(thoughts), list(tags)))
+
+    def save(self) -> None:
+        self._put(_SAVE, None)
+
+    def _put(self, kind: str, payload: Any) -> None:
+        if self._closed:
+            raise RuntimeError("BackgroundWriter is closed")
+        self._raise_pending_error()
+        self._queue.put((kind, payload))
+
+    def _run(self) -> None:
+        while True:
+            kind, payload = self._queue.get()
+            batch = [(kind, payload)]
+            # Coalesce queued records into one embedding batch.
+            while kind == _RECORD:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(nxt)
+                if nxt[0] != _RECORD:
+                    break
+            try:
+                self._apply(batch)
+            except BaseException as e:  # surfaced on the next flush/submit
+                self._error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1][0] == _STOP:
+                return
+
+    def _apply(self, batch: List[Tuple[str, Any]]) -> None:
+        records = [p for k, p in batch if k == _RECORD]
+        if records:
+            self.ltm.record_episodes(
+                [q for r in records for q in r[0]],
+                [a for r in records for a in r[1]],
+                [t for r in records for t in r[2]],
+                [g for r in records for g in r[3]],
+            )
+        if batch[-1][0] == _SAVE:
+            self.ltm.save()
+
+    def _raise_pending_error(self) -> None:
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+
+    def flush(self) -> None:
+        self._queue.join()
+        self._raise_pending_error()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._queue.put((_STOP, None))
+        self._closed = True
+        self._thread.join()
+        self._raise_pending_error()
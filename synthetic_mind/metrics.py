@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import bisect
+import json
+import threading
+import time
+import weakref
+
+
+# Seconds; roughly log-spaced from 50us to 10s.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0,
+)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Optional[Dict[str, str]]) -> _Key:
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+# Process-wide counters, gauges and latency histograms. Every recording call is a dict update
+# under one lock and returns immediately when disabled. Gauges that are cheap to read but
+# expensive to push (index size, cache occupancy) come from collectors polled at export time.
+class Metrics:
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        self._gauges: Dict[_Key, float] = {}
+        self._histograms: Dict[_Key, Histogram] = {}
+        self._collectors: List[Callable[[], Optional[Dict[str, float]]]] = []
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        if not self.enabled:
+            return
+        k = _key(name, labels)
+        with self._lock:
+            self._counters[k] = self._counters.get(k, 0.0) + value
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None) -> None:
+        if not self.enabled:
+            return
+        k = _key(name, labels)
+        with self._lock:
+            h = self._histograms.get(k)
+            if h is None:
+                h = self._histograms[k] = Histogram()
+            h.observe(seconds)
+
+    def observe_many(self, name: str, label: str, values: Dict[str, float]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            for v, seconds in values.items():
+                k = (name, ((label, v),))
+                h = self._histograms.get(k)
+                if h is None:
+                    h = self._histograms[k] = Histogram()
+                h.observe(seconds)
+
+    def add_collector(self, owner: Any, method: Callable[[Any], Dict[str, float]]) -> None:
+        # Held weakly, so registering a LongTermMemory does not keep it alive.
+        ref = weakref.ref(owner)
+
+        def collect() -> Optional[Dict[str, float]]:
+            obj = ref()
+            return None if obj is None else method(obj)
+
+        with self._lock:
+            self._collectors.append(collect)
+
+    def _collect(self) -> Dict[_Key, float]:
+        gauges = dict(self._gauges)
+        alive = []
+        for collect in self._collectors:
+            values = collect()
+            if values is None:
+                continue
+            alive.append(collect)
+            for name, v in values.items():
+                k = _key(name, None)
+                gauges[k] = gauges.get(k, 0.0) + v
+        self._collectors = alive
+        return gauges
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            gauges = self._collect()
+            out: Dict[str, Any] = {"counters": {}, "gauges": {}, "histograms": {}}
+            for (name, labels), v in sorted(self._counters.items()):
+                out["counters"][_flat(name, labels)] = v
+            for (name, labels), v in sorted(gauges.items()):
+                out["gauges"][_flat(name, labels)] = v
+            for (name, labels), h in sorted(self._histograms.items()):
+                out["histograms"][_flat(name, labels)] = {
+                    "count": h.count,
+                    "sum_s": h.sum,
+                    "mean_ms": 1000.0 * h.sum / h.count if h.count else 0.0,
+                    "p50_ms": 1000.0 * h.quantile(0.5),
+                    "p95_ms": 1000.0 * h.quantile(0.95),
+                    "p99_ms": 1000.0 * h.quantile(0.99),
+                }
+            return out
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            gauges = self._collect()
+            for kind, series in (("counter", self._counters), ("gauge", gauges)):
+                typed = set()
+                for (name, labels), v in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{name}{_labels(labels)} {v:g}")
+            typed = set()
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, c in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += c
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {h.sum:g}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _flat(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# Sequential stage timer for one step: each lap() closes the stage that started at the
+# previous lap. When disabled, laps cost one attribute check.
+class Spans:
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.timings: Dict[str, float] = {}
+        self._t = time.perf_counter() if enabled else 0.0
+
+    def lap(self, stage: str) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + (now - self._t)
+        self._t = now
+
+    def skip(self) -> None:
+        # Restart the clock without attributing the elapsed time to any stage.
+        if self.enabled:
+            self._t = time.perf_counter()
+
+    def as_ms(self) -> Dict[str, float]:
+        return {k: v * 1000.0 for k, v in self.timings.items()}
+
+
+METRICS = Metrics()
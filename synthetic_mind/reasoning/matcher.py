@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+import json
+
+from pydantic import BaseModel
+
+
+# Below this many keywords, one C-level `in` scan per keyword beats walking an automaton
+# in Python; above it, Aho-Corasick keeps the cost per text flat as keywords are added.
+_SCAN_MAX = 32
+
+
+# Multi-keyword substring matcher. Reports every keyword occurring anywhere in the text
+# (the same answer as `[k for k in keywords if k in text]`) in a single pass over the text.
+class KeywordMatcher:
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords: List[str] = list(dict.fromkeys(k for k in keywords if k))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]
+        if len(self.keywords) > _SCAN_MAX:
+            self._compile()
+
+    def _compile(self) -> None:
+        for kw in self.keywords:
+            state = 0
+            for ch in kw:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state].add(kw)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def hits(self, text: str) -> Set[str]:
+        if len(self.keywords) <= _SCAN_MAX:
+            return {kw for kw in self.keywords if kw in text}
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class Rule(BaseModel):
+    name: str
+    keywords: List[str]
+    response: str
+    priority: int = 0  # higher wins; ties keep registration order
+
+
+DEFAULT_RULES: List[Rule] = [
+    Rule(
+        name="identity",
+        keywords=["who are you", "what are you", "what is your purpose"],
+        response="I am a synthetic mind prototype combining memory, attention, reasoning, and reflection.",
+    ),
+    Rule(
+        name="why_did_you",
+        keywords=["why did you"],
+        response="I chose that response based on retrieved context and current intent to maintain coherence.",
+    ),
+    Rule(
+        name="uncertainty",
+        keywords=["don't know", "not sure"],
+        response="I acknowledge uncertainty and can ask clarifying questions or search memory.",
+    ),
+]
+DEFAULT_TAGS: List[str] = ["math", "reason", "self", "who", "what", "why", "how", "goal", "philosophy", "ethics", "science", "coding"]
+DEFAULT_GREETINGS: List[str] = ["hi", "hello", "hey", "how are you", "what's up", "sup", "yo", "good morning", "good evening"]
+
+
+class Hits:
+    def __init__(self, registry: "RuleRegistry", found: Set[str]) -> None:
+        self._registry = registry
+        self.keywords = found
+
+    # Each lookup costs O(hits), independent of how many rules, tags or greetings exist.
+    @property
+    def tags(self) -> List[str]:
+        order = self._registry._tag_order
+        return sorted((k for k in self.keywords if k in order), key=order.__getitem__)
+
+    @property
+    def greeting(self) -> bool:
+        return not self._registry._greeting_set.isdisjoint(self.keywords)
+
+    @property
+    def rule(self) -> Optional[Rule]:
+        first = self._registry._rule_of
+        idx = min((first[k] for k in self.keywords if k in first), default=None)
+        return None if idx is None else self._registry.rules[idx]
+
+
+# Keyword rules, tag keywords and greetings compiled into one shared matcher. Keywords are
+# matched as lowercase substrings, so callers pass lowercased text.
+class RuleRegistry:
+    def __init__(self, rules: Optional[List[Rule]] = None, tags: Optional[List[str]] = None, greetings: Optional[List[str]] = None) -> None:
+        self.rules: List[Rule] = []
+        # Duplicates are dropped like add_tags/add_greetings do; a tag ranks by its first position.
+        self.tags: List[str] = list(dict.fromkeys(DEFAULT_TAGS if tags is None else tags))
+        self.greetings: List[str] = list(dict.fromkeys(DEFAULT_GREETINGS if greetings is None else greetings))
+        self._matcher: Optional[KeywordMatcher] = None
+        for rule in DEFAULT_RULES if rules is None else rules:
+            self.add_rule(rule)
+
+    def add_rule(self, rule: Rule) -> None:
+        rule = rule.model_copy(update={"keywords": [k.lower() for k in rule.keywords]})
+        self.rules.append(rule)
+        self._matcher = None
+
+    def add_tags(self, tags: Iterable[str]) -> None:
+        self.tags.extend(t.lower() for t in tags if t.lower() not in self.tags)
+        self._matcher = None
+
+    def add_greetings(self, greetings: Iterable[str]) -> None:
+        self.greetings.extend(g.lower() for g in greetings if g.lower() not in self.greetings)
+        self._matcher = None
+
+    def load(self, path: str) -> None:
+        # {"rules": [{"name", "keywords", "response", "priority"?}], "tags": [...], "greetings": [...]}
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for rule in data.get("rules", []):
+            self.add_rule(Rule(**rule))
+        self.add_tags(data.get("tags", []))
+        self.add_greetings(data.get("greetings", []))
+
+    @property
+    def matcher(self) -> KeywordMatcher:
+        if self._matcher is None:
+            self.rules.sort(key=lambda r: -r.priority)
+            self._rule_of: Dict[str, int] = {}
+            for i, rule in enumerate(self.rules):
+                for k in rule.keywords:
+                    self._rule_of.setdefault(k, i)
+            self._tag_order = {t: i for i, t in enumerate(self.tags)}
+            self._greeting_set = set(self.greetings)
+            self._matcher = KeywordMatcher(list(self._rule_of) + self.tags + self.greetings)
+        return self._matcher
+
+    def scan(self, text: str) -> Hits:
+        return Hits(self, self.matcher.hits(text))
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .core import MindConfig, SyntheticMind, create_long_term_memory
+from .memory.segments import SegmentStore
+from .metrics import METRICS
+
+TRANSCRIPT_SUFFIXES = (".jsonl", ".json", ".txt")
+
+RESULT_SCHEMA = pa.schema(
+    [
+        ("transcript", pa.string()),
+        ("turn", pa.int32()),
+        ("prompt", pa.string()),
+        ("response", pa.string()),
+        ("expected", pa.string()),
+        ("matches", pa.bool_()),
+        ("latency_ms", pa.float64()),
+        ("first_chunk_ms", pa.float64()),
+        ("timings", pa.map_(pa.string(), pa.float64())),
+        ("trace", pa.string()),
+        ("worker", pa.int32()),
+        ("error", pa.string()),
+    ]
+)
+
+
+# Transcripts. A .txt file is one prompt per line. A .jsonl file is one turn per line,
+# either {"prompt": ..., "expected": ...} or chat messages ({"role": "user"|"assistant",
+# "content": ...}), where an assistant message is the expected answer to the user turn
+# before it. A .json file holds the same turns as a list or under "turns".
+def find_transcripts(directory: str) -> List[str]:
+    out: List[str] = []
+    for root, _, files in os.walk(directory):
+        out.extend(os.path.join(root, f) for f in files if f.endswith(TRANSCRIPT_SUFFIXES))
+    return sorted(out)
+
+
+def load_transcript(path: str) -> List[Tuple[str, Optional[str]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".txt"):
+            return [(line.strip(), None) for line in f if line.strip()]
+        if path.endswith(".jsonl"):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            items = data.get("turns", []) if isinstance(data, dict) else data
+    turns: List[Tuple[str, Optional[str]]] = []
+    for item in items:
+        if isinstance(item, str):
+            turns.append((item, None))
+        elif "role" in item:
+            if item["role"] == "user":
+                turns.append((item.get("content", ""), None))
+            elif item["role"] == "assistant" and turns and turns[-1][1] is None:
+                turns[-1] = (turns[-1][0], item.get("content", ""))
+        else:
+            prompt = item.get("prompt", item.get("query", ""))
+            turns.append((prompt, item.get("expected", item.get("response"))))
+    return [(p, e) for p, e in turns if p]
+
+
+# Worker side. Each process opens the snapshot once, read-only (no orphan cleanup, so a
+# live writer's in-flight segments are left alone): embeddings stay memory-mapped from
+# the segment files, so every worker reads the same page-cache pages.
+# One mind per process replays transcripts in turn. Each transcript starts from a copy of
+# the initial conversation state, and the episodes it records are truncated away afterwards,
+# so every transcript runs against the snapshot alone (BM25 statistics included), in any
+# order, and the snapshot on disk is never written.
+class _Replayer:
+    def __init__(self, snapshot: str, config: MindConfig, trace: bool, lazy: bool) -> None:
+        config = config.model_copy(update={"storage_dir": None, "ltm_shards": 0, "write_behind": False, "consolidation": None})
+        ltm = create_long_term_memory(config)
+        ltm.load(directory=snapshot, mmap_mode="r", lazy=lazy)
+        ltm.wait_for_index()
+        self.mind = SyntheticMind(config=config, trace=trace, long_term_memory=ltm)
+        self.initial = self.mind.conversation_state()
+        self.trace = trace
+
+    def run(self, path: str, name: str) -> List[Dict[str, Any]]:
+        mind, ltm = self.mind, self.mind.long_term_memory
+        mind.reset_conversation(self.initial)
+        start = len(ltm.episodes)
+        rows: List[Dict[str, Any]] = []
+        try:
+            turns = load_transcript(path)
+            for i, (prompt, expected) in enumerate(turns):
+                t0 = time.perf_counter()
+                response = mind.step(prompt)
+                latency = (time.perf_counter() - t0) * 1000.0
+                trace = mind.last_trace if self.trace else {}
+                timings = dict(trace.get("timings", {}))
+                rows.append(
+                    {
+                        "transcript": name,
+                        "turn": i,
+                        "prompt": prompt,
+                        "response": response,
+                        "expected": expected,
+                        "matches": None if expected is None else response.strip() == expected.strip(),
+                        "latency_ms": latency,
+                        "first_chunk_ms": timings.pop("first_chunk", None),
+                        "timings": list(timings.items()),
+                        "trace": json.dumps(trace, default=str) if trace else None,
+                        "worker": os.getpid(),
+                        "error": None,
+                    }
+                )
+        except Exception as e:
+            rows.append({"transcript": name, "turn": len(rows), "worker": os.getpid(), "error": f"{type(e).__name__}: {e}"})
+        finally:
+            ltm.truncate(start)
+        return rows
+
+
+_REPLAYER: Optional[_Replayer] = None
+
+
+def _init_worker(snapshot: str, config_json: str, trace: bool, lazy: bool) -> None:
+    global _REPLAYER
+    _REPLAYER = _Replayer(snapshot, MindConfig.model_validate_json(config_json), trace, lazy)
+
+
+def _run_batch(batch: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for path, name in batch:
+        rows.extend(_REPLAYER.run(path, name))
+    return rows
+
+
+def check_snapshot(snapshot: str) -> None:
+    if not SegmentStore(snapshot, read_only=True).exists():
+        hint = " (sharded store: export it and import the file into one directory first)" if os.path.isdir(os.path.join(snapshot, "shard-00")) else ""
+        raise ValueError(f"no segment store at {snapshot}{hint}")
+
+
+def replay(
+    transcripts_dir: str,
+    snapshot: str,
+    out_path: str,
+    config: Optional[MindConfig] = None,
+    workers: int = 0,
+    batch: int = 8,
+    trace: bool = True,
+    lazy: bool = True,
+    flush_rows: int = 10_000,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    # Replays every transcript under transcripts_dir against the LTM snapshot in `snapshot`
+    # and writes one row per turn to the parquet file out_path. workers=0 runs in this
+    # process. Rows are buffered up to flush_rows, then written as one row group.
+    check_snapshot(snapshot)
+    config = config or MindConfig()
+    paths = find_transcripts(transcripts_dir)
+    batches = [[(p, os.path.relpath(p, transcripts_dir)) for p in paths[i : i + batch]] for i in range(0, len(paths), batch)]
+    report: Dict[str, Any] = {"transcripts": len(paths), "turns": 0, "errors": 0, "compared": 0, "mismatches": 0, "workers": workers}
+    latencies: List[float] = []
+    buffered: List[Dict[str, Any]] = []
+    writer = pq.ParquetWriter(out_path + ".tmp", RESULT_SCHEMA)
+    finished = False
+    t0 = time.perf_counter()
+
+    def collect(rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            if row.get("error"):
+                report["errors"] += 1
+                continue
+            report["turns"] += 1
+            latencies.append(row["latency_ms"])
+            if row["matches"] is not None:
+                report["compared"] += 1
+                report["mismatches"] += not row["matches"]
+        buffered.extend(rows)
+        if len(buffered) >= flush_rows:
+            flush()
+        METRICS.inc("replay_turns_total", len(rows))
+        if progress is not None:
+            progress({**report, "elapsed_s": time.perf_counter() - t0})
+
+    def flush() -> None:
+        if buffered:
+            writer.write_table(pa.Table.from_pylist(buffered, schema=RESULT_SCHEMA))
+            buffered.clear()
+
+    try:
+        if workers <= 0:
+            _init_worker(snapshot, config.model_dump_json(), trace, lazy)
+            report["startup_s"] = time.perf_counter() - t0
+            for b in batches:
+                collect(_run_batch(b))
+        else:
+            ctx = mp.get_context("spawn")
+            args = (snapshot, config.model_dump_json(), trace, lazy)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=args) as pool:
+                pending: Deque[Future] = deque()
+                for b in batches:
+                    pending.append(pool.submit(_run_batch, b))
+                    # Bounded read-ahead keeps results from piling up in the pool.
+                    while len(pending) >= 2 * workers:
+                        collect(pending.popleft().result())
+                while pending:
+                    collect(pending.popleft().result())
+        flush()
+        finished = True
+    finally:
+        writer.close()
+        if not finished:
+            try:
+                os.remove(out_path + ".tmp")
+            except OSError:
+                pass
+    os.replace(out_path + ".tmp", out_path)
+    elapsed = time.perf_counter() - t0
+    report["elapsed_s"] = elapsed
+    report["turns_per_s"] = report["turns"] / elapsed if elapsed > 0 else 0.0
+    if latencies:
+        ms = np.asarray(latencies)
+        report["step_p50_ms"] = float(np.percentile(ms, 50))
+        report["step_p95_ms"] = float(np.percentile(ms, 95))
+    return report
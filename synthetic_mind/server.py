@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import json
+import time
+import uuid
+
+from .core import MindConfig, SyntheticMind, create_long_term_memory
+from .memory.consolidation import Consolidator
+from .metrics import METRICS
+
+MAX_BODY_BYTES = 1 << 20
+
+
+class Session:
+    def __init__(self, session_id: str, mind: SyntheticMind) -> None:
+        self.id = session_id
+        self.mind = mind
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.steps = 0
+
+
+# Hosts many conversations in one process. Each session owns its WorkingMemory,
+# SelfModel and GoalSystem (one SyntheticMind each); all sessions share a single
+# LongTermMemory and therefore one embedder and one writer to storage_dir. Steps run
+# on a thread pool; steps within a session are serialized by a per-session lock.
+class MindServer:
+    def __init__(
+        self,
+        config: Optional[MindConfig] = None,
+        max_workers: int = 8,
+        session_ttl_s: float = 1800.0,
+        trace: bool = False,
+        max_body_bytes: int = MAX_BODY_BYTES,
+    ) -> None:
+        self.config = config or MindConfig()
+        self.trace = trace
+        self.session_ttl_s = session_ttl_s
+        self.max_body_bytes = max_body_bytes
+        self.long_term_memory = create_long_term_memory(self.config)
+        self.consolidator: Optional[Consolidator] = None
+        if self.config.consolidation is not None:
+            self.consolidator = Consolidator(self.long_term_memory, self.config.consolidation)
+            self.consolidator.start()
+        self.sessions: Dict[str, Session] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mind-step")
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    # Session API
+    def create_session(self) -> Session:
+        sid = uuid.uuid4().hex
+        mind = SyntheticMind(config=self.config, trace=self.trace, long_term_memory=self.long_term_memory)
+        session = Session(sid, mind)
+        self.sessions[sid] = session
+        return session
+
+    def close_session(self, sid: str) -> bool:
+        session = self.sessions.pop(sid, None)
+        if session is None:
+            return False
+        session.mind.close()
+        return True
+
+    async def step(self, sid: str, prompt: str) -> Dict[str, Any]:
+        session = self._session(sid)
+        async with session.lock:
+            self._check_open(sid, session)
+            loop = asyncio.get_running_loop()
+            t0 = time.perf_counter()
+            response = await loop.run_in_executor(self._executor, session.mind.step, prompt)
+            session.last_used = time.monotonic()
+            session.steps += 1
+        out: Dict[str, Any] = {"session_id": sid, "response": response, "latency_ms": (time.perf_counter() - t0) * 1000.0}
+        if self.trace:
+            out["trace"] = session.mind.last_trace
+        return out
+
+    async def stream(self, sid: str, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        # The step runs on the pool and hands each answer part to the event loop as it is
+        # produced; the episode is recorded after the last part has been sent.
+        session = self._session(sid)
+        async with session.lock:
+            self._check_open(sid, session)
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            t0 = time.perf_counter()
+
+            def produce() -> None:
+                try:
+                    for part in session.mind.step_stream(prompt):
+                        loop.call_soon_threadsafe(queue.put_nowait, (part, None))
+                except Exception as e:
+                    loop.call_soon_threadsafe(queue.put_nowait, (None, e))
+                else:
+                    loop.call_soon_threadsafe(queue.put_nowait, (None, None))
+
+            done = loop.run_in_executor(self._executor, produce)
+            first_chunk_ms: Optional[float] = None
+            try:
+                while True:
+                    part, error = await queue.get()
+                    if part is None:
+                        break
+                    if first_chunk_ms is None:
+                        first_chunk_ms = (time.perf_counter() - t0) * 1000.0
+                    yield {"chunk": part}
+            finally:
+                # A client that disconnects mid-answer must not release the session while
+                # its step is still running.
+                await done
+            if error is not None:
+                raise error
+            session.last_used = time.monotonic()
+            session.steps += 1
+        yield {"done": True, "latency_ms": (time.perf_counter() - t0) * 1000.0, "first_chunk_ms": first_chunk_ms}
+
+    def _session(self, sid: str) -> Session:
+        session = self.sessions.get(sid)
+        if session is None:
+            raise KeyError(sid)
+        return session
+
+    def _check_open(self, sid: str, session: Session) -> None:
+        # The session may have been swept while this step waited for its lock.
+        if self.sessions.get(sid) is not session:
+            raise KeyError(sid)
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "sessions": len(self.sessions),
+            "episodes": len(self.long_term_memory.episodes),
+            "steps": sum(s.steps for s in self.sessions.values()),
+        }
+        if self.long_term_memory.batcher is not None:
+            out["embed_batcher"] = self.long_term_memory.batcher.stats()
+        if self.consolidator is not None:
+            out["consolidation"] = self.consolidator.last_report
+        return out
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.session_ttl_s))
+            await self._close_idle(time.monotonic() - self.session_ttl_s)
+
+    async def _close_idle(self, cutoff: float) -> int:
+        # Closes sessions last used before cutoff that no step is using. A busy session is
+        # skipped, not waited for; an idle one is closed while holding its lock, so a step
+        # queued behind the sweep finds it gone instead of running on a closed mind.
+        loop = asyncio.get_running_loop()
+        closed = 0
+        for sid, session in list(self.sessions.items()):
+            if session.last_used >= cutoff or session.lock.locked():
+                continue
+            # Free and nothing awaited since the check: this takes the lock without waiting.
+            await session.lock.acquire()
+            try:
+                if self.sessions.get(sid) is session and session.last_used < cutoff:
+                    closed += await loop.run_in_executor(self._executor, self.close_session, sid)
+            finally:
+                session.lock.release()
+        return closed
+
+    # HTTP
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        await self.start(host, port)
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self._server is not None:
+            self._server.close()
+        loop = asyncio.get_running_loop()
+        for sid in list(self.sessions):
+            await loop.run_in_executor(self._executor, self.close_session, sid)
+        if self.consolidator is not None:
+            await loop.run_in_executor(self._executor, self.consolidator.stop)
+        await loop.run_in_executor(self._executor, self.long_term_memory.close)
+        self._executor.shutdown(wait=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader, self.max_body_bytes)
+                except _BadRequest as e:
+                    # The body (if any) was not read, so the connection cannot be reused.
+                    await _send_json(writer, e.status, {"error": str(e)})
+                    break
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                await self._route(method, path, body, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        try:
+            if method == "GET" and parts == ["health"]:
+                return await _send_json(writer, 200, self.stats())
+            if method == "GET" and parts == ["metrics"]:
+                if "format=json" in path:
+                    return await _send_json(writer, 200, METRICS.to_dict())
+                return await _send_body(writer, 200, METRICS.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+            if method == "POST" and parts == ["sessions"]:
+                session = await asyncio.get_running_loop().run_in_executor(self._executor, self.create_session)
+                return await _send_json(writer, 201, {"session_id": session.id})
+            if len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+                closed = await asyncio.get_running_loop().run_in_executor(self._executor, self.close_session, parts[1])
+                return await _send_json(writer, 200 if closed else 404, {"closed": closed})
+            if len(parts) == 3 and parts[0] == "sessions" and method == "POST":
+                prompt = body.get("prompt")
+                if not isinstance(prompt, str):
+                    return await _send_json(writer, 400, {"error": "body must contain a string 'prompt'"})
+                if parts[2] == "step":
+                    return await _send_json(writer, 200, await self.step(parts[1], prompt))
+                if parts[2] == "stream":
+                    self._session(parts[1])
+                    return await _send_stream(writer, self.stream(parts[1], prompt))
+            await _send_json(writer, 404, {"error": f"no route for {method} {path}"})
+        except KeyError as e:
+            await _send_json(writer, 404, {"error": f"unknown session {e.args[0]}"})
+        except Exception as e:
+            await _send_json(writer, 500, {"error": str(e)})
+
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+async def _read_request(reader: asyncio.StreamReader, max_body: int = MAX_BODY_BYTES) -> Optional[Tuple[str, str, Dict[str, Any], bool]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, version = line.decode("latin-1").strip().split(" ", 2)
+    except ValueError:
+        raise _BadRequest(400, "malformed request line") from None
+    headers: Dict[str, str] = {}
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = h.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise _BadRequest(400, "malformed Content-Length") from None
+    if length < 0:
+        raise _BadRequest(400, "malformed Content-Length")
+    if length > max_body:
+        raise _BadRequest(413, f"request body over {max_body} bytes")
+    raw = await reader.readexactly(length) if length else b""
+    try:
+        body = json.loads(raw) if raw else {}
+    except ValueError:
+        body = {}
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method.upper(), path, body if isinstance(body, dict) else {}, keep_alive
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+    await _send_body(writer, status, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+async def _send_body(writer: asyncio.StreamWriter, status: int, data: bytes, content_type: str) -> None:
+    head = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\nContent-Length: {len(data)}\r\n\r\n"
+    writer.write(head.encode("latin-1") + data)
+    await writer.drain()
+
+
+async def _send_chunk(writer: asyncio.StreamWriter, event: Dict[str, Any]) -> None:
+    data = (json.dumps(event) + "\n").encode("utf-8")
+    writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+    await writer.drain()
+
+
+async def _send_stream(writer: asyncio.StreamWriter, events: AsyncIterator[Dict[str, Any]]) -> None:
+    # Newline-delimited JSON events over chunked transfer encoding. Once the 200 header is
+    # out, a failing step can only be reported inside the body: a final {"done", "error"}
+    # event, then the terminating chunk, so the connection stays usable.
+    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+    try:
+        async for event in events:
+            await _send_chunk(writer, event)
+    except ConnectionError:
+        raise
+    except Exception as e:
+        await _send_chunk(writer, {"done": True, "error": str(e)})
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def serve(config: Optional[MindConfig] = None, host: str = "127.0.0.1", port: int = 8765, max_workers: int = 8, trace: bool = False) -> None:
+    server = MindServer(config=config, max_workers=max_workers, trace=trace)
+    try:
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,46 @@
+import threading
+
+from synthetic_mind.attention.controller import AttentionController
+from synthetic_mind.goals.drives import GoalSystem
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.memory.working import WorkingMemory
+from synthetic_mind.types import Thought
+
+
+def _record(ltm, queries):
+    ltm.record_episodes(queries, ["answer"] * len(queries), [Thought(mode="fast", rationale="", proposal="") for _ in queries])
+
+
+def test_rows_appended_during_a_search_are_counted_once():
+    ltm = LongTermMemory(model_name="hashing")
+    _record(ltm, ["alpha beta"] * 3)
+    search_vector = ltm.search_vector
+    writers = []
+
+    def racing(q, top_k=5, required_tags=None):
+        # Another session records while this search runs.
+        writer = threading.Thread(target=_record, args=(ltm, ["alpha beta"]))
+        writer.start()
+        writer.join(0.2)
+        writers.append(writer)
+        return search_vector(q, top_k, required_tags)
+
+    ltm.search_vector = racing
+    controller = AttentionController()
+    controller._retrieve(ltm, "alpha beta", 6)
+    ltm.search_vector = search_vector
+    writers[0].join()
+    entry = controller._retrieve(ltm, "alpha beta", 6)
+    assert sorted(r for r, _ in entry.hits) == [0, 1, 2, 3]
+
+
+def test_hits_are_not_resolved_across_a_vacuum():
+    ltm = LongTermMemory(model_name="hashing")
+    _record(ltm, ["gamma delta", "unrelated words", "gamma delta again"])
+    hits, _, _, generation = ltm.search_at("gamma delta", top_k=2)
+    ltm.remove([0])
+    ltm.vacuum()
+    assert ltm.episodes_at([r for r, _ in hits], generation) is None
+    exps = AttentionController().select_with_retrieval(WorkingMemory(), GoalSystem(), ltm, "gamma delta", k=2)
+    for e in exps:
+        assert e.content.endswith(f"Q:{ltm.episodes[int(e.id[4:])]['query']} A:answer")
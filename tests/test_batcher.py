@@ -0,0 +1,30 @@
+import threading
+
+import numpy as np
+import pytest
+
+from synthetic_mind.memory.batcher import EmbeddingBatcher
+from synthetic_mind.memory.long_term import LongTermMemory
+
+
+def _encode(texts):
+    return np.arange(len(texts), dtype=np.float32).reshape(-1, 1)
+
+
+def test_submit_after_close_raises():
+    batcher = EmbeddingBatcher(_encode, max_batch_size=4, max_wait_ms=0)
+    assert batcher.encode(["a", "b"]).shape == (2, 1)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(["c"])
+    with pytest.raises(RuntimeError):
+        batcher.submit([])
+    assert not any(t.name == "ltm-embed-batcher" and t.is_alive() for t in threading.enumerate())
+
+
+def test_closed_long_term_memory_encodes_directly():
+    ltm = LongTermMemory(model_name="hashing", batch_max_size=8)
+    before = ltm.embed("hello")
+    ltm.close()
+    assert np.array_equal(ltm.embed("hello"), before)
+    assert ltm.batcher.stats()["requests"] == 1
@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pytest
+
+from synthetic_mind.memory import bulk
+from synthetic_mind.memory.bulk import ImportPolicy, export_corpus, import_corpus
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.types import Thought
+
+
+def _corpus(path, embeddings):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, emb in enumerate(embeddings):
+            f.write(json.dumps({"query": f"q{i}", "response": f"r{i}", "embedding": emb}) + "\n")
+
+
+def test_import_rescales_reused_embeddings_to_unit_norm(tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    dim = LongTermMemory(model_name="hashing-8").embed("probe").shape[0]
+    _corpus(source, [[3.0] + [0.0] * (dim - 1), [0.0, 0.5] + [0.0] * (dim - 2)])
+    ltm = LongTermMemory(model_name="hashing-8", storage_dir=str(tmp_path / "store"))
+    report = import_corpus(ltm, str(source))
+    assert report["reused_embeddings"] == 2 and report["rescaled_embeddings"] == 2
+    assert np.allclose(np.linalg.norm(ltm.vectors([0, 1]), axis=1), 1.0)
+    ltm.close()
+
+
+def test_import_reencodes_chunks_with_zero_embeddings(tmp_path):
+    source = tmp_path / "corpus.jsonl"
+    dim = LongTermMemory(model_name="hashing-8").embed("probe").shape[0]
+    _corpus(source, [[0.0] * dim])
+    ltm = LongTermMemory(model_name="hashing-8")
+    report = import_corpus(ltm, str(source), ImportPolicy())
+    assert report["imported"] == 1 and report["reused_embeddings"] == 0
+    assert np.isclose(np.linalg.norm(ltm.vectors([0])), 1.0)
+
+
+def test_export_does_not_create_or_lock_the_source(tmp_path):
+    with pytest.raises(ValueError):
+        export_corpus(str(tmp_path / "typo"), str(tmp_path / "out.parquet"))
+    assert not (tmp_path / "typo").exists()
+    store = tmp_path / "store"
+    ltm = LongTermMemory(model_name="hashing-8", storage_dir=str(store))
+    ltm.record_embedded(["q"], ["r"], [Thought(mode="fast", rationale="", proposal="")], [[]], ltm.embed_many(["q"]))
+    ltm.save()
+    # The writer still holds the store; export reads it anyway.
+    assert export_corpus(str(store), str(tmp_path / "out.jsonl"))["episodes"] == 1
+    ltm.close()
+
+
+def test_failed_export_leaves_no_temporary_file(tmp_path, monkeypatch):
+    def broken(storage_dir, chunk_rows=8192):
+        yield from ()
+        raise OSError("disk full")
+
+    monkeypatch.setattr(bulk, "iter_episodes", broken)
+    for target in ("out.parquet", "out.jsonl"):
+        with pytest.raises(OSError):
+            export_corpus(str(tmp_path), str(tmp_path / target))
+        assert not list(tmp_path.glob("out*"))
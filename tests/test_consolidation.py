@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+
+from synthetic_mind.memory.consolidation import ConsolidationPolicy, consolidate, deduplicate
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.types import Thought
+
+
+def _unit(deg: float, dim: int = 8) -> np.ndarray:
+    v = np.zeros(dim, dtype=np.float32)
+    v[0], v[1] = np.cos(np.radians(deg)), np.sin(np.radians(deg))
+    return v
+
+
+def _ltm(angles):
+    ltm = LongTermMemory(model_name="hashing-8")
+    n = len(angles)
+    thoughts = [Thought(mode="fast", rationale="", proposal="") for _ in range(n)]
+    ltm.record_embedded([f"q{i}" for i in range(n)], ["r"] * n, thoughts, [[] for _ in range(n)], np.stack([_unit(a) for a in angles]))
+    return ltm
+
+
+def test_dedup_keeps_counts_when_survivor_was_merged_earlier_in_batch():
+    # Row 0 merges into row 2, then row 1's precomputed hits still point at the dead row 2.
+    ltm = _ltm([0.0, 20.0, 10.0, -10.0])
+    deduplicate(ltm, ConsolidationPolicy(dedup_threshold=0.97))
+    eps = ltm.episodes
+    live = ~eps.dead[: len(eps)]
+    assert int(eps.counts[: len(eps)][live].sum()) == 4
+    assert live.any()
+
+
+def test_dedup_merges_into_newest_copy():
+    ltm = _ltm([0.0, 1.0, 90.0])
+    report = deduplicate(ltm, ConsolidationPolicy(dedup_threshold=0.97))
+    eps = ltm.episodes
+    assert report["merged"] == 1
+    assert eps.dead[:3].tolist() == [True, False, False]
+    assert eps.counts[:3].tolist()[1:] == [2, 1]
+
+
+def test_records_written_during_a_pass(monkeypatch):
+    ltm = _ltm([0.0, 1.0, 90.0, 45.0])
+    for row in range(4):
+        ltm.tags_index.add("keep" if row == 1 else "short", [row])
+    ltm.episodes.ts[:] = [0.0, 0.0, 0.0, 1e9]
+
+    def record_concurrently():
+        # Another session records new episodes (with both tags) while the pass runs.
+        thoughts = [Thought(mode="fast", rationale="", proposal="") for _ in range(3)]
+        writer = threading.Thread(
+            target=ltm.record_embedded,
+            args=(["new"] * 3, ["r"] * 3, thoughts, [["keep", "short"]] * 3, np.stack([_unit(180.0)] * 3)),
+        )
+        writer.start()
+        writer.join()
+
+    def after_a_record(f):
+        def wrapped(*args, **kwargs):
+            record_concurrently()
+            return f(*args, **kwargs)
+
+        return wrapped
+
+    monkeypatch.setattr(ltm, "search_vectors", after_a_record(ltm.search_vectors))
+    monkeypatch.setattr(ltm.tags_index, "get", after_a_record(ltm.tags_index.get))
+    policy = ConsolidationPolicy(keep_tags=["keep"], max_age_days=1.0, tag_max_age_days={"short": 1.0})
+    report = consolidate(ltm, policy, now=1e9 + 1000.0, vacuum=False)
+    assert report["merged"] == 1 and report["expired"] == 1
+    eps = ltm.episodes
+    # Row 0 merges into 1, which its tag keeps; row 2 expires, row 3 is recent enough.
+    # Episodes recorded during the pass are left for the next one.
+    assert eps.dead[:4].tolist() == [True, False, True, False]
+    assert len(eps) > 4 and not eps.dead[4:].any()
+    assert ltm.dedup_watermark == 4
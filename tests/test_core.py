@@ -0,0 +1,42 @@
+from synthetic_mind.action.effectors import ANSWER_SEPARATOR
+from synthetic_mind.core import MindConfig, SyntheticMind
+
+PROMPTS = ["tell me about rivers and lakes", "what is 2+2? compute it", "and the lakes again?"]
+
+
+def _mind():
+    return SyntheticMind(MindConfig(embed_model="hashing", storage_dir=None))
+
+
+def _state(mind):
+    wm = [(e.content, round(e.saliency, 9)) for e in mind.working_memory.buffer]
+    return wm, [(e["query"], e["response"]) for e in mind.long_term_memory.episodes]
+
+
+def test_streamed_answers_join_to_the_step_answer_with_the_same_bookkeeping():
+    stepped, streamed = _mind(), _mind()
+    for prompt in PROMPTS:
+        parts = list(streamed.step_stream(prompt))
+        assert len(parts) > 1
+        assert ANSWER_SEPARATOR.join(parts) == stepped.step(prompt)
+        assert _state(streamed) == _state(stepped)
+    stepped.close()
+    streamed.close()
+
+
+def test_bookkeeping_runs_after_the_last_part_or_when_the_consumer_stops():
+    mind = _mind()
+    ltm = mind.long_term_memory
+    stream = mind.step_stream(PROMPTS[0])
+    first = next(stream)
+    assert len(ltm.episodes) == 0
+    rest = list(stream)
+    assert ltm.episodes[0]["response"] == ANSWER_SEPARATOR.join([first] + rest)
+    # Stopping after the first part still records the whole answer.
+    stream = mind.step_stream(PROMPTS[2])
+    head = next(stream)
+    assert len(ltm.episodes) == 1
+    stream.close()
+    assert len(ltm.episodes) == 2
+    assert ltm.episodes[1]["response"].startswith(head + ANSWER_SEPARATOR)
+    mind.close()
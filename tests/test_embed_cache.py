@@ -0,0 +1,80 @@
+import numpy as np
+
+from synthetic_mind.memory.embed_cache import EmbeddingCache
+from synthetic_mind.memory.long_term import LongTermMemory
+
+
+def _vec(i, dim=4):
+    return np.full(dim, i, dtype=np.float32)
+
+
+def _cached(cache, texts):
+    return [v is not None for v in cache.get_many(texts)]
+
+
+def test_least_recently_used_entry_goes_first():
+    cache = EmbeddingCache("m", max_entries=3)
+    cache.put_many(["a", "b", "c"], np.stack([_vec(0), _vec(1), _vec(2)]))
+    cache.get_many(["a"])
+    cache.put_many(["d"], _vec(3)[None])
+    assert _cached(cache, ["a", "b", "c", "d"]) == [True, False, True, True]
+    # Re-putting an entry refreshes it too.
+    cache.put_many(["c"], _vec(2)[None])
+    cache.put_many(["e"], _vec(4)[None])
+    assert _cached(cache, ["a", "c", "d", "e"]) == [False, True, True, True]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_byte_budget_evicts_oldest():
+    cache = EmbeddingCache("m", max_entries=100, max_bytes=40)
+    cache.put_many(["a", "b", "c"], np.stack([_vec(0), _vec(1), _vec(2)]))
+    assert len(cache) == 2 and cache.stats()["bytes"] == 32
+    assert _cached(cache, ["a", "b", "c"]) == [False, True, True]
+
+
+def test_keys_use_normalized_text_and_model_name():
+    cache = EmbeddingCache("m")
+    assert cache.key("hello   world\n") == cache.key(" hello world")
+    # NFC: a precomposed and a combining-accent "é" are the same text.
+    assert cache.key("caf\u00e9") == cache.key("cafe\u0301")
+    assert cache.key("Hello") != cache.key("hello")
+    assert cache.key("hello") != EmbeddingCache("other").key("hello")
+
+
+def test_hit_and_miss_counters():
+    cache = EmbeddingCache("m")
+    cache.get_many(["a", "b"])
+    cache.put_many(["a"], _vec(0)[None])
+    cache.get_many(["a", "a  ", "b"])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 3)
+    assert stats["hit_rate"] == 0.4
+
+
+def test_persisted_cache_keeps_recency_and_ignores_other_models(tmp_path):
+    path = str(tmp_path / "cache.npz")
+    cache = EmbeddingCache("m", path=path)
+    cache.put_many(["a", "b", "c"], np.stack([_vec(0), _vec(1), _vec(2)]))
+    cache.get_many(["a"])
+    cache.save()
+    smaller = EmbeddingCache("m", max_entries=2, path=path)
+    assert _cached(smaller, ["a", "b", "c"]) == [True, False, True]
+    assert np.array_equal(smaller.get_many(["a"])[0], _vec(0))
+    assert len(EmbeddingCache("other", path=path)) == 0
+
+
+def test_ltm_encodes_only_texts_missing_from_the_cache(monkeypatch):
+    ltm = LongTermMemory(model_name="hashing-16", cache_entries=16)
+    encoded = []
+    encode = ltm._encode
+
+    def counting(texts, batch_size=64):
+        encoded.append(list(texts))
+        return encode(texts, batch_size)
+
+    monkeypatch.setattr(ltm, "_encode", counting)
+    first = ltm.embed_many(["rivers", "lakes", "rivers"])
+    second = ltm.embed_many(["lakes", " rivers ", "seas"])
+    assert encoded == [["rivers", "lakes"], ["seas"]]
+    assert np.array_equal(first[0], first[2]) and np.array_equal(second[1], first[0])
+    assert np.allclose(second, encode(["lakes", "rivers", "seas"]))
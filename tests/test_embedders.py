@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import synthetic_mind
+from synthetic_mind.memory.embedders import HashingEmbedder
+
+TEXTS = ["Rivers flow into lakes", "rivers   flow into LAKES!", "the sky is blue", "x", "", "?!"]
+
+
+def test_vectors_are_unit_norm_and_do_not_depend_on_the_batch():
+    embedder = HashingEmbedder.from_name("hashing-64")
+    assert embedder.get_sentence_embedding_dimension() == 64
+    vecs = embedder.encode(TEXTS)
+    assert vecs.shape == (len(TEXTS), 64) and vecs.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vecs[:4], axis=1), 1.0)
+    # Texts without a word embed to zeros rather than NaN.
+    assert not vecs[4:].any()
+    assert np.array_equal(vecs[0], vecs[1])
+    assert np.array_equal(np.concatenate([embedder.encode([t]) for t in TEXTS]), vecs)
+    assert vecs[0] @ embedder.encode(["rivers flow"])[0] > vecs[0] @ vecs[2]
+
+
+def test_vectors_are_the_same_in_every_process():
+    # Benchmarks compare runs against stored baselines, so nothing may depend on hash seeds.
+    code = "import sys; from synthetic_mind.memory.embedders import HashingEmbedder; sys.stdout.buffer.write(HashingEmbedder(32).encode(%r).tobytes())" % TEXTS
+    root = os.path.dirname(os.path.dirname(os.path.abspath(synthetic_mind.__file__)))
+    out = [
+        subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, env=dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)).stdout
+        for seed in ("1", "2")
+    ]
+    assert out[0] == out[1] == HashingEmbedder(32).encode(TEXTS).tobytes()
@@ -0,0 +1,42 @@
+from synthetic_mind.memory import episodes
+from synthetic_mind.memory.episodes import EpisodeTable
+
+
+def _append(table, start, n):
+    rows = range(start, start + n)
+    table.append_batch(
+        [float(i) for i in rows],
+        [f"q{i}" for i in rows],
+        [f"r{i}" for i in rows],
+        [{"mode": "m", "rationale": str(i), "proposal": "p"} for i in rows],
+        [[f"t{i % 3}"] for i in rows],
+    )
+
+
+def test_tail_is_sealed_past_the_threshold(monkeypatch):
+    monkeypatch.setattr(episodes, "SEAL_ROWS", 10)
+    table = EpisodeTable()
+    for start in range(0, 25, 3):
+        _append(table, start, 3)
+    assert len(table) == 27
+    assert len(table._tail["query"]) < 10
+    assert [r["query"] for r in table] == [f"q{i}" for i in range(27)]
+    assert table[11]["tags"] == ["t2"] and table[11]["thought"]["rationale"] == "11"
+    out = table.to_arrow()
+    assert out.column("query").to_pylist() == [f"q{i}" for i in range(27)]
+    assert out.column("id").to_pylist() == list(range(27))
+
+
+def test_truncate_inside_a_sealed_chunk(monkeypatch):
+    monkeypatch.setattr(episodes, "SEAL_ROWS", 5)
+    table = EpisodeTable()
+    for start in range(0, 18, 3):
+        _append(table, start, 3)
+    table.tombstone([2, 9])
+    table.truncate(8)
+    assert len(table) == 8 and table.dead_rows == 1
+    assert [r["query"] for r in table] == [f"q{i}" for i in range(8)]
+    assert table.to_arrow().column("tags").to_pylist() == [[f"t{i % 3}"] for i in range(8)]
+    _append(table, 18, 3)
+    assert [r["query"] for r in table][7:] == ["q7", "q18", "q19", "q20"]
+    assert table.tags_of(8) == ["t0"] and table.ids[8] == 18
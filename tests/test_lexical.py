@@ -0,0 +1,143 @@
+import math
+
+import numpy as np
+import pytest
+
+from synthetic_mind.memory.lexical import LexicalIndex, RetrievalPolicy, tokenize
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.types import Thought
+
+DOCS = [
+    "rivers flow into lakes",
+    "rivers rivers rivers everywhere",
+    "the sky is blue",
+    "blue whales eat krill in the sea",
+    "lakes are calm and blue",
+    "a long text about mountains valleys glaciers and eventually rivers",
+]
+
+
+def _bm25(docs, query, k1=1.2, b=0.75):
+    # Textbook BM25, normalised by the summed idf of the query terms.
+    tokens = [tokenize(d) for d in docs]
+    avg = sum(len(t) for t in tokens) / len(tokens)
+    terms = set(tokenize(query))
+    idf = {t: math.log(1 + (len(docs) - sum(t in d for d in tokens) + 0.5) / (sum(t in d for d in tokens) + 0.5)) for t in terms}
+    out = {}
+    for row, doc in enumerate(tokens):
+        s = sum(idf[t] * doc.count(t) * (k1 + 1) / (doc.count(t) + k1 * (1 - b + b * len(doc) / avg)) for t in terms if t in doc)
+        if s:
+            out[row] = s / sum(idf.values())
+    return out
+
+
+def _index(docs, batches=1):
+    index = LexicalIndex()
+    for part in np.array_split(np.arange(len(docs)), batches):
+        index.add(docs[i] for i in part)
+    return index
+
+
+def _scores(index, query):
+    hit, scores = index.scores(query)
+    return dict(zip(hit.tolist(), scores.tolist()))
+
+
+@pytest.mark.parametrize("query", ["rivers", "blue lakes", "whales krill sea", "rivers and the unknown"])
+def test_scores_match_textbook_bm25(query):
+    index = _index(DOCS)
+    expected = _bm25(DOCS, query)
+    assert _scores(index, query) == pytest.approx(expected, rel=1e-5)
+    ranked = [r for r, _ in index.search(query, top_k=len(DOCS))]
+    assert ranked == sorted(expected, key=lambda r: (-expected[r], r))
+
+
+def test_rivers_ranking():
+    index = _index(DOCS)
+    # Term frequency wins, and a long document with one mention comes last.
+    assert [r for r, _ in index.search("rivers", top_k=3)] == [1, 0, 5]
+
+
+def test_incremental_add_truncate_and_take_keep_statistics():
+    whole = _index(DOCS)
+    assert _scores(_index(DOCS, batches=4), "blue rivers") == pytest.approx(_scores(whole, "blue rivers"))
+    cut = _index(DOCS)
+    cut.truncate(3)
+    for query in ("rivers", "blue lakes", "whales"):
+        assert _scores(cut, query) == pytest.approx(_bm25(DOCS[:3], query), rel=1e-5)
+    cut.add(DOCS[3:])
+    assert _scores(cut, "blue rivers") == pytest.approx(_scores(whole, "blue rivers"))
+    keep = np.array([0, 2, 4])
+    kept = _index(DOCS).take(keep, len(DOCS))
+    assert len(kept) == 3
+    for query in ("rivers", "blue lakes", "whales"):
+        assert _scores(kept, query) == pytest.approx(_bm25([DOCS[i] for i in keep], query), rel=1e-5)
+
+
+def _same(hits, expected):
+    assert [r for r, _ in hits] == [r for r, _ in expected]
+    assert [s for _, s in hits] == pytest.approx([s for _, s in expected], rel=1e-5)
+
+
+def _ltm(mode="lexical", storage_dir=None, docs=DOCS, **policy):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=storage_dir, retrieval=RetrievalPolicy(mode=mode, **policy))
+    thoughts = [Thought(mode="fast", rationale="", proposal="") for _ in docs]
+    ltm.record_episodes(list(docs), ["" for _ in docs], thoughts)
+    return ltm
+
+
+def test_removed_episodes_leave_bm25_statistics_after_vacuum():
+    ltm = _ltm()
+    ltm.remove([1, 3])
+    assert [r for r, _ in ltm.search("rivers", top_k=6)] == [0, 5]
+    ltm.vacuum()
+    fresh = _ltm(docs=[DOCS[i] for i in (0, 2, 4, 5)])
+    for query in ("rivers", "blue", "calm lakes"):
+        _same(ltm.search(query, top_k=4), fresh.search(query, top_k=4))
+
+
+def test_hybrid_fuses_vector_and_bm25_scores():
+    ltm = _ltm(mode="hybrid", hybrid_alpha=0.3)
+    q = ltm.embed("blue rivers")
+    hits = ltm.search("blue rivers", top_k=len(DOCS))
+    rows = np.array(sorted(r for r, _ in hits))
+    fused = 0.3 * (ltm.vectors(rows) @ q) + 0.7 * ltm.lexical.score_rows("blue rivers", rows)
+    expected = sorted(zip(rows.tolist(), fused.tolist()), key=lambda h: (-h[1], h[0]))
+    _same(hits, expected)
+    # The weights decide the order: all vector, then all BM25.
+    ltm.retrieval.hybrid_alpha = 1.0
+    assert [r for r, _ in ltm.search("blue rivers", top_k=3)] == [r for r, _ in ltm.search("blue rivers", top_k=3, mode="vector")]
+    ltm.retrieval.hybrid_alpha = 0.0
+    assert [r for r, _ in ltm.search("blue rivers", top_k=3)] == [r for r, _ in ltm.search("blue rivers", top_k=3, mode="lexical")]
+
+
+def test_auto_answers_strong_matches_lexically_and_falls_back_to_hybrid(monkeypatch):
+    ltm = _ltm(mode="auto", auto_min_score=0.8)
+    embed = ltm.embed
+
+    def no_embedder(text):
+        raise AssertionError("a strong lexical match must not embed the query")
+
+    monkeypatch.setattr(ltm, "embed", no_embedder)
+    assert ltm.search("blue whales eat krill", top_k=2) == ltm.search("blue whales eat krill", top_k=2, mode="lexical")
+    monkeypatch.setattr(ltm, "embed", embed)
+    weak = "mountains under snow"
+    assert ltm.search(weak, top_k=1, mode="lexical")[0][1] < 0.8
+    assert ltm.search(weak, top_k=3) == ltm.search(weak, top_k=3, mode="hybrid")
+
+
+def test_lexical_index_round_trips_through_save_and_load(tmp_path):
+    ltm = _ltm(storage_dir=str(tmp_path))
+    before = ltm.search("blue rivers", top_k=6)
+    ltm.close()
+    again = LongTermMemory(model_name="hashing", storage_dir=str(tmp_path), retrieval=RetrievalPolicy(mode="lexical"))
+    again.load()
+    # The persisted postings are used as they are; nothing is re-indexed.
+    assert again.lexical is not None and len(again.lexical) == len(DOCS)
+    assert again.search("blue rivers", top_k=6) == before
+    thoughts = [Thought(mode="fast", rationale="", proposal="")]
+    again.record_episodes(["blue rivers at dusk"], [""], thoughts)
+    assert again.search("blue rivers", top_k=1)[0][0] == len(DOCS)
+    fresh = _ltm(docs=DOCS + ["blue rivers at dusk"])
+    _same(again.search("blue rivers", top_k=7), fresh.search("blue rivers", top_k=7))
+    again.close()
@@ -0,0 +1,315 @@
+import numpy as np
+import pytest
+
+from synthetic_mind.memory import long_term
+from synthetic_mind.memory.ann import IndexPolicy, describe, supports_remove
+from synthetic_mind.memory.long_term import TOMBSTONES, LongTermMemory
+from synthetic_mind.types import Thought
+
+
+def _record(ltm, queries):
+    ltm.record_episodes(queries, ["answer " + q for q in queries], [Thought(mode="fast", rationale="", proposal="") for _ in queries])
+
+
+def _reload(path):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=str(path))
+    ltm.load()
+    return ltm
+
+
+def _live(ltm):
+    eps = ltm.episodes
+    return [(int(eps.ids[r]), eps[r]["query"], int(eps.counts[r])) for r in range(len(eps)) if not eps.dead[r]]
+
+
+def _rows(ltm):
+    return [{k: v for k, v in dict(e).items() if k != "ts"} for e in ltm.episodes]
+
+
+def _queries(n):
+    return [f"rivers {i}" if i % 2 else f"lakes {i}" for i in range(n)]
+
+
+def test_tombstones_survive_a_reload(tmp_path):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=str(tmp_path))
+    _record(ltm, _queries(6))
+    ltm.save()
+    ltm.merge(1, [3])
+    ltm.remove([5])
+    ltm.dedup_watermark = 4
+    before = (_live(ltm), ltm.search("rivers", top_k=6, mode="vector"))
+    ltm.close()
+    again = _reload(tmp_path)
+    assert again.episodes.dead_rows == 2
+    assert (_live(again), again.search("rivers", top_k=6, mode="vector")) == before
+    assert again.dedup_watermark == 4
+    # The removed last id is not handed out again.
+    _record(again, ["lakes again"])
+    assert int(again.episodes.ids[-1]) == 6
+    again.close()
+
+
+def test_vacuum_round_trip(tmp_path):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=str(tmp_path))
+    _record(ltm, _queries(8))
+    ltm.save()
+    ltm.merge(0, [2])
+    ltm.remove([7])
+    assert ltm.vacuum() == 2
+    before = (_live(ltm), ltm.search("lakes", top_k=6, mode="vector"))
+    ltm.close()
+    assert len([p for p in tmp_path.iterdir() if p.name.startswith("seg-")]) == 2
+    again = _reload(tmp_path)
+    assert len(again.episodes) == 6 and again.episodes.dead_rows == 0
+    assert (_live(again), again.search("lakes", top_k=6, mode="vector")) == before
+    assert np.array_equal(again.vectors(np.arange(6)), ltm.vectors(np.arange(6)))
+    _record(again, ["lakes again"])
+    assert int(again.episodes.ids[-1]) == 8
+    again.close()
+
+
+def test_crash_between_the_vacuum_commit_and_the_tombstone_write(tmp_path, monkeypatch):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=str(tmp_path))
+    _record(ltm, _queries(6))
+    ltm.merge(0, [4])
+    ltm.remove([1])
+    ltm.save()
+    expected = _live(ltm)
+
+    def crash(dir_path):
+        raise OSError("power cut")
+
+    monkeypatch.setattr(ltm, "_save_tombstones", crash)
+    with pytest.raises(OSError):
+        ltm.vacuum()
+    # The stale tombstone file names vacuumed ids only, so reloading ignores them.
+    for store in ltm._stores.values():
+        store.close()
+    again = _reload(tmp_path)
+    assert _live(again) == expected
+    assert again.episodes.dead_rows == 0
+    again.close()
+
+
+def test_torn_tombstone_write_is_ignored(tmp_path):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=str(tmp_path))
+    _record(ltm, _queries(4))
+    ltm.remove([2])
+    ltm.close()
+    (tmp_path / f"{TOMBSTONES}.tmp").write_bytes(b"PK\x03\x04")
+    again = _reload(tmp_path)
+    assert [q for _, q, _ in _live(again)] == ["lakes 0", "rivers 1", "rivers 3"]
+    assert not (tmp_path / f"{TOMBSTONES}.tmp").exists()
+    again.close()
+
+
+def _clustered(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n // 50, dim))
+    v = (centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def _record_vectors(ltm, vectors, tags=None):
+    n = len(vectors)
+    thoughts = [Thought(mode="fast", rationale="", proposal="")] * n
+    return ltm.record_embedded([f"q{i}" for i in range(n)], [""] * n, thoughts, tags or [[]] * n, vectors)
+
+
+@pytest.mark.parametrize("codec", ["fp16", "sq8", "pq"])
+def test_compressed_codecs_rerank_to_exact_results_and_reload(tmp_path, codec):
+    faiss = pytest.importorskip("faiss")
+    vectors = _clustered(10000, 32)
+    policy = dict(codec=codec, pq_m=8)
+    ltm = LongTermMemory(model_name="hashing-32", storage_dir=str(tmp_path), index_policy=IndexPolicy(**policy))
+    _record_vectors(ltm, vectors)
+    ltm.wait_for_index()
+    assert ltm.index is not None
+    queries = vectors[::100] + 0.05 * np.random.default_rng(1).normal(size=(100, 32)).astype(np.float32)
+    hits = 0
+    results = []
+    for q in queries:
+        exact = ltm._exact_topk(q, 10)
+        found = ltm.search_vector(q, 10)
+        results.append(found)
+        hits += len({r for r, _ in exact} & {r for r, _ in found})
+        # Re-ranked scores are full-precision scores.
+        assert all(abs(s - float(vectors[r] @ q)) < 1e-5 for r, s in found)
+    assert hits / (10 * len(queries)) >= 0.9
+    ltm.close()
+    again = LongTermMemory(model_name="hashing-32", storage_dir=str(tmp_path), index_policy=IndexPolicy(**policy))
+    again.load()
+    # The persisted codes are loaded, not rebuilt.
+    assert again.index is not None and again._index_builder is None
+    inner = faiss.downcast_index(again.index.index)
+    assert isinstance(inner, faiss.IndexPQ if codec == "pq" else faiss.IndexScalarQuantizer)
+    assert [again.search_vector(q, 10) for q in queries] == results
+    again.close()
+
+
+def _exact(vectors, dead, q, k, allowed=None):
+    sims = vectors @ q
+    sims[dead] = -np.inf
+    if allowed is not None:
+        sims[~allowed] = -np.inf
+    return [int(r) for r in np.argsort(-sims, kind="stable")[:k] if np.isfinite(sims[r])]
+
+
+@pytest.mark.parametrize("kind", ["ivf", "hnsw"])
+def test_promotion_hands_off_to_the_index_without_losing_rows_or_resurrecting_removed_ones(kind, monkeypatch):
+    pytest.importorskip("faiss")
+    vectors = _clustered(2500, 32)
+    tagged = np.arange(2500) % 3 == 0
+    tags = [["t"] if t else [] for t in tagged]
+    policy = IndexPolicy(kind=kind, threshold=2000, nlist=16, nprobe=16, hnsw_m=16, ef_search=256, filter_exact_max=0)
+    ltm = LongTermMemory(model_name="hashing-32", index_policy=policy)
+    _record_vectors(ltm, vectors[:1500], tags[:1500])
+    ltm.remove(np.arange(0, 1500, 7))
+    _record_vectors(ltm, vectors[1500:2000], tags[1500:2000])
+    # 2000 rows, but tombstones do not count towards the threshold.
+    ltm.wait_for_index()
+    assert ltm.index is None
+    build_index = long_term.build_index
+    seen = {}
+
+    def racing_build(policy, snapshot, ids):
+        # While the index trains off the lock: searches go exact, and rows are both
+        # recorded and removed. The swap must catch up on all of it.
+        q = vectors[3]
+        seen["search"] = [r for r, _ in ltm.search_vector(q, 5)]
+        seen["expected"] = _exact(vectors[: len(ltm.episodes)], ltm.episodes.dead.copy(), q, 5)
+        _record_vectors(ltm, vectors[2300:], tags[2300:])
+        ltm.remove(np.concatenate([np.arange(1, 1500, 5), np.arange(2300, 2500, 4)]))
+        return build_index(policy, snapshot, ids)
+
+    monkeypatch.setattr(long_term, "build_index", racing_build)
+    _record_vectors(ltm, vectors[2000:2300], tags[2000:2300])
+    ltm.wait_for_index()
+    assert seen["search"] == seen["expected"]
+    assert describe(ltm.index)["kind"] == kind
+    dead = ltm.episodes.dead.copy()
+    assert len(dead) == 2500
+    found = same = 0
+    # Half the queries are removed rows' own vectors: those rows must never come back.
+    for q in np.concatenate([vectors[np.flatnonzero(dead)[::8]], vectors[::50]]):
+        for allowed in (None, tagged):
+            hits = [r for r, _ in ltm.search_vector(q, 10, required_tags=["t"] if allowed is not None else None)]
+            assert not dead[hits].any()
+            if allowed is not None:
+                assert tagged[hits].all()
+            expected = _exact(vectors, dead, q, 10, allowed)
+            same += len(set(hits) & set(expected))
+            found += len(expected)
+    if kind == "ivf":
+        # Every list probed: the index search is exact.
+        assert same == found
+    else:
+        assert same / found >= 0.95
+
+
+def test_hnsw_rebuild_after_removals_keeps_searching_the_old_graph(monkeypatch):
+    pytest.importorskip("faiss")
+    vectors = _clustered(3000, 32)
+    policy = IndexPolicy(kind="hnsw", threshold=2000, hnsw_m=16, ef_search=256, rebuild_removed_ratio=0.2)
+    ltm = LongTermMemory(model_name="hashing-32", index_policy=policy)
+    _record_vectors(ltm, vectors)
+    ltm.wait_for_index()
+    old = ltm.index
+    assert not supports_remove(old)
+    build_index = long_term.build_index
+    during = {}
+
+    def watched_build(policy, snapshot, ids):
+        # The old graph still serves searches, with the removed ids filtered out.
+        during["index"] = ltm.index
+        during["hits"] = [r for q in vectors[:700:20] for r, _ in ltm.search_vector(q, 5)]
+        return build_index(policy, snapshot, ids)
+
+    monkeypatch.setattr(long_term, "build_index", watched_build)
+    ltm.remove(np.arange(0, 700))
+    ltm.wait_for_index()
+    assert during["index"] is old and min(during["hits"]) >= 700
+    assert ltm.index is not old and ltm.index.ntotal == 2300
+    assert not ltm._index_removed.size
+    for q in vectors[:700:20]:
+        assert min(r for r, _ in ltm.search_vector(q, 5)) >= 700
+
+
+def test_removals_below_the_threshold_drop_the_index(tmp_path):
+    pytest.importorskip("faiss")
+    vectors = _clustered(2500, 32)
+    policy = IndexPolicy(kind="hnsw", threshold=2000, hnsw_m=16)
+    ltm = LongTermMemory(model_name="hashing-32", storage_dir=str(tmp_path), index_policy=policy)
+    _record_vectors(ltm, vectors)
+    ltm.wait_for_index()
+    assert (tmp_path / "ann.faiss").exists()
+    ltm.remove(np.arange(0, 1000))
+    ltm.wait_for_index()
+    assert ltm.index is None and not (tmp_path / "ann.faiss").exists()
+    q = vectors[1500]
+    assert [r for r, _ in ltm.search_vector(q, 5)] == _exact(vectors, ltm.episodes.dead.copy(), q, 5)
+    ltm.close()
+
+
+def test_batched_records_match_one_at_a_time(monkeypatch):
+    queries = _queries(12)
+    tags = [["rivers"] if i % 2 else ["lakes", "lakes"] for i in range(12)]
+    thoughts = [Thought(mode="fast", rationale=f"r{i}", proposal="") for i in range(12)]
+    one = LongTermMemory(model_name="hashing")
+    for i, q in enumerate(queries):
+        one.record_episode(q, "answer " + q, thoughts[i], tags[i])
+    batched = LongTermMemory(model_name="hashing")
+    calls = []
+    encode = batched._encode
+
+    def counting(texts, batch_size=64):
+        calls.append(len(texts))
+        return encode(texts, batch_size)
+
+    monkeypatch.setattr(batched, "_encode", counting)
+    batched.record_episodes(queries, ["answer " + q for q in queries], thoughts, tags)
+    assert calls == [12]
+    # Same rows apart from the timestamp, same embeddings, same tag postings.
+    assert _rows(batched) == _rows(one)
+    assert np.array_equal(batched.vectors(np.arange(12)), one.vectors(np.arange(12)))
+    for tag in ("rivers", "lakes"):
+        assert batched.search(tag, top_k=12, required_tags=[tag]) == one.search(tag, top_k=12, required_tags=[tag])
+    with pytest.raises(ValueError):
+        batched.record_episodes(["a", "b"], ["a"], thoughts[:2])
+
+
+def _answers(ltm, vectors):
+    return (
+        _live(ltm),
+        [dict(e) for e in ltm.recent(3)],
+        [[r for r, _ in ltm.search_vector(q, 10)] for q in vectors[::97]],
+        [[r for r, _ in ltm.search_vector(q, 10, required_tags=["t"])] for q in vectors[::97]],
+        ltm.search("q42", top_k=5, mode="lexical"),
+    )
+
+
+def test_lazy_load_answers_like_an_eager_load(tmp_path):
+    pytest.importorskip("faiss")
+    vectors = _clustered(1500, 32)
+    tags = [["t"] if i % 3 == 0 else [] for i in range(1500)]
+    policy = IndexPolicy(kind="ivf", threshold=1000, nlist=8, nprobe=8)
+    ltm = LongTermMemory(model_name="hashing-32", storage_dir=str(tmp_path), index_policy=policy)
+    _record_vectors(ltm, vectors[:800], tags[:800])
+    ltm.save()
+    _record_vectors(ltm, vectors[800:], tags[800:])
+    ltm.remove(np.arange(0, 1500, 11))
+    ltm.close()
+    eager = LongTermMemory(model_name="hashing-32", storage_dir=str(tmp_path), index_policy=policy)
+    eager.load()
+    expected, index = _answers(eager, vectors), describe(eager.index)
+    assert index["kind"] == "ivf"
+    eager.close()
+    lazy = LongTermMemory(model_name="hashing-32", storage_dir=str(tmp_path), index_policy=policy)
+    lazy.load(lazy=True)
+    # Before and after the index arrives in the background; every list is probed, so
+    # both are exact.
+    assert _answers(lazy, vectors) == expected
+    lazy.wait_for_index()
+    assert describe(lazy.index) == index
+    assert _answers(lazy, vectors) == expected
+    lazy.close()
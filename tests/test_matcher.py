@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from synthetic_mind.reasoning.matcher import _SCAN_MAX, KeywordMatcher, Rule, RuleRegistry
+
+
+def _words(rng, n, alphabet="ab c"):
+    # A tiny alphabet makes keywords overlap, nest and share prefixes and suffixes.
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5))) for _ in range(n)]
+
+
+@pytest.mark.parametrize("count", [1, 8, _SCAN_MAX, _SCAN_MAX + 1, 64, 300])
+def test_matcher_agrees_with_substring_checks(count):
+    rng = random.Random(count)
+    keywords = _words(rng, count) + ["ab", "abab", "b", "bab"]
+    matcher = KeywordMatcher(keywords)
+    assert (len(matcher._goto) > 1) == (len(matcher.keywords) > _SCAN_MAX)
+    for text in _words(rng, 200, "abc ") + ["", "ababab", "a" * 40]:
+        text = text * rng.randint(1, 4)
+        assert matcher.hits(text) == {k for k in keywords if k in text}, text
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_registry_agrees_with_the_keyword_checks_it_replaced(seed):
+    rng = random.Random(seed)
+    # Seeds 0-2 stay under the scan threshold, 3-5 go well past it.
+    size = 3 if seed < 3 else 30
+    rules = [Rule(name=f"r{i}", keywords=_words(rng, rng.randint(1, 3)), response=f"answer {i}", priority=rng.randint(0, 2)) for i in range(size)]
+    tags, greetings = _words(rng, size), _words(rng, size)
+    registry = RuleRegistry(rules=rules, tags=tags, greetings=greetings)
+    assert (len(registry.matcher.keywords) > _SCAN_MAX) == (seed >= 3)
+    by_priority = sorted(rules, key=lambda r: -r.priority)
+    for text in _words(rng, 300, "abc "):
+        hits = registry.scan(text)
+        assert hits.tags == [t for t in dict.fromkeys(tags) if t in text]
+        assert hits.greeting == any(g in text for g in greetings)
+        expected = next((r for r in by_priority if any(k in text for k in r.keywords)), None)
+        assert (hits.rule and hits.rule.name) == (expected and expected.name)
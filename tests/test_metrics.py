@@ -0,0 +1,86 @@
+import re
+import types
+
+import pytest
+
+from synthetic_mind import metrics
+from synthetic_mind.core import MindConfig, SyntheticMind
+from synthetic_mind.metrics import METRICS, Metrics, Spans
+
+
+class _Owner:
+    def gauges(self):
+        return {"ltm_episodes": 3.0}
+
+
+def test_prometheus_text_format():
+    m = Metrics()
+    m.inc("ltm_embed_calls_total", 2)
+    m.inc("mind_steps_total", labels={"path": "retrieval"})
+    m.set("ltm_index_rows", 1500)
+    owner = _Owner()
+    m.add_collector(owner, _Owner.gauges)
+    for seconds in (0.0003, 0.003, 0.003, 20.0):
+        m.observe("mind_step_seconds", seconds, {"path": "retrieval"})
+    text = m.to_prometheus()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "ltm_embed_calls_total 2" in lines
+    assert 'mind_steps_total{path="retrieval"} 1' in lines
+    assert "ltm_episodes 3" in lines and "ltm_index_rows 1500" in lines
+    assert [l for l in lines if l.startswith("# TYPE")] == [
+        "# TYPE ltm_embed_calls_total counter",
+        "# TYPE mind_steps_total counter",
+        "# TYPE ltm_episodes gauge",
+        "# TYPE ltm_index_rows gauge",
+        "# TYPE mind_step_seconds histogram",
+    ]
+    # Buckets are cumulative, in bound order, and +Inf holds every observation.
+    buckets = [(le, int(n)) for le, n in re.findall(r'^mind_step_seconds_bucket\{path="retrieval",le="([^"]+)"\} (\d+)$', text, re.M)]
+    assert len(buckets) == len(metrics.DEFAULT_BUCKETS) + 1
+    assert dict(buckets)["0.00025"] == 0 and dict(buckets)["0.0005"] == 1 and dict(buckets)["0.005"] == 3
+    assert buckets[-2] == ("10", 3) and buckets[-1] == ("+Inf", 4)
+    assert [n for _, n in buckets] == sorted(n for _, n in buckets)
+    assert 'mind_step_seconds_count{path="retrieval"} 4' in lines
+    assert 'mind_step_seconds_sum{path="retrieval"} 20.0063' in lines
+    # Collectors are held weakly and dropped with their owner.
+    del owner
+    assert "ltm_episodes 3" not in m.to_prometheus().splitlines()
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+    m.inc("a")
+    m.set("b", 1)
+    m.observe("c", 0.1)
+    m.observe_many("d", "stage", {"x": 0.1})
+    assert m.to_prometheus() == "\n"
+
+
+def test_spans_attribute_each_lap_to_its_stage(monkeypatch):
+    clock = iter([0.0, 1.0, 3.0, 10.0, 10.5, 12.0])
+    monkeypatch.setattr(metrics, "time", types.SimpleNamespace(perf_counter=lambda: next(clock)))
+    spans = Spans()
+    spans.lap("ingest")
+    spans.lap("attention")
+    spans.skip()
+    spans.lap("record")
+    spans.lap("attention")
+    assert spans.timings == {"ingest": 1.0, "attention": 3.5, "record": 0.5}
+    assert spans.as_ms()["record"] == 500.0
+    off = Spans(enabled=False)
+    off.lap("ingest")
+    assert off.timings == {}
+
+
+def test_step_reports_every_stage(tmp_path):
+    config = MindConfig(embed_model="hashing", storage_dir=str(tmp_path), save_every_n_steps=1)
+    mind = SyntheticMind(config, trace=True)
+    before = METRICS.to_dict()["histograms"].get("mind_step_stage_seconds{stage=record}", {"count": 0})["count"]
+    mind.step("tell me about rivers and lakes")
+    timings = mind.last_trace["timings"]
+    stages = {"ingest", "self_model", "attention", "contradictions", "reasoning", "compose", "reinforce", "tags", "record", "save"}
+    assert stages <= set(timings)
+    assert timings["total"] == pytest.approx(sum(v for k, v in timings.items() if k not in ("total", "first_chunk")))
+    assert METRICS.to_dict()["histograms"]["mind_step_stage_seconds{stage=record}"]["count"] == before + 1
+    mind.close()
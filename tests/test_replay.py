@@ -0,0 +1,87 @@
+import pyarrow.parquet as pq
+import pytest
+
+from synthetic_mind import replay as replay_module
+from synthetic_mind.core import MindConfig
+from synthetic_mind.memory import episodes
+from synthetic_mind.memory.lexical import RetrievalPolicy
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.replay import replay
+from synthetic_mind.types import Thought
+
+
+def _record(ltm, queries, tags=None):
+    thoughts = [Thought(mode="fast", rationale="", proposal="") for _ in queries]
+    ltm.record_episodes(queries, ["answer " + q for q in queries], thoughts, tags)
+
+
+def _state(ltm):
+    return (
+        ltm.search("rivers lakes", top_k=4, mode="lexical"),
+        ltm.search("rivers lakes", top_k=4, mode="vector"),
+        {tag: ids.tolist() for tag, ids in ltm.tags_index.items()},
+        ltm.episodes.to_arrow().to_pylist(),
+        ltm.episodes.dead_rows,
+    )
+
+
+def test_truncate_restores_the_earlier_state(monkeypatch):
+    monkeypatch.setattr(episodes, "SEAL_ROWS", 4)
+    ltm = LongTermMemory(model_name="hashing", retrieval=RetrievalPolicy(mode="hybrid"))
+    _record(ltm, [f"rivers {i}" if i % 3 else f"lakes {i}" for i in range(10)], [["old"]] * 10)
+    before = _state(ltm)
+    _record(ltm, ["rivers and lakes"] * 7, [["new"]] * 7)
+    ltm.remove([12])
+    assert ltm.truncate(10) == 7
+    assert _state(ltm) == before
+    _record(ltm, ["lakes again"])
+    assert len(ltm.episodes) == 11 and ltm.episodes[10]["query"] == "lakes again"
+    assert int(ltm.episodes.ids[10]) == 17
+
+
+def test_truncate_refuses_saved_rows(tmp_path):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=str(tmp_path))
+    _record(ltm, ["a", "b", "c"])
+    ltm.save()
+    with pytest.raises(ValueError):
+        ltm.truncate(1)
+    ltm.close()
+
+
+def _snapshot(path):
+    ltm = LongTermMemory(model_name="hashing", storage_dir=str(path))
+    _record(ltm, ["how do rivers flow", "why is the sky blue", "what do cats eat", "rivers and lakes", "blue whales eat krill"])
+    ltm.save()
+    ltm.close()
+
+
+def test_replay_results_do_not_depend_on_transcript_order(tmp_path):
+    _snapshot(tmp_path / "snap")
+    a = ["tell me about rivers", "rivers again please"]
+    b = ["what do whales eat", "rivers rivers rivers", "blue sky"]
+    config = MindConfig(embed_model="hashing", storage_dir=None, ltm_retrieval=RetrievalPolicy(mode="lexical"))
+    responses = []
+    for name, order in (("ab", (a, b)), ("ba", (b, a))):
+        transcripts = tmp_path / name
+        transcripts.mkdir()
+        for i, prompts in enumerate(order):
+            (transcripts / f"{i}.txt").write_text("\n".join(prompts))
+        out = tmp_path / f"{name}.parquet"
+        replay(str(transcripts), str(tmp_path / "snap"), str(out), config=config)
+        responses.append({r["prompt"]: r["response"] for r in pq.read_table(out).to_pylist()})
+    assert len(responses[0]) == 5
+    assert responses[0] == responses[1]
+
+
+def test_failed_replay_leaves_no_temporary_file(tmp_path, monkeypatch):
+    _snapshot(tmp_path / "snap")
+    (tmp_path / "t").mkdir()
+    (tmp_path / "t" / "0.txt").write_text("hello")
+
+    def broken(batch):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(replay_module, "_run_batch", broken)
+    with pytest.raises(RuntimeError):
+        replay(str(tmp_path / "t"), str(tmp_path / "snap"), str(tmp_path / "out.parquet"), config=MindConfig(embed_model="hashing"))
+    assert not list(tmp_path.glob("out*"))
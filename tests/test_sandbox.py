@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from synthetic_mind.action.sandbox import SandboxPolicy, SandboxPool
+
+pytest.importorskip("resource")
+
+
+def _pool(**policy):
+    pool = SandboxPool(SandboxPolicy(workers=1, cache_entries=0, **policy))
+    pool.start()
+    return pool
+
+
+def test_timeout_replaces_the_worker():
+    pool = _pool(timeout_s=0.3, cpu_s=30)
+    assert pool.run("while True:\n    pass") == "Exec error: timed out after 0.3s"
+    assert pool.run("result = 2 + 2") == "Code result: 4"
+    assert pool.stats()["workers"] == 1
+    pool.close()
+
+
+def test_cpu_limit_kills_the_call_and_not_the_pool():
+    pool = _pool(timeout_s=30, cpu_s=1)
+    assert pool.run("while True:\n    pass") == "Exec error: CPU limit of 1s exceeded"
+    assert pool.run("result = 2 + 2") == "Code result: 4"
+    pool.close()
+
+
+def test_reused_worker_keeps_its_full_cpu_budget():
+    # Each snippet takes about 0.1s of CPU; a worker that has used a fraction of a second
+    # must still get cpu_s for the next one.
+    pool = _pool(timeout_s=30, cpu_s=1)
+    for i in range(12):
+        assert pool.run(f"result = sum(range(6_000_000 + {i}))").startswith("Code result:")
+    pool.close()
+
+
+def test_memory_limit():
+    pool = _pool(memory_mb=64)
+    assert pool.run("result = len([0] * (64 * 1024 * 1024))") == "Exec error: memory limit exceeded"
+    assert pool.run("result = len([0] * 1000)") == "Code result: 1000"
+    pool.close()
+
+
+def test_dead_worker_is_replaced():
+    pool = _pool()
+    pool._workers[0].process.kill()
+    pool._workers[0].process.join()
+    assert pool.run("result = 1").startswith("Exec error: sandbox worker exited")
+    assert pool.run("result = 1") == "Code result: 1"
+    assert pool.stats()["workers"] == 1
+    pool.close()
+
+
+def test_close_wakes_waiting_callers_and_refuses_new_calls():
+    pool = _pool(timeout_s=30, cpu_s=30)
+    results = {}
+
+    def run(name, code):
+        try:
+            results[name] = pool.run(code)
+        except RuntimeError as e:
+            results[name] = e
+
+    busy = threading.Thread(target=run, args=("busy", "while True:\n    pass"), daemon=True)
+    busy.start()
+    while pool.stats()["idle"]:
+        busy.join(0.01)
+    waiting = threading.Thread(target=run, args=("waiting", "result = 1"), daemon=True)
+    waiting.start()
+    waiting.join(0.2)
+    pool.close()
+    waiting.join(5)
+    busy.join(5)
+    assert not waiting.is_alive() and not busy.is_alive()
+    assert isinstance(results["waiting"], RuntimeError)
+    with pytest.raises(RuntimeError):
+        pool.run("result = 1")
@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from synthetic_mind.memory.segments import MANIFEST, WRITER_LOCK, SegmentStore
+
+
+def _rows(start: int, n: int, dim: int = 4):
+    table = pa.table({"query": [f"q{i}" for i in range(start, start + n)]})
+    # Every embedding row holds its row number, so order can be checked after merges.
+    return table, np.repeat(np.arange(start, start + n, dtype=np.float32)[:, None], dim, axis=1)
+
+
+def test_read_only_open_leaves_directory_alone(tmp_path):
+    store = SegmentStore(str(tmp_path), compact_after=1 << 30)
+    store.append(*_rows(0, 3))
+    # A writer's in-flight files: not in the manifest yet.
+    for name in ("seg-000009.parquet", "seg-000009.npy", "seg-000002.npy.tmp"):
+        (tmp_path / name).write_bytes(b"x")
+    before = sorted(os.listdir(tmp_path))
+    ro = SegmentStore(str(tmp_path), read_only=True)
+    assert ro.rows == 3
+    files, embs = ro.open(mmap_mode="r")
+    assert sum(f.metadata.num_rows for f in files) == 3
+    with pytest.raises(RuntimeError):
+        ro.append(*_rows(3, 1))
+    with pytest.raises(RuntimeError):
+        ro.compact()
+    assert sorted(os.listdir(tmp_path)) == before
+
+
+def test_read_only_open_does_not_create_missing_directory(tmp_path):
+    missing = tmp_path / "typo"
+    assert not SegmentStore(str(missing), read_only=True).exists()
+    assert not missing.exists()
+
+
+def test_second_writer_is_refused_until_the_first_closes(tmp_path):
+    first = SegmentStore(str(tmp_path))
+    first.append(*_rows(0, 2))
+    with pytest.raises(RuntimeError):
+        SegmentStore(str(tmp_path))
+    # Readers never take the lock.
+    assert SegmentStore(str(tmp_path), read_only=True).rows == 2
+    first.close()
+    second = SegmentStore(str(tmp_path))
+    second.append(*_rows(2, 1))
+    assert second.rows == 3
+    second.close()
+
+
+def test_opening_a_locked_store_keeps_the_writers_in_flight_files(tmp_path):
+    first = SegmentStore(str(tmp_path))
+    first.append(*_rows(0, 2))
+    (tmp_path / "seg-000007.npy.tmp").write_bytes(b"x")
+    with pytest.raises(RuntimeError):
+        SegmentStore(str(tmp_path))
+    assert (tmp_path / "seg-000007.npy.tmp").exists()
+    first.close()
+
+
+def _contents(store: SegmentStore):
+    queries, embs = [], []
+    for _, table, emb in store.read():
+        queries.extend(table.column("query").to_pylist())
+        embs.append(np.asarray(emb))
+    return queries, np.concatenate(embs) if embs else np.zeros((0, 4), dtype=np.float32)
+
+
+def test_compaction_merges_newest_similar_sized_runs_and_keeps_order(tmp_path):
+    store = SegmentStore(str(tmp_path), compact_after=4)
+    start = 0
+    for n in [100] + [1] * 40 + [7, 3] * 10:
+        store.append(*_rows(start, n))
+        store.wait()
+        start += n
+    segments = store.segments
+    # Small saves never rewrite the big first segment, and the segment count stays bounded.
+    assert segments[0]["rows"] == 100
+    assert len(segments) <= 3 * 4
+    assert [s["start"] for s in segments] == [sum(t["rows"] for t in segments[:i]) for i in range(len(segments))]
+    queries, embs = _contents(store)
+    assert queries == [f"q{i}" for i in range(start)]
+    assert np.array_equal(embs[:, 0], np.arange(start, dtype=np.float32))
+    store.close()
+    live = {f"{s['name']}{ext}" for s in segments for ext in (".npy", ".parquet")}
+    assert {p.name for p in tmp_path.iterdir() if p.name.startswith("seg-")} == live
+
+
+def _files(path):
+    return sorted(p.name for p in path.iterdir())
+
+
+def _crash(self, manifest):
+    # The process dies before the new manifest replaces the old one.
+    raise OSError("power cut")
+
+
+def test_reopened_store_reads_back_every_row_and_embedding(tmp_path):
+    store = SegmentStore(str(tmp_path), compact_after=1 << 30)
+    for start, n in ((0, 3), (3, 5), (8, 1)):
+        store.append(*_rows(start, n))
+    names = [s["name"] for s in store.segments]
+    store.close()
+    reopened = SegmentStore(str(tmp_path))
+    assert reopened.rows == 9
+    assert [(s["start"], s["rows"]) for s in reopened.segments] == [(0, 3), (3, 5), (8, 1)]
+    queries, embs = _contents(reopened)
+    assert queries == [f"q{i}" for i in range(9)]
+    assert np.array_equal(embs, _rows(0, 9)[1])
+    reopened.append(*_rows(9, 2))
+    assert reopened.segments[-1]["name"] not in names
+    assert _contents(reopened)[0] == [f"q{i}" for i in range(11)]
+    reopened.close()
+
+
+def test_crash_before_the_manifest_commit_keeps_the_previous_state(tmp_path, monkeypatch):
+    store = SegmentStore(str(tmp_path), compact_after=1 << 30)
+    store.append(*_rows(0, 4))
+    committed = _files(tmp_path)
+    with monkeypatch.context() as m:
+        m.setattr(SegmentStore, "_commit", _crash)
+        with pytest.raises(OSError):
+            store.append(*_rows(4, 2))
+    # Torn writes leave only temporaries behind.
+    (tmp_path / f"{MANIFEST}.tmp").write_text('{"rows": ')
+    (tmp_path / "seg-000003.npy.tmp").write_bytes(b"x")
+    store.close()
+    reopened = SegmentStore(str(tmp_path))
+    assert reopened.rows == 4
+    queries, embs = _contents(reopened)
+    assert queries == [f"q{i}" for i in range(4)]
+    assert np.array_equal(embs, _rows(0, 4)[1])
+    assert _files(tmp_path) == committed
+    reopened.append(*_rows(4, 2))
+    assert _contents(reopened)[0] == [f"q{i}" for i in range(6)]
+    reopened.close()
+
+
+def test_crash_during_compaction_keeps_the_source_segments(tmp_path, monkeypatch):
+    store = SegmentStore(str(tmp_path), compact_after=1 << 30)
+    for start in range(0, 8, 2):
+        store.append(*_rows(start, 2))
+    committed = _files(tmp_path)
+    store.compact_after = 4
+    with monkeypatch.context() as m:
+        m.setattr(SegmentStore, "_commit", _crash)
+        with pytest.raises(OSError):
+            store.compact()
+    assert len(_files(tmp_path)) == len(committed) + 2
+    store.close()
+    reopened = SegmentStore(str(tmp_path), compact_after=4)
+    assert _files(tmp_path) == committed
+    assert len(reopened.segments) == 4
+    assert reopened.compact()
+    assert [(s["start"], s["rows"]) for s in reopened.segments] == [(0, 8)]
+    queries, embs = _contents(reopened)
+    assert queries == [f"q{i}" for i in range(8)]
+    assert np.array_equal(embs, _rows(0, 8)[1])
+    reopened.close()
+    assert _files(tmp_path) == sorted([MANIFEST, WRITER_LOCK] + [f"{reopened.segments[0]['name']}{ext}" for ext in (".npy", ".parquet")])
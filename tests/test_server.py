@@ -0,0 +1,102 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from synthetic_mind.core import MindConfig
+from synthetic_mind.server import MindServer
+
+
+async def _request(reader, writer, method, path, body=b"", headers=""):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n{headers}\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    head = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        head[name.strip().lower()] = value.strip()
+    if "content-length" in head:
+        return status, json.loads(await reader.readexactly(int(head["content-length"])))
+    events = []
+    while True:
+        size = int((await reader.readline()).strip(), 16)
+        data = await reader.readexactly(size + 2)
+        if not size:
+            return status, events
+        events.append(json.loads(data))
+
+
+def _run(test, storage_dir):
+    async def main():
+        config = MindConfig(embed_model="hashing", storage_dir=str(storage_dir))
+        server = MindServer(config, max_workers=2, max_body_bytes=1024)
+        await server.start("127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            await test(server, reader, writer)
+            writer.close()
+        finally:
+            await server.shutdown()
+
+    asyncio.run(main())
+
+
+def test_failing_stream_ends_with_an_error_event_and_keeps_the_connection(tmp_path):
+    async def test(server, reader, writer):
+        _, created = await _request(reader, writer, "POST", "/sessions")
+        sid = created["session_id"]
+
+        def broken(prompt):
+            yield "first part"
+            raise RuntimeError("step failed")
+
+        server.sessions[sid].mind.step_stream = broken
+        status, events = await _request(reader, writer, "POST", f"/sessions/{sid}/stream", b'{"prompt": "hi"}')
+        assert status == 200
+        assert events[0] == {"chunk": "first part"}
+        assert events[-1] == {"done": True, "error": "step failed"}
+        # Same connection, next request.
+        status, health = await _request(reader, writer, "GET", "/health")
+        assert status == 200 and "sessions" in health
+
+    _run(test, tmp_path)
+
+
+def test_oversized_body_is_refused(tmp_path):
+    async def test(server, reader, writer):
+        status, body = await _request(reader, writer, "POST", "/sessions", b"x" * 2048)
+        assert status == 413 and "error" in body
+        assert await reader.read() == b""
+
+    _run(test, tmp_path)
+
+
+def test_sweep_skips_busy_sessions_and_steps_queued_behind_it_see_the_session_gone(tmp_path):
+    async def main():
+        server = MindServer(MindConfig(embed_model="hashing", storage_dir=str(tmp_path)), max_workers=4)
+        queued, busy, idle = (server.create_session() for _ in range(3))
+        closed = []
+        for s in (queued, busy, idle):
+            s.mind.close = lambda sid=s.id: closed.append(sid)
+        release = threading.Event()
+        step = busy.mind.step
+        busy.mind.step = lambda prompt: release.wait(5) and step(prompt)
+        running = asyncio.create_task(server.step(busy.id, "hello"))
+        while not busy.lock.locked():
+            await asyncio.sleep(0)
+        # Not started yet: the sweep takes the session's lock first, and the step queues on
+        # it while the session closes.
+        late = asyncio.create_task(server.step(queued.id, "hello"))
+        assert await server._close_idle(time.monotonic() + 1) == 2
+        assert sorted(closed) == sorted([idle.id, queued.id])
+        assert list(server.sessions) == [busy.id]
+        with pytest.raises(KeyError):
+            await late
+        release.set()
+        assert (await running)["response"]
+        assert busy.steps == 1
+        await server.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+from synthetic_mind.memory.sharded import ShardedLongTermMemory
+from synthetic_mind.types import Thought
+
+
+def test_reload_keeps_the_recorded_order_of_a_batch(tmp_path):
+    queries = [f"question {i}" for i in range(12)]
+    thoughts = [Thought(mode="fast", rationale="", proposal="") for _ in queries]
+    ltm = ShardedLongTermMemory(model_name="hashing", storage_dir=str(tmp_path), shards=3)
+    try:
+        # One batch shares one timestamp and is spread over every shard.
+        ltm.record_episodes(queries, ["answer"] * len(queries), thoughts)
+        assert len({int(s) for s in ltm._shard_of.view()}) == 3
+        ltm.save()
+    finally:
+        ltm.close()
+    ltm = ShardedLongTermMemory(model_name="hashing", storage_dir=str(tmp_path), shards=3)
+    try:
+        ltm.load()
+        assert [e["query"] for e in ltm.episodes[:]] == queries
+        ltm.record_episode("later", "answer", thoughts[0])
+        ltm.save()
+        ltm.load()
+        assert ltm.episodes[12]["query"] == "later"
+    finally:
+        ltm.close()
@@ -0,0 +1,85 @@
+import threading
+
+from synthetic_mind.action.web import WebClient, WebPolicy
+
+
+class _Inflight(dict):
+    # Flags when a second caller finds the first one's request in flight.
+    def __init__(self):
+        super().__init__()
+        self.joined = threading.Event()
+
+    def get(self, key, default=None):
+        fut = super().get(key, default)
+        if fut is not None:
+            self.joined.set()
+        return fut
+
+
+def _shared_search(client, fetch):
+    # Runs two identical searches while the first one's fetch is in progress.
+    started = threading.Event()
+    release = threading.Event()
+    client._inflight = inflight = _Inflight()
+
+    def slow_fetch(query):
+        started.set()
+        release.wait(5)
+        return fetch(query)
+
+    client._fetch = slow_fetch
+    results = {}
+
+    def run(name):
+        try:
+            results[name] = client.search("same query")
+        except Exception as e:
+            results[name] = e
+
+    owner = threading.Thread(target=run, args=("owner",), daemon=True)
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=run, args=("waiter",), daemon=True)
+    waiter.start()
+    inflight.joined.wait(5)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+    assert not owner.is_alive() and not waiter.is_alive()
+    return results
+
+
+def test_failed_cache_write_still_answers_waiters(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    client = WebClient(WebPolicy(cache_dir=str(blocker)))
+    results = _shared_search(client, lambda q: ("snippet", True))
+    assert results == {"owner": "snippet", "waiter": "snippet"}
+    assert client.search("same query") == "snippet"
+
+
+def test_fetch_exception_reaches_waiters():
+    client = WebClient(WebPolicy())
+
+    def broken(query):
+        raise RuntimeError("boom")
+
+    results = _shared_search(client, broken)
+    assert all(isinstance(r, RuntimeError) for r in results.values())
+    assert not client._inflight
+
+
+def test_memory_cache_evicts_the_least_recently_used_query():
+    client = WebClient(WebPolicy(memory_entries=2))
+    fetched = []
+
+    def fetch(query):
+        fetched.append(query)
+        return f"answer {query}", True
+
+    client._fetch = fetch
+    for query in ["a", "b", "a", "c", "a", "b"]:
+        assert client.search(query) == f"answer {query}"
+    # "b" was the least recently used when "c" came in; "a" stayed hot.
+    assert fetched == ["a", "b", "c", "b"]
+    assert len(client._memory) == 2
@@ -0,0 +1,74 @@
+import math
+import random
+import time
+
+import pytest
+
+from synthetic_mind.memory.working import WorkingMemory
+from synthetic_mind.types import Experience
+
+
+# The list-based WorkingMemory that the array version replaced, kept as the reference.
+class ListWorkingMemory:
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.buffer = []
+
+    def add(self, exp):
+        novelty = min(1.0, 0.2 + len(exp.content) / 200.0)
+        exp.saliency = max(0.05, min(1.0, 0.5 * novelty))
+        self.buffer.append(exp)
+        self._trim()
+
+    def _trim(self):
+        if len(self.buffer) <= self.capacity:
+            return
+        self.buffer.sort(key=self._effective_score)
+        self.buffer = self.buffer[-self.capacity :]
+        self.buffer.sort(key=lambda e: e.timestamp)
+
+    def _effective_score(self, e):
+        age_s = max(0.0, time.time() - e.timestamp)
+        return 0.6 * e.saliency + 0.4 * math.exp(-age_s / 120.0)
+
+    def topk(self, k):
+        return sorted(self.buffer, key=self._effective_score, reverse=True)[:k]
+
+    def reinforce(self, items, delta=0.1):
+        ids = {i.id for i in items}
+        for e in self.buffer:
+            if e.id in ids:
+                e.saliency = min(1.0, e.saliency + delta)
+            else:
+                e.saliency = max(0.01, e.saliency * 0.98)
+
+
+def _state(wm):
+    return [(e.id, e.timestamp, e.saliency) for e in wm.buffer]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_the_list_implementation(seed, monkeypatch):
+    rng = random.Random(seed)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    capacity = rng.choice([1, 3, 8, 20, 100])
+    new, ref = WorkingMemory(capacity), ListWorkingMemory(capacity)
+    for _ in range(300):
+        clock[0] += rng.expovariate(1 / 30.0)
+        op = rng.random()
+        if op < 0.5:
+            # Ids repeat, as Experience.from_text ids do within one millisecond.
+            fields = dict(id=f"exp-{rng.randrange(40)}", content="x" * rng.randrange(250), timestamp=clock[0])
+            new.add(Experience(**fields))
+            ref.add(Experience(**fields))
+        elif op < 0.8:
+            k = rng.randrange(capacity + 2)
+            assert [(e.id, e.timestamp) for e in new.topk(k)] == [(e.id, e.timestamp) for e in ref.topk(k)]
+        else:
+            picked = rng.sample(ref.buffer, min(len(ref.buffer), rng.randrange(4)))
+            delta = rng.choice([0.05, 0.1, 0.3])
+            new.reinforce(picked, delta)
+            ref.reinforce(picked, delta)
+        assert len(new) == len(ref.buffer)
+        assert _state(new) == _state(ref)
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from synthetic_mind.memory.long_term import LongTermMemory
+from synthetic_mind.memory.writer import BackgroundWriter
+from synthetic_mind.types import Thought
+
+
+def _thought():
+    return Thought(mode="fast", rationale="", proposal="")
+
+
+def _queries(ltm):
+    return [row["query"] for row in ltm.episodes]
+
+
+def _gated(ltm, monkeypatch):
+    # Holds the writer thread on its first batch until the gate opens, so records pile up.
+    gate = threading.Event()
+    record_episodes = ltm.record_episodes
+
+    def held(*args, **kwargs):
+        gate.wait(5)
+        return record_episodes(*args, **kwargs)
+
+    monkeypatch.setattr(ltm, "record_episodes", held)
+    return gate
+
+
+def test_flush_drains_pending_records_in_order(monkeypatch):
+    ltm = LongTermMemory(model_name="hashing-16")
+    writer = BackgroundWriter(ltm, max_queue=64)
+    gate = _gated(ltm, monkeypatch)
+    saved_at = []
+    monkeypatch.setattr(ltm, "save", lambda: saved_at.append(len(ltm.episodes)))
+    for i in range(20):
+        writer.record(f"q{i}", f"r{i}", _thought(), ["t"])
+        if i == 9:
+            writer.save()
+    writer.record_many(["q20", "q21"], ["r20", "r21"], [_thought(), _thought()], [[], []])
+    assert writer.pending > 0
+    gate.set()
+    writer.flush()
+    assert writer.pending == 0
+    assert _queries(ltm) == [f"q{i}" for i in range(22)]
+    # The save ran after exactly the records queued before it.
+    assert saved_at == [10]
+    writer.close()
+
+
+def test_close_drains_and_saves_then_refuses_records(tmp_path, monkeypatch):
+    ltm = LongTermMemory(model_name="hashing-16", storage_dir=str(tmp_path))
+    writer = BackgroundWriter(ltm)
+    gate = _gated(ltm, monkeypatch)
+    for i in range(10):
+        writer.record(f"q{i}", f"r{i}", _thought())
+    writer.save()
+    threading.Timer(0.05, gate.set).start()
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.record("late", "r", _thought())
+    ltm.close()
+    again = LongTermMemory(model_name="hashing-16", storage_dir=str(tmp_path))
+    again.load()
+    assert _queries(again) == [f"q{i}" for i in range(10)]
+    again.close()
+
+
+def test_writer_error_is_raised_once_and_the_writer_keeps_going(monkeypatch):
+    ltm = LongTermMemory(model_name="hashing-16")
+    writer = BackgroundWriter(ltm)
+    record_episodes = ltm.record_episodes
+
+    def failing(queries, *args, **kwargs):
+        if "bad" in queries:
+            raise ValueError("embedder failed")
+        return record_episodes(queries, *args, **kwargs)
+
+    monkeypatch.setattr(ltm, "record_episodes", failing)
+    writer.record("bad", "r", _thought())
+    with pytest.raises(ValueError):
+        writer.flush()
+    writer.flush()
+    writer.record("good", "r", _thought())
+    writer.flush()
+    assert _queries(ltm) == ["good"]
+    # Without a flush, the error surfaces on the next submit.
+    writer.record("bad", "r", _thought())
+    deadline = time.monotonic() + 5
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(ValueError):
+        writer.record("after", "r", _thought())
+    writer.close()